@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import contextlib
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from fc_kitnet import FCKitNET, sqr, sqrt_mu
+from fc_enidrift import FCENIDrift
+from flow_hash import flow_hashes, flow_hashes_array
+from trace_cache import load_trace, decode_trace
+from synth_trace import write_trace, add_trace_args, trace_args
+
+#
+# Throughput benchmarks on a deterministic synthetic trace (synth_trace.py).
+#
+# Benchmarks (items/s, median of the runs, setup excluded). Each benchmark runs at least
+# repeat times and min_time seconds, so the short ones get enough runs for a stable median:
+#  math_unit:              MathUnit.compute (sqr and sqrt_mu of the KitNET FC), per value.
+#  crc16:                  flow_hashes(), per packet.
+#  crc16_array:            flow_hashes_array() over the whole trace columns.
+#  fc_kitnet_process:      FCKitNET.feature_extract() + process('training').
+#  fc_kitnet_process_exact: FCKitNET.feature_extract() + process_exact('training').
+#  fc_kitnet_process_batch: FCKitNET.process_batch('training', fc_batch_size).
+#  fc_enidrift_process:    FCENIDrift.feature_extract() + process().
+#  fc_enidrift_process_batch: FCENIDrift.process_batch(fc_batch_size).
+#  pipeline_kitnet:        full PipelineKitNET run (training and execution phases).
+#  pipeline_enidrift:      full PipelineENIDrift run.
+# The pipeline benchmarks need the KitNET/ENIDrift plugins: without them, they are skipped.
+# Like a normal run, pipeline_kitnet saves its models (attack 'bench').
+#
+# The results are written to JSON, with the environment (python, numpy, platform, CPU, git
+# commit) and the parameters. With --compare (a previous results file, by default the
+# committed baseline), each benchmark's rate is compared with the baseline one: a rate lower
+# by more than the threshold is a regression (exit status 1). Rates only compare on the same
+# machine and parameters: a warning is printed if they differ from the baseline ones.
+# The default threshold (0.25) is above the run to run noise measured on the baseline machine
+# (a shared VM: medians of the same code within 0.89-1.23x of the baseline); use a lower one
+# on a quiet machine.
+#
+# bench/baseline.json was recorded with the default parameters (see its env and params).
+# Re-record it (-o bench/baseline.json) when the benchmarks or the reference machine change.
+#
+# Usage:
+#
+#  python3 bench/bench.py -n 20000 -f 1000 -o bench.json
+#  python3 bench/bench.py --compare                  # vs. bench/baseline.json
+#  python3 bench/bench.py -n 20000 -f 1000 --compare bench.json -t 0.1 --min-time 5
+#  python3 bench/bench.py -b crc16 fc_kitnet_process
+#
+
+BASELINE = f'{Path(__file__).parent}/baseline.json'
+
+# Environment fields that must match for the rates to be comparable.
+MACHINE_FIELDS = ['machine', 'processor', 'cpu_count', 'python', 'numpy']
+
+
+def bench_math_unit(ctx):
+    values = np.random.default_rng(ctx['seed']).integers(0, 1 << 20, ctx['packets']).tolist()
+
+    def run():
+        for value in values:
+            sqr.compute(value)
+            sqrt_mu.compute(value)
+        return 2 * len(values)
+    return run
+
+
+def bench_crc16(ctx):
+    trace = decode_trace(load_trace(ctx['trace']))
+    columns = [trace[col].tolist() for col in
+               ['mac_src', 'ip_src', 'ip_dst', 'ip_proto', 'port_src', 'port_dst']]
+
+    def run():
+        for pkt in zip(*columns):
+            flow_hashes(*pkt)
+        return len(columns[0])
+    return run
+
+
+def bench_crc16_array(ctx):
+    trace = decode_trace(load_trace(ctx['trace']))
+    columns = [trace[col] for col in
+               ['mac_src', 'ip_src', 'ip_dst', 'ip_proto', 'port_src', 'port_dst']]
+
+    def run():
+        flow_hashes_array(*columns)
+        return len(columns[0])
+    return run
+
+
+def bench_fc_kitnet(ctx, exact):
+    fc = FCKitNET(ctx['trace'], 1, ctx['packets'], 0, False)
+    process = fc.process_exact if exact else fc.process
+
+    def run():
+        for _ in range(fc.trace_size()):
+            fc.feature_extract()
+            process('training')
+        return fc.trace_size()
+    return run
+
+
+def bench_fc_kitnet_batch(ctx):
+    fc = FCKitNET(ctx['trace'], 1, ctx['packets'], 0, False)
+
+    def run():
+        while fc.global_pkt_index < fc.trace_size():
+            fc.process_batch('training', ctx['fc_batch_size'])
+        return fc.trace_size()
+    return run
+
+
+def bench_fc_enidrift(ctx):
+    fc = FCENIDrift(ctx['trace'], 1)
+
+    def run():
+        for _ in range(fc.trace_size()):
+            fc.feature_extract()
+            fc.process()
+        return fc.trace_size()
+    return run
+
+
+def bench_fc_enidrift_batch(ctx):
+    fc = FCENIDrift(ctx['trace'], 1)
+
+    def run():
+        while fc.global_pkt_index < fc.trace_size():
+            fc.process_batch(ctx['fc_batch_size'])
+        return fc.trace_size()
+    return run
+
+
+def bench_pipeline_kitnet(ctx):
+    from pipeline_kitnet import PipelineKitNET
+    pipeline = PipelineKitNET(
+        ctx['trace'], ctx['labels'], 1, False, 0, ctx['fm_grace'], ctx['ad_grace'], 10,
+        None, None, None, None, 'bench', 0, False, time.time(), ctx['fc_batch_size'])
+
+    def run():
+        pipeline.process()
+        return pipeline.trace_size
+    return run
+
+
+def bench_pipeline_enidrift(ctx):
+    from pipeline_enidrift import PipelineENIDrift
+    pipeline = PipelineENIDrift(
+        ctx['trace'], ctx['labels'], 1, 'bench', [0.1, 0.1], [0.05, 0.05], True, 1000, False,
+        ctx['fc_batch_size'])
+
+    def run():
+        pipeline.process()
+        return pipeline.trace_size
+    return run
+
+
+BENCHMARKS = {
+    'math_unit': bench_math_unit,
+    'crc16': bench_crc16,
+    'crc16_array': bench_crc16_array,
+    'fc_kitnet_process': lambda ctx: bench_fc_kitnet(ctx, False),
+    'fc_kitnet_process_exact': lambda ctx: bench_fc_kitnet(ctx, True),
+    'fc_kitnet_process_batch': bench_fc_kitnet_batch,
+    'fc_enidrift_process': bench_fc_enidrift,
+    'fc_enidrift_process_batch': bench_fc_enidrift_batch,
+    'pipeline_kitnet': bench_pipeline_kitnet,
+    'pipeline_enidrift': bench_pipeline_enidrift,
+}
+
+
+def run_benchmark(setup, ctx, repeat, min_time):
+    # Median of the runs (at least repeat, and min_time seconds in total), each one with a
+    # fresh setup (the FCs/pipelines are stateful).
+    # The benchmarked code's own output is discarded.
+    times = []
+    items = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        while len(times) < repeat or sum(times) < min_time:
+            run = setup(ctx)
+            start = time.perf_counter()
+            items = run()
+            times.append(time.perf_counter() - start)
+    seconds = float(np.median(times))
+    return {'items': items, 'seconds': seconds, 'rate': items / seconds, 'runs': times}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=Path(__file__).parents[0],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'python': platform.python_version(), 'numpy': np.__version__,
+        'platform': platform.platform(), 'machine': platform.machine(),
+        'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+        'git_commit': git_commit(), 'time': datetime.now().isoformat()}
+
+
+# Rate of each benchmark vs. the baseline: (name, rate, baseline rate, ratio, status) rows.
+def compare(results, baseline, threshold):
+    rows = []
+    for name, values in results.items():
+        baseline_values = baseline['results'].get(name)
+        if 'rate' not in values or baseline_values is None or 'rate' not in baseline_values:
+            continue
+        ratio = values['rate'] / baseline_values['rate']
+        if ratio < 1 - threshold:
+            status = 'REGRESSION'
+        elif ratio > 1 + threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, values['rate'], baseline_values['rate'], ratio, status))
+    return rows
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="peregrine-py benchmarks")
+    add_trace_args(argparser)
+    argparser.add_argument('-b', '--bench', type=str, nargs='+', choices=list(BENCHMARKS),
+                           default=list(BENCHMARKS), help='Benchmarks to run')
+    argparser.add_argument('-R', '--repeat', type=int, default=5,
+                           help='Minimum runs per benchmark')
+    argparser.add_argument('--min-time', type=float, default=2,
+                           help='Minimum measured time per benchmark (s)')
+    argparser.add_argument('--fc-batch-size', type=int, default=4096, help='FC batch size')
+    argparser.add_argument('--fm-grace', type=int, default=2000, help='KitNET FM grace')
+    argparser.add_argument('--ad-grace', type=int, default=8000, help='KitNET AD grace')
+    argparser.add_argument('-o', '--out', type=str, help='Results path (JSON)')
+    argparser.add_argument('--compare', '--baseline', type=str, nargs='?', const=BASELINE,
+                           help='Baseline results to compare with (default bench/baseline.json)')
+    argparser.add_argument('-t', '--threshold', '--tolerance', type=float, default=0.25,
+                           help='Relative rate drop vs. the baseline flagged as a regression')
+    args = argparser.parse_args()
+
+    params = dict(trace_args(args), fc_batch_size=args.fc_batch_size, fm_grace=args.fm_grace,
+                  ad_grace=args.ad_grace, repeat=args.repeat, min_time=args.min_time)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        trace, labels = write_trace(f'{tmpdir}/synth.pcap', **trace_args(args))
+        ctx = dict(params, trace=trace, labels=labels)
+        for name in args.bench:
+            try:
+                results[name] = run_benchmark(BENCHMARKS[name], ctx, args.repeat,
+                                              args.min_time)
+            except ImportError as e:
+                results[name] = {'skipped': str(e)}
+            if 'rate' in results[name]:
+                print(f'{name:>26}: {results[name]["rate"]:>12.0f} items/s '
+                      f'({results[name]["items"]} in {results[name]["seconds"]:.3f} s, '
+                      f'{len(results[name]["runs"])} runs)')
+            else:
+                print(f'{name:>26}: skipped ({results[name]["skipped"]})')
+
+    outpath = args.out
+    if outpath is None:
+        outdir = f'{Path(__file__).parents[1]}/eval/bench'
+        os.makedirs(outdir, exist_ok=True)
+        outpath = f'{outdir}/bench-{datetime.now().strftime("%Y-%m-%d-%H-%M-%S")}.json'
+    env = environment()
+    with open(outpath, 'w') as f_json:
+        json.dump({'env': env, 'params': params, 'results': results}, f_json, indent=2)
+        f_json.write('\n')
+    print('Results: ', outpath)
+
+    if args.compare:
+        with open(args.compare) as f_json:
+            baseline = json.load(f_json)
+        if baseline['params'] != params:
+            print('Warning: the baseline was run with different parameters: ', baseline['params'])
+        machine = {field: baseline['env'].get(field) for field in MACHINE_FIELDS
+                   if baseline['env'].get(field) != env[field]}
+        if machine:
+            print('Warning: the baseline was run on a different machine: ', machine)
+        rows = compare(results, baseline, args.threshold)
+        print(f'{"":>26} {"Rate":>12} {"Baseline":>12} {"Ratio":>8}')
+        for name, rate, baseline_rate, ratio, status in rows:
+            print(f'{name:>26} {rate:>12.0f} {baseline_rate:>12.0f} {ratio:>8.3f} {status}')
+        if any(status == 'REGRESSION' for *_, status in rows):
+            sys.exit(1)
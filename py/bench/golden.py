@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import json
+import socket
+import struct
+import tempfile
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from fc_kitnet import FCKitNET
+from fc_enidrift import FCENIDrift
+from flow_hash import HASH_BITS
+from trace_cache import load_trace
+from synth_trace import write_trace
+
+#
+# Golden-output equivalence of the FC engines.
+#
+# record: runs the reference engine (per packet feature_extract() + process()) on a trace and
+# stores its cur_stats stream (headers and the 21 stats of every packet) in a golden file
+# (compressed npz: one column per field, in the smallest integer type that holds it).
+# check: runs another engine on the same trace, with the same parameters, and diffs it
+# against the golden file: reports the first mismatching packet and fields, and the number
+# of mismatching packets (exit status 1 on any mismatch).
+# synth: writes a set of synthetic traces (SYNTH_TRACES, synth_trace.py, as tshark csv) and
+# records them. Their golden files hold the trace parameters instead of a trace path: check
+# reads the trace next to the golden file, or writes it again (in a temporary directory).
+#
+# GOLDEN_DIR (bench/golden/) holds the golden files of the synthetic set recorded with the FCs
+# of the baseline revision (meta 'revision'), before the register file, fixed-point, MathUnit
+# table and hash cache rewrites of process(): they pin the reference, and
+# tests/test_golden.py checks every engine against them. Do not re-record them with the
+# current FCs.
+#
+# Engines (ENGINES):
+#  process:     per packet feature_extract() + process() (reference).
+#  small_cache: same, with a 16-flow hash cache (FlowHashCache evictions).
+#  batch:       process_batch(), batch_size packets at a time.
+# A new engine is a generator of (headers, stats rows) chunks, added to ENGINES.
+#
+# KitNET: the packets before train_pkts are processed in the training phase, the others in
+# the execution phase (sampling).
+#
+# Usage:
+#
+#  python3 bench/golden.py synth -o eval/golden
+#  python3 bench/golden.py record trace.pcap --fc kitnet -s 64 --train-pkts 100000 -o eval/golden
+#  python3 bench/golden.py check eval/golden/*.npz -e batch --batch-size 4096
+#  python3 bench/golden.py check bench/golden/*.npz -e small_cache
+#
+
+STATS_FIELDS = [
+    'decay_cntr', 'mac_ip_src_pkt_cnt', 'mac_ip_src_mean', 'mac_ip_src_std_dev',
+    'ip_src_pkt_cnt', 'ip_src_mean', 'ip_src_std_dev', 'ip_pkt_cnt', 'ip_mean', 'ip_std_dev',
+    'ip_magnitude', 'ip_radius', 'ip_cov', 'ip_pcc', 'five_t_pkt_cnt', 'five_t_mean',
+    'five_t_std_dev', 'five_t_magnitude', 'five_t_radius', 'five_t_cov', 'five_t_pcc']
+
+# Header fields of cur_stats, per FC.
+HEADER_FIELDS = {
+    'kitnet': ['ts', 'mac_src', 'ip_src', 'ip_dst', 'ip_proto', 'port_src', 'port_dst'],
+    'enidrift': ['mac_src', 'ip_src', 'ip_dst', 'ip_proto', 'port_src', 'port_dst']}
+
+# Synthetic traces of the golden set (synth_trace.write_trace() parameters).
+SYNTH_TRACES = {
+    'synth-uniform': {'packets': 4000, 'flows': 200, 'rate': 100, 'dist': 'uniform'},
+    'synth-zipf': {'packets': 4000, 'flows': 2000, 'rate': 1000, 'dist': 'zipf'},
+    'synth-pareto': {'packets': 4000, 'flows': 5000, 'rate': 10000, 'dist': 'pareto',
+                     'skew': 1.5}}
+
+GOLDEN_DIR = f'{Path(__file__).parent}/golden'
+
+
+def ip_to_int(ip):
+    return struct.unpack('!I', socket.inet_aton(ip))[0]
+
+
+# Header values (as formatted by the FC) -> numbers.
+HEADER_PARSE = {
+    'ts': float, 'mac_src': lambda mac: int(mac.replace(':', ''), 16), 'ip_src': ip_to_int,
+    'ip_dst': ip_to_int, 'ip_proto': int, 'port_src': int, 'port_dst': int}
+
+
+def make_fc(meta, **kwargs):
+    if meta['fc'] == 'kitnet':
+        return FCKitNET(meta['trace'], meta['sampling'], meta['train_pkts'], 0, False,
+                        hash_bits=meta['hash_bits'], **kwargs)
+    return FCENIDrift(meta['trace'], meta['sampling'], hash_bits=meta['hash_bits'], **kwargs)
+
+
+def phase(meta, fc):
+    return 'training' if fc.global_pkt_index < meta['train_pkts'] else 'execution'
+
+
+# Per packet feature_extract() + process() of an FC: (headers, stats rows) chunks.
+def fc_process(meta, fc):
+    for _ in range(fc.trace_size()):
+        if meta['fc'] == 'kitnet':
+            pkt_phase = phase(meta, fc)
+            fc.feature_extract()
+            headers, stats = fc.process(pkt_phase)
+        else:
+            fc.feature_extract()
+            headers, stats = fc.process()
+        yield [headers], [stats]
+
+
+# process_batch() of an FC, batch_size packets at a time: (headers, stats rows) chunks.
+def fc_process_batch(meta, fc, batch_size):
+    while fc.global_pkt_index < fc.trace_size():
+        if meta['fc'] == 'kitnet':
+            headers, stats, _ = fc.process_batch(phase(meta, fc), batch_size)
+        else:
+            headers, stats, _ = fc.process_batch(batch_size)
+        yield headers, stats
+
+
+def engine_process(meta, batch_size, **kwargs):
+    return fc_process(meta, make_fc(meta, **kwargs))
+
+
+def engine_batch(meta, batch_size):
+    return fc_process_batch(meta, make_fc(meta), batch_size)
+
+
+ENGINES = {
+    'process': engine_process,
+    'small_cache': lambda meta, batch_size: engine_process(meta, batch_size, hash_cache_size=16),
+    'batch': engine_batch,
+}
+
+
+# Header and stats columns (field -> array) of a chunk of engine output.
+def chunk_columns(meta, headers, stats):
+    columns = {}
+    for field, values in zip(HEADER_FIELDS[meta['fc']], zip(*headers)):
+        columns[field] = np.array([HEADER_PARSE[field](value) for value in values],
+                                  dtype=np.float64 if field == 'ts' else np.int64)
+    stats = np.array(stats, dtype=np.int64).reshape(-1, len(STATS_FIELDS))
+    for i, field in enumerate(STATS_FIELDS):
+        columns[field] = stats[:, i]
+    return columns
+
+
+# Smallest integer type holding all the values of an int64 column.
+def compact(column):
+    if column.dtype != np.int64 or len(column) == 0:
+        return column
+    return column.astype(np.result_type(np.min_scalar_type(int(column.min())),
+                                        np.min_scalar_type(int(column.max()))))
+
+
+# trace: path of the trace, if not the one of meta (e.g. synthetic traces, see record_all()).
+def record(meta, outpath, trace=None):
+    engine_meta = meta if trace is None else dict(meta, trace=trace)
+    chunks = [chunk_columns(meta, headers, stats)
+              for headers, stats in ENGINES['process'](engine_meta, 0)]
+    fields = HEADER_FIELDS[meta['fc']] + STATS_FIELDS
+    columns = {field: compact(np.concatenate([chunk[field] for chunk in chunks]))
+               for field in fields}
+    meta = dict(meta, packets=len(columns['decay_cntr']))
+    np.savez_compressed(outpath, meta=json.dumps(meta), **columns)
+    return meta
+
+
+def load(golden_path):
+    with np.load(golden_path) as golden:
+        meta = json.loads(str(golden['meta']))
+        columns = {field: golden[field] for field in golden.files if field != 'meta'}
+    return meta, columns
+
+
+# Writes the synthetic trace of a golden file (meta 'synth') in outdir. Returns its path.
+def synth_trace(meta, outdir):
+    return write_trace(f'{outdir}/{meta["trace"]}', **meta['synth'])[0]
+
+
+# Diffs an engine against a golden file: (packets, mismatching packets, first mismatch).
+# First mismatch: (packet index, [(field, expected, got)]), None if the streams match.
+# trace: path of the trace, if not the one of the golden file.
+def check(golden_path, engine, batch_size, trace=None):
+    meta, golden = load(golden_path)
+    if trace is not None:
+        meta['trace'] = trace
+    fields = HEADER_FIELDS[meta['fc']] + STATS_FIELDS
+    packets = 0
+    mismatches = 0
+    first = None
+    for headers, stats in ENGINES[engine](meta, batch_size):
+        columns = chunk_columns(meta, headers, stats)
+        n = min(len(columns['decay_cntr']), meta['packets'] - packets)
+        diff = np.zeros(n, dtype=bool)
+        for field in fields:
+            diff |= golden[field][packets:packets + n] != columns[field][:n]
+        if first is None and diff.any():
+            i = int(np.argmax(diff))
+            first = (packets + i, [
+                (field, golden[field][packets + i].item(), columns[field][i].item())
+                for field in fields if golden[field][packets + i] != columns[field][i]])
+        mismatches += int(diff.sum())
+        packets += len(columns['decay_cntr'])
+    return packets, mismatches, first
+
+
+def golden_path(outdir, trace, fc):
+    return f'{outdir}/{Path(trace).stem}-{fc}.npz'
+
+
+# synth: {trace: write_trace() parameters} of synthetic traces, stored instead of their path.
+def record_all(traces, args, synth=None):
+    os.makedirs(args.out, exist_ok=True)
+    for trace in traces:
+        for fc in args.fc:
+            meta = {'fc': fc, 'trace': os.path.abspath(trace), 'sampling': args.sampling,
+                    'train_pkts': args.train_pkts, 'hash_bits': args.hash_bits}
+            if synth is not None:
+                meta = dict(meta, trace=os.path.basename(trace), synth=synth[trace])
+            if meta['train_pkts'] < 0:
+                meta['train_pkts'] = len(load_trace(trace)['ts']) // 2
+            outpath = golden_path(args.out, trace, fc)
+            meta = record(meta, outpath, trace)
+            print(f'Recorded: {outpath} ({meta["packets"]} packets, '
+                  f'{os.path.getsize(outpath)} bytes)')
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="peregrine-py FC golden outputs")
+    subparsers = argparser.add_subparsers(dest='command', required=True)
+    for command in ['record', 'synth']:
+        subparser = subparsers.add_parser(command)
+        if command == 'record':
+            subparser.add_argument('traces', type=str, nargs='+', help='Trace paths')
+        subparser.add_argument('-o', '--out', type=str,
+                               default=f'{Path(__file__).parents[1]}/eval/golden',
+                               help='Golden files directory')
+        subparser.add_argument('--fc', type=str, nargs='+', choices=list(HEADER_FIELDS),
+                               default=list(HEADER_FIELDS), help='FCs to record')
+        subparser.add_argument('-s', '--sampling', type=int, default=1, help='Sampling rate')
+        subparser.add_argument('--train-pkts', type=int, default=-1,
+                               help='KitNET training phase packets (default: half the trace)')
+        subparser.add_argument('--hash-bits', type=int, default=HASH_BITS, help='Hash size')
+    subparser = subparsers.add_parser('check')
+    subparser.add_argument('golden', type=str, nargs='+', help='Golden file paths')
+    subparser.add_argument('-e', '--engine', type=str, default='batch', choices=list(ENGINES),
+                           help='Engine to check')
+    subparser.add_argument('--batch-size', type=int, default=4096, help='Batch engine size')
+    args = argparser.parse_args()
+
+    if args.command == 'record':
+        record_all(args.traces, args)
+    elif args.command == 'synth':
+        os.makedirs(args.out, exist_ok=True)
+        synth = {write_trace(f'{args.out}/{name}.csv', **params)[0]: params
+                 for name, params in SYNTH_TRACES.items()}
+        record_all(list(synth), args, synth)
+    elif args.command == 'check':
+        failed = False
+        tmpdir = tempfile.TemporaryDirectory()
+        for path in args.golden:
+            meta, _ = load(path)
+            # Synthetic traces: next to the golden file, else written again.
+            trace = None
+            if 'synth' in meta:
+                trace = f'{os.path.dirname(path)}/{meta["trace"]}'
+                if not os.path.isfile(trace):
+                    trace = synth_trace(meta, tmpdir.name)
+            packets, mismatches, first = check(path, args.engine, args.batch_size, trace)
+            if packets != meta['packets']:
+                failed = True
+                print(f'{path}: {packets} packets, expected {meta["packets"]}')
+            if first is not None:
+                failed = True
+                index, fields = first
+                print(f'{path}: {mismatches} mismatching packets, first: packet {index}')
+                for field, expected, got in fields:
+                    print(f'  {field}: expected {expected}, got {got}')
+            elif packets == meta['packets']:
+                print(f'{path}: {packets} packets match')
+        if failed:
+            sys.exit(1)
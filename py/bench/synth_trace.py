@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import argparse
+import struct
+import numpy as np
+
+#
+# Deterministic synthetic traces (pcap + labels csv) for the benchmarks.
+#
+# The trace has a given number of packets and bidirectional flows (TCP/UDP over IPv4, between
+# a pool of hosts). Packets are assigned to flows following a flow size distribution:
+#  uniform: all flows have the same expected size.
+#  zipf:    the flow of rank k has a size proportional to 1 / k^skew (heavy hitters).
+#  pareto:  flow sizes drawn from a Pareto distribution of shape skew.
+# Interarrival times are exponential (Poisson arrivals, rate packets/s). Flow packet sizes
+# vary around a per-flow mean. A fraction of the flows (attack_ratio) is labeled as malicious.
+#
+# Only the headers are captured (caplen < len), so the files stay small. A path ending in .csv
+# gets the trace as a tshark fields csv instead (the fields read by the FC classes, see
+# trace_cache.CSV_FIELDS), as the FCs read traces before the pcap reader. Same parameters and
+# seed, same trace.
+#
+# Usage:
+#
+#  python3 bench/synth_trace.py -o /tmp/synth.pcap -n 100000 -f 1000 -r 10000 -d zipf
+#  # /tmp/synth.pcap, /tmp/synth-labels.csv
+#
+#  write_trace('/tmp/synth.pcap', packets=100000, flows=1000, rate=10000, dist='zipf')
+#
+
+FLOW_DISTS = ['uniform', 'zipf', 'pareto']
+
+TS_START = 1600000000.0
+
+PCAP_HDR = struct.Struct('<IHHiIII')
+RECORD_HDR = struct.Struct('<IIII')
+ETH_HDR = struct.Struct('!6s6sH')
+IP_HDR = struct.Struct('!BBHHHBBH4s4s')
+TCP_HDR = struct.Struct('!HHIIBBHHH')
+UDP_HDR = struct.Struct('!HHHH')
+
+ETH_HDR_LEN = 14
+ETHERTYPE_IPV4 = 0x0800
+LINKTYPE_ETHERNET = 1
+
+
+def labels_path(trace_path):
+    return trace_path.rsplit('.', 1)[0] + '-labels.csv'
+
+
+def flow_weights(rng, flows, dist, skew):
+    if dist == 'uniform':
+        weights = np.ones(flows)
+    elif dist == 'zipf':
+        weights = 1 / np.arange(1, flows + 1) ** skew
+    elif dist == 'pareto':
+        weights = rng.pareto(skew, flows) + 1
+    else:
+        raise ValueError(f"dist must be one of {FLOW_DISTS}")
+    return weights / weights.sum()
+
+
+# Columns of the trace packets (one array per header field) and their labels.
+def generate(packets, flows, rate, dist='zipf', skew=1.2, hosts=0, attack_ratio=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    hosts = hosts or max(2, flows // 4)
+
+    # Hosts: MAC and IPv4 address.
+    host_mac = rng.integers(1, 1 << 46, hosts, dtype=np.int64) << 1    # Unicast.
+    host_ip = rng.integers(0x0A000001, 0x0AFFFFFF, hosts, dtype=np.int64)
+
+    # Flows: hosts, proto, ports, mean packet size, label.
+    flow_src = rng.integers(0, hosts, flows)
+    flow_dst = (flow_src + rng.integers(1, hosts, flows)) % hosts
+    flow_proto = np.where(rng.random(flows) < 0.8, 6, 17)
+    flow_port_src = rng.integers(1024, 65536, flows)
+    flow_port_dst = rng.choice([22, 53, 80, 123, 443, 8080], flows)
+    flow_len = rng.integers(40, 1500, flows)
+    flow_label = np.zeros(flows, dtype=np.int64)
+    flow_label[rng.permutation(flows)[:int(flows * attack_ratio)]] = 1
+
+    # Packets: flow, direction, size, timestamp.
+    flow = rng.choice(flows, packets, p=flow_weights(rng, flows, dist, skew))
+    reply = rng.random(packets) < 0.5
+    src = np.where(reply, flow_dst[flow], flow_src[flow])
+    dst = np.where(reply, flow_src[flow], flow_dst[flow])
+    ip_len = np.clip(flow_len[flow] + rng.integers(-32, 33, packets), 40, 1500)
+    ts_usec = np.round(np.cumsum(rng.exponential(1 / rate, packets)) * 10**6).astype(np.int64)
+
+    trace = {
+        'ts_usec': ts_usec, 'ip_len': ip_len, 'eth_src': host_mac[src], 'eth_dst': host_mac[dst],
+        'ip_src': host_ip[src], 'ip_dst': host_ip[dst], 'ip_proto': flow_proto[flow],
+        'port_src': np.where(reply, flow_port_dst[flow], flow_port_src[flow]),
+        'port_dst': np.where(reply, flow_port_src[flow], flow_port_dst[flow])}
+    return trace, flow_label[flow]
+
+
+def write_pcap(path, trace):
+    ts_start_usec = int(TS_START * 10**6)
+    with open(path, 'wb') as f_pcap:
+        f_pcap.write(PCAP_HDR.pack(0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for i in range(len(trace['ts_usec'])):
+            proto = int(trace['ip_proto'][i])
+            ip_len = int(trace['ip_len'][i])
+            if proto == 6:
+                l4 = TCP_HDR.pack(int(trace['port_src'][i]), int(trace['port_dst'][i]),
+                                  i, 0, 0x50, 0x10, 65535, 0, 0)
+            else:
+                l4 = UDP_HDR.pack(int(trace['port_src'][i]), int(trace['port_dst'][i]),
+                                  ip_len - 20, 0)
+            frame = ETH_HDR.pack(int(trace['eth_dst'][i]).to_bytes(6, 'big'),
+                                 int(trace['eth_src'][i]).to_bytes(6, 'big'), ETHERTYPE_IPV4) + \
+                IP_HDR.pack(0x45, 0, ip_len, i & 0xFFFF, 0, 64, proto, 0,
+                            int(trace['ip_src'][i]).to_bytes(4, 'big'),
+                            int(trace['ip_dst'][i]).to_bytes(4, 'big')) + l4
+            ts = ts_start_usec + int(trace['ts_usec'][i])
+            f_pcap.write(RECORD_HDR.pack(ts // 10**6, ts % 10**6, len(frame),
+                                         ETH_HDR_LEN + ip_len))
+            f_pcap.write(frame)
+
+
+def format_mac(mac):
+    return ':'.join(f'{byte:02x}' for byte in int(mac).to_bytes(6, 'big'))
+
+
+def format_ip(ip):
+    return '.'.join(str(byte) for byte in int(ip).to_bytes(4, 'big'))
+
+
+# tshark -T fields -E header=y -E separator=, output (the fields of CSV_FIELDS, in the order of
+# the tshark command of the FC classes). Ports of the other L4 protocol are empty.
+def write_csv(path, trace):
+    with open(path, 'w') as f_csv:
+        f_csv.write('frame.time_epoch,frame.len,eth.src,eth.dst,ip.src,ip.dst,ip.len,ip.proto,'
+                    'tcp.srcport,tcp.dstport,udp.srcport,udp.dstport\n')
+        for i in range(len(trace['ts_usec'])):
+            ts = int(TS_START * 10**6) + int(trace['ts_usec'][i])
+            ports = f'{int(trace["port_src"][i])},{int(trace["port_dst"][i])}'
+            f_csv.write(
+                f'{ts // 10**6}.{ts % 10**6:06d},{ETH_HDR_LEN + int(trace["ip_len"][i])},'
+                f'{format_mac(trace["eth_src"][i])},{format_mac(trace["eth_dst"][i])},'
+                f'{format_ip(trace["ip_src"][i])},{format_ip(trace["ip_dst"][i])},'
+                f'{int(trace["ip_len"][i])},{int(trace["ip_proto"][i])},'
+                + (f'{ports},,\n' if trace['ip_proto'][i] == 6 else f',,{ports}\n'))
+
+
+def write_trace(path, packets, flows, rate, dist='zipf', skew=1.2, hosts=0, attack_ratio=0.1,
+                seed=0):
+    trace, labels = generate(packets, flows, rate, dist, skew, hosts, attack_ratio, seed)
+    if path.endswith('.csv'):
+        write_csv(path, trace)
+    else:
+        write_pcap(path, trace)
+    np.savetxt(labels_path(path), labels, fmt='%d')
+    return path, labels_path(path)
+
+
+def add_trace_args(argparser):
+    argparser.add_argument('-n', '--packets', type=int, default=20000, help='Packets')
+    argparser.add_argument('-f', '--flows', type=int, default=1000, help='Flows')
+    argparser.add_argument('-r', '--rate', type=float, default=10000, help='Packets/s')
+    argparser.add_argument('-d', '--dist', type=str, default='zipf', choices=FLOW_DISTS,
+                           help='Flow size distribution')
+    argparser.add_argument('-k', '--skew', type=float, default=1.2,
+                           help='Zipf exponent/Pareto shape')
+    argparser.add_argument('-s', '--seed', type=int, default=0, help='Random seed')
+
+
+def trace_args(args):
+    return {'packets': args.packets, 'flows': args.flows, 'rate': args.rate, 'dist': args.dist,
+            'skew': args.skew, 'seed': args.seed}
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="peregrine-py synthetic trace")
+    argparser.add_argument('-o', '--out', type=str, help='Output pcap path')
+    add_trace_args(argparser)
+    args = argparser.parse_args()
+
+    print('Written: ', write_trace(args.out, **trace_args(args)))
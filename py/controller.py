@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 
+import os
 import sys
+import signal
 import logging
 import argparse
 import time
 import yaml
-from eval_metrics import eval_kitnet, eval_enidrift, eval_whisper
+from pathlib import Path
+from eval_metrics import eval_kitnet, eval_enidrift, eval_whisper, ts_datetime
 from pipeline_kitnet import PipelineKitNET
 from pipeline_enidrift import PipelineENIDrift
 from pipeline_whisper import PipelineWhisper
+from metrics import Metrics
+from memory_report import MemoryReport
 
 logger = None
 
@@ -33,25 +38,75 @@ if __name__ == "__main__":
             conf['trace'], conf['labels'], conf['sampling'], conf['fc_sampling'],
             conf['exec_sampl_offset'], conf['fm_grace'], conf['ad_grace'], conf['max_ae'],
             conf['fm_model'], conf['el_model'], conf['ol_model'], conf['train_stats'],
-            conf['attack'], conf['train_exact_ratio'], conf['save_stats_global'], start)
+            conf['attack'], conf['train_exact_ratio'], conf['save_stats_global'], start,
+            conf['fc_batch_size'], conf['hash_bits'], conf['hash_telemetry'],
+            conf['flow_table_capacity'], conf['flow_table_idle_timeout'],
+            conf['exec_batch_size'], conf['train_workers'], conf['train_chunk_rows'],
+            conf['train_batch_size'], conf['inference_cache_size'],
+            conf['instrument'])
     elif args.plugin == 'enidrift':
         pipeline = PipelineENIDrift(
             conf['trace'], conf['labels'], conf['sampling'], conf['attack'], conf['hypr'],
-            conf['delta'], conf['incr'], conf['release_speed'])
+            conf['delta'], conf['incr'], conf['release_speed'], conf['save_stats_global'],
+            conf['fc_batch_size'], conf['hash_bits'], conf['hash_telemetry'],
+            conf['flow_table_capacity'], conf['flow_table_idle_timeout'],
+            conf['window_predict'], conf['update_max_stale'], conf['instrument'])
     elif args.plugin == 'whisper':
         pipeline = PipelineWhisper(conf['trace'], conf['labels'], conf['sampling'],
-                                   conf['train_size'], conf['dst_mac'])
+                                   conf['train_size'], conf['dst_mac'], conf['hash_bits'],
+                                   conf['instrument'])
+
+    # Switch the per-stage latency instrumentation on/off at runtime: kill -USR1 <pid>.
+    signal.signal(signal.SIGUSR1, lambda signum, frame: pipeline.instrument.toggle())
+
+    # Export the pipeline metrics (Prometheus textfile/HTTP) from a background thread.
+    metrics = None
+    if conf['metrics_path'] or conf['metrics_port']:
+        metrics = Metrics(pipeline, args.plugin, conf['metrics_path'], conf['metrics_port'],
+                          conf['metrics_interval'])
+        metrics.start()
+
+    # Sample the memory footprint of the pipeline structures from a background thread.
+    memory_report = None
+    if conf['memory_report_interval']:
+        memory_report = MemoryReport(pipeline, conf['memory_report_interval'],
+                                     conf['memory_report_tracemalloc'])
+        memory_report.start()
 
     pipeline.process()
 
+    if metrics is not None:
+        metrics.stop()
+    if memory_report is not None:
+        memory_report.stop()
+
     stop = time.time()
     total_time = stop - start
 
     print('Complete. Time elapsed: ', total_time)
+    if args.plugin in ['kitnet', 'enidrift']:
+        print('FC flow hash cache: ', pipeline.fc.hash_cache.summary())
+        if pipeline.fc.telemetry is not None:
+            print(pipeline.fc.telemetry.summary())
+        for key in ['mac_ip_src', 'ip_src', 'ip', 'five_t']:
+            print(f'Flow table {key}: ', getattr(pipeline, f'stats_{key}').summary())
+
+    if pipeline.instrument.stages:
+        print(pipeline.instrument.summary())
+        outdir = f'{Path(__file__).parents[0]}/eval/{args.plugin}'
+        os.makedirs(outdir, exist_ok=True)
+        pipeline.instrument.dump(f'{outdir}/{conf["attack"]}-instrument-{ts_datetime}.json')
+    if memory_report is not None:
+        print(memory_report.summary())
+        outdir = f'{Path(__file__).parents[0]}/eval/{args.plugin}'
+        os.makedirs(outdir, exist_ok=True)
+        memory_report.dump(f'{outdir}/{conf["attack"]}-memory-{ts_datetime}.json')
 
     # Call function to perform eval/csv.
     if args.plugin == 'kitnet':
         print('Threshold: ', pipeline.threshold)
+        if pipeline.inference_cache is not None:
+            print('Inference cache: ', pipeline.inference_cache.summary())
         eval_kitnet(
             pipeline.rmse_list, pipeline.stats_global, pipeline.peregrine_eval,
             pipeline.threshold, pipeline.det_init_time, pipeline.det_init_pkt_num,
@@ -0,0 +1,459 @@
+import numpy as np
+from fixed_point import log2_floor, shift_div, shift_mul, bit_length_array, \
+    log2_floor_array, shift_div_array, shift_mul_array
+from flow_hash import flow_hashes_array
+
+#
+# Batch feature computation for the FC classes (KitNET / ENIDrift).
+#
+# Computes the same 21-value cur_stats rows as FCKitNET.process() / FCENIDrift.process()
+# for a whole batch of packets, as a NumPy matrix, and leaves the register file in the same state.
+#
+# Packets only depend on each other through the register slots they share, so each flow key
+# is processed sorted by register index (stable, i.e. in packet order within each slot):
+#  - the first packet of each slot is updated from the register file, for all slots at once;
+#  - the following packets are segmented cumulative sums, up to the first decay of the slot;
+#  - only the packets of a slot after its first decay are processed sequentially.
+# The residues and the counters read by the reverse flow direction are resolved with a
+# last-writer lookup (sort by slot, forward fill), and the sums of residual products,
+# which are python ints and are halved on every decay, with a sequential pass over the batch.
+#
+# Usage (see FCKitNET.process_batch):
+#
+#  batch = FCBatch(registers, sqr, sqrt_mu, telemetry)
+#  stats = batch.process(pkts, decay_cntr, write, read)
+#
+
+# Trace columns of the packet fields, in the cur_pkt order.
+PKT_FIELDS = ['pkt_len', 'ts', 'mac_src', 'ip_src', 'ip_dst', 'ip_proto', 'port_src', 'port_dst']
+
+# Decay interval (s) of each decay counter.
+DECAY_INTERVALS = np.array([0.1, 1, 10, 60])
+
+# Sums of residual products up to this value are computed as int64.
+INT64_SAFE = 1 << 62
+
+
+def trace_columns(trace, start, end):
+    return [trace[field][start:end] for field in PKT_FIELDS]
+
+
+# Formats a column of header values, formatting each distinct value once.
+def format_column(values, formatter):
+    uniq, inverse = np.unique(values, return_inverse=True)
+    formatted = [formatter(value) for value in uniq.tolist()]
+    return [formatted[i] for i in inverse.tolist()]
+
+
+# Sorts the slots, keeping the packet order within each slot.
+# Returns the sort order, the first position of each slot segment and the rank of each packet.
+def segments(slots):
+    order = np.argsort(slots, kind='stable')
+    sorted_slots = slots[order]
+    start = np.ones(len(slots), dtype=bool)
+    start[1:] = sorted_slots[1:] != sorted_slots[:-1]
+    start_pos = np.flatnonzero(start)
+    seg = np.cumsum(start) - 1
+    rank = np.arange(len(slots)) - start_pos[seg]
+    return order, start_pos, seg, rank
+
+
+# Index of the last packet (<= i) that wrote write_slot[j] == read_slot[i], -1 if none.
+def last_write(write_slot, write_mask, read_slot):
+    n = len(read_slot)
+    write_idx = np.flatnonzero(write_mask)
+    ev_slot = np.concatenate((write_slot[write_idx], read_slot))
+    # A packet's own write comes before its read.
+    ev_pos = np.concatenate((2 * write_idx, 2 * np.arange(n) + 1))
+    ev_ref = np.concatenate((write_idx, np.full(n, -1)))
+
+    order = np.argsort(ev_slot * (2 * n) + ev_pos)
+    ev_slot = ev_slot[order]
+    ev_pos = ev_pos[order]
+    ev_ref = ev_ref[order]
+
+    pos = np.arange(len(order))
+    start = np.ones(len(order), dtype=bool)
+    start[1:] = ev_slot[1:] != ev_slot[:-1]
+    seg_start = np.maximum.accumulate(np.where(start, pos, 0))
+    last = np.maximum.accumulate(np.where(ev_ref >= 0, pos, -1))
+    found = last >= seg_start
+
+    reads = ev_ref < 0
+    result = np.full(n, -1)
+    result[ev_pos[reads] >> 1] = np.where(found[reads], ev_ref[np.maximum(last[reads], 0)], -1)
+    return result
+
+
+# Last packet index of each slot.
+def last_index(slots):
+    rev_slots, rev_idx = np.unique(slots[::-1], return_index=True)
+    return rev_slots, len(slots) - 1 - rev_idx
+
+
+class FCBatch:
+    def __init__(self, registers, sqr, sqrt_mu, telemetry=None):
+        self.registers = registers
+        self.hash_slots = registers.hash_slots
+        self.sqr = sqr
+        self.sqrt_mu = sqrt_mu
+        self.telemetry = telemetry              # HashTelemetry, if enabled.
+
+    def process(self, pkts, decay_cntr, write, read):
+        # pkts: pkt_len, ts, mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst (columns).
+        # decay_cntr: decay counter of each packet.
+        # write / read: each packet writes its counters for flow A->B / reads flow B->A's.
+        # The 2D statistics are only calculated for the packets that read.
+        pkt_len = np.asarray(pkts[0], dtype=np.int64)
+        ts = np.asarray(pkts[1], dtype=np.float64)
+        n = len(pkt_len)
+        if n == 0:
+            return np.zeros((0, 21), dtype=np.int64)
+
+        hashes = flow_hashes_array(*pkts[2:], hash_bits=self.registers.hash_bits)
+        if self.telemetry is not None:
+            self.telemetry.update_array(hashes, pkts[2:])
+        (hash_mac_ip_src, hash_ip_src,
+         hash_ip_0, hash_ip_1, hash_ip_xor,
+         hash_five_t_0, hash_five_t_1, hash_five_t_xor) = hashes
+
+        decay_offset = self.hash_slots * (decay_cntr - 1)
+        pkt_len_sqr = self.sqr.compute_array(pkt_len)
+
+        stats = np.zeros((n, 21), dtype=np.int64)
+        stats[:, 0] = decay_cntr
+
+        # 1D: Mac src, IP src
+        cnt, length, length_sqr, _, _ = self.update_1d(
+            'mac_ip_src', hash_mac_ip_src + decay_offset, ts, pkt_len, pkt_len_sqr)
+        stats[:, 1] = cnt
+        stats[:, 2], stats[:, 3] = self.stats_1d(cnt, length, length_sqr)
+
+        # 1D: IP src
+        cnt, length, length_sqr, _, _ = self.update_1d(
+            'ip_src', hash_ip_src + decay_offset, ts, pkt_len, pkt_len_sqr)
+        stats[:, 4] = cnt
+        stats[:, 5], stats[:, 6] = self.stats_1d(cnt, length, length_sqr)
+
+        # 1D/2D: IP, 5-tuple
+        stats_ip = self.update_2d(
+            'ip', hash_ip_0 + decay_offset, hash_ip_1 + decay_offset, hash_ip_xor + decay_offset,
+            ts, pkt_len, pkt_len_sqr, write, read)
+        stats_five_t = self.update_2d(
+            'five_t', hash_five_t_0 + decay_offset, hash_five_t_1 + decay_offset,
+            hash_five_t_xor + decay_offset, ts, pkt_len, pkt_len_sqr, write, read)
+
+        # cov/pcc may not fit in int64 (sums of residual products are python ints).
+        if stats_ip[5].dtype == object or stats_five_t[5].dtype == object:
+            stats = stats.astype(object)
+        for i in range(7):
+            stats[:, 7 + i] = stats_ip[i]
+            stats[:, 14 + i] = stats_five_t[i]
+
+        return stats
+
+    def stats_1d(self, cnt, length, length_sqr):
+        # Mean
+        mean = shift_div_array(length, cnt)
+
+        # Std. Dev
+        std_dev = self.sqrt_mu.compute_array(
+            np.abs(shift_div_array(length_sqr, cnt) - self.sqr.compute_array(mean)))
+
+        return [mean, std_dev]
+
+    def update_1d(self, key, slot, ts, pkt_len, pkt_len_sqr):
+        # Same as the decay check of a flow key, for a batch of packets.
+        # Returns the pkt count, length and length squared after each packet,
+        # if the packet applied the decay and if it initialized its slot.
+        stats_ts = self.registers[f'stats_{key}_ts']
+        stats_valid = self.registers[f'stats_{key}_valid']
+        stats = self.registers[f'stats_{key}']
+
+        n = len(slot)
+        order, start_pos, seg, rank = segments(slot)
+        slot = slot[order]
+        col = slot // self.hash_slots
+        t = ts[order]
+        x = pkt_len[order]
+        q = pkt_len_sqr[order]
+        interval = DECAY_INTERVALS[col]
+
+        # Register values (float64) after each packet, in slot order.
+        reg_ts = t.copy()
+        cnt = np.zeros(n)
+        length = np.zeros(n)
+        length_sqr = np.zeros(n)
+        decay = np.zeros(n, dtype=bool)
+        init = np.zeros(n, dtype=bool)
+
+        # First packet of each slot: update from the register file.
+        first_slot = slot[start_pos]
+        first_col = col[start_pos]
+        first_t = t[start_pos]
+        first_interval = interval[start_pos]
+        valid = stats_valid[first_slot]
+        prev_ts = stats_ts[first_slot, first_col]
+        prev_stats = stats[first_slot, first_col, :3]
+
+        first_decay = valid & (prev_ts != 0) & (first_t - prev_ts > first_interval)
+        init[start_pos] = ~valid
+        decay[start_pos] = first_decay
+        reg_ts[start_pos] = np.where(first_decay, prev_ts + first_interval, first_t)
+        cnt[start_pos] = np.where(
+            ~valid, 1, np.where(first_decay, np.trunc(0.5 * prev_stats[:, 0] + 1),
+                                prev_stats[:, 0] + 1))
+        length[start_pos] = np.where(
+            ~valid, x[start_pos], np.where(first_decay, np.trunc(0.5 * prev_stats[:, 1]),
+                                           prev_stats[:, 1] + x[start_pos]))
+        length_sqr[start_pos] = np.where(
+            ~valid, q[start_pos], np.where(first_decay, np.trunc(0.5 * prev_stats[:, 2]),
+                                           prev_stats[:, 2] + q[start_pos]))
+
+        # Following packets: while no decay is applied, the timestamp register follows the pkt
+        # timestamps and the counters are cumulative sums from the first packet.
+        prev_reg_ts = np.empty(n)
+        prev_reg_ts[0] = 0
+        prev_reg_ts[1:] = reg_ts[:-1]
+        decay_next = (rank > 0) & (prev_reg_ts != 0) & (t - prev_reg_ts > interval)
+
+        first_decay_rank = np.full(len(start_pos), n)
+        decay_pos = np.flatnonzero(decay_next)
+        decay_seg, decay_idx = np.unique(seg[decay_pos], return_index=True)
+        first_decay_rank[decay_seg] = rank[decay_pos[decay_idx]]
+
+        clean = (rank > 0) & (rank < first_decay_rank[seg])
+        seg_first = start_pos[seg]
+        cum_x = np.cumsum(np.where(rank > 0, x, 0))
+        cum_q = np.cumsum(np.where(rank > 0, q, 0))
+        cnt[clean] = (cnt[seg_first] + rank)[clean]
+        length[clean] = (length[seg_first] + (cum_x - cum_x[seg_first]))[clean]
+        length_sqr[clean] = (length_sqr[seg_first] + (cum_q - cum_q[seg_first]))[clean]
+
+        # Remaining packets of the slots with a decay: sequential, from the first decay.
+        dirty = np.flatnonzero(rank >= first_decay_rank[seg])
+        if len(dirty) > 0:
+            restart = (rank[dirty] == first_decay_rank[seg[dirty]]).tolist()
+            prev = dirty - 1
+            prev_state = zip(reg_ts[prev].tolist(), cnt[prev].tolist(), length[prev].tolist(),
+                             length_sqr[prev].tolist())
+            out_decay = []
+            out_ts = []
+            out_stats = []
+            r_ts = c = ln = ln_sqr = 0
+            for new_seg, state, step, tp, xp, qp in zip(
+                    restart, prev_state, interval[dirty].tolist(), t[dirty].tolist(),
+                    x[dirty].tolist(), q[dirty].tolist()):
+                if new_seg:
+                    r_ts, c, ln, ln_sqr = state
+                if r_ts and tp - r_ts > step:
+                    out_decay.append(True)
+                    r_ts += step
+                    c = int(0.5 * c + 1)
+                    ln = int(0.5 * ln)
+                    ln_sqr = int(0.5 * ln_sqr)
+                else:
+                    out_decay.append(False)
+                    r_ts = tp
+                    c = c + 1
+                    ln = ln + xp
+                    ln_sqr = ln_sqr + qp
+                out_ts.append(r_ts)
+                out_stats.append((c, ln, ln_sqr))
+            decay[dirty] = out_decay
+            reg_ts[dirty] = out_ts
+            out_stats = np.array(out_stats, dtype=np.float64)
+            cnt[dirty] = out_stats[:, 0]
+            length[dirty] = out_stats[:, 1]
+            length_sqr[dirty] = out_stats[:, 2]
+
+        # Write back the slot state after the last packet of each slot.
+        seg_end = np.append(start_pos[1:], n)
+        init_slots = slot[init]
+        stats_ts[init_slots] = 0
+        stats[init_slots] = 0
+        last = seg_end - 1
+        stats_valid[slot[last]] = True
+        stats_ts[slot[last], col[last]] = reg_ts[last]
+        stats[slot[last], col[last], 0] = cnt[last]
+        stats[slot[last], col[last], 1] = length[last]
+        stats[slot[last], col[last], 2] = length_sqr[last]
+
+        # Back to packet order.
+        inv = np.empty(n, dtype=np.int64)
+        inv[order] = np.arange(n)
+        return (cnt[inv].astype(np.int64), length[inv].astype(np.int64),
+                length_sqr[inv].astype(np.int64), decay[inv], init[inv])
+
+    def update_2d(self, key, slot_0, slot_1, slot_xor, ts, pkt_len, pkt_len_sqr, write, read):
+        # Returns the 7 stats columns of the flow key:
+        # pkt count, mean, std. dev, magnitude, radius, cov, pcc.
+        stats_valid = self.registers[f'stats_{key}_valid']
+        stats = self.registers[f'stats_{key}']
+        res = self.registers[f'{key}_res']
+        res_sum_ts = self.registers[f'{key}_res_sum_ts']
+        res_sum = self.registers[f'{key}_res_sum']
+
+        n = len(slot_0)
+        col = slot_0 // self.hash_slots
+
+        # Reverse direction values from before the batch.
+        prev_valid_1 = stats_valid[slot_1]
+        prev_res_1 = res[slot_1, col]
+        prev_stats_1 = stats[slot_1, col, 3:]
+
+        cnt, length, length_sqr, decay, init = \
+            self.update_1d(key, slot_0, ts, pkt_len, pkt_len_sqr)
+        mean, std_dev = self.stats_1d(cnt, length, length_sqr)
+
+        # Residues from flows A->B and B->A (every packet writes its residue).
+        res_0 = length - mean
+        res_writer = last_write(slot_0, np.ones(n, dtype=bool), slot_1)
+        valid_1 = prev_valid_1 | (res_writer >= 0)
+        res_1 = np.where(res_writer >= 0, res_0[np.maximum(res_writer, 0)], prev_res_1)
+        res_1 = np.where(valid_1, res_1, 0).astype(np.int64)
+
+        # Counters for flow B->A: written by the updates, zeroed by the slot initializations.
+        stats_writer = last_write(slot_0, write | init, slot_1)
+        written = np.stack((cnt, length_sqr, mean), axis=1)
+        found = stats_writer >= 0
+        writer = np.maximum(stats_writer, 0)
+        stats_1 = np.where(found[:, None],
+                           np.where(write[writer][:, None], written[writer], 0), prev_stats_1)
+        stats_1 = np.where(valid_1[:, None], stats_1, 0).astype(np.int64)
+
+        # Sums of residual products, in packet order.
+        sums = self.update_res_sum(
+            res_sum, res_sum_ts, slot_xor, col, ts, res_0, res_1, decay, init)
+
+        # 2D stats, for the packets that read flow B->A.
+        magnitude = np.zeros(n, dtype=np.int64)
+        radius = np.zeros(n, dtype=np.int64)
+        cov = np.zeros(n, dtype=np.int64)
+        pcc = np.zeros(n, dtype=np.int64)
+        if read.any():
+            cnt_0 = cnt[read]
+            cnt_1 = stats_1[read, 0]
+            mean_0 = mean[read]
+            mean_1 = stats_1[read, 2]
+            variance_0 = np.abs(shift_div_array(length_sqr[read], cnt_0)
+                                - self.sqr.compute_array(mean_0))
+            variance_1 = np.abs(shift_div_array(stats_1[read, 1], cnt_1)
+                                - self.sqr.compute_array(mean_1))
+            std_dev_0 = std_dev[read]
+            std_dev_1 = self.sqrt_mu.compute_array(variance_1)
+
+            magnitude[read] = self.sqrt_mu.compute_array(
+                self.sqr.compute_array(mean_0) + self.sqr.compute_array(mean_1))
+            radius[read] = self.sqrt_mu.compute_array(
+                self.sqr.compute_array(variance_0) + self.sqr.compute_array(variance_1))
+
+            if sums.dtype != object:
+                cov[read] = shift_div_array(sums[read], cnt_0 + cnt_1)
+                std_dev_prod = shift_mul_array(std_dev_0, std_dev_1)
+                pcc_valid = (log2_floor_array(std_dev_1) != 0) & \
+                    (log2_floor_array(std_dev_prod) != 0)
+                pcc[read] = np.where(pcc_valid, shift_div_array(cov[read], std_dev_prod), 0)
+            else:
+                cov = cov.astype(object)
+                pcc = pcc.astype(object)
+                read_idx = np.flatnonzero(read).tolist()
+                for i, value, cnt_sum, std_0, std_1 in zip(
+                        read_idx, sums[read].tolist(), (cnt_0 + cnt_1).tolist(),
+                        std_dev_0.tolist(), std_dev_1.tolist()):
+                    cov[i] = shift_div(value, cnt_sum)
+                    if log2_floor(std_1) != 0 and log2_floor(shift_mul(std_0, std_1)) != 0:
+                        pcc[i] = shift_div(cov[i], shift_mul(std_0, std_1))
+
+        # Write back the residues and the counters read by flow B->A.
+        slots, last = last_index(slot_0)
+        res[slots, col[last]] = res_0[last]
+        event_mask = write | init
+        event_idx = np.flatnonzero(event_mask)
+        slots, last = last_index(slot_0[event_idx])
+        last = event_idx[last]
+        stats[slots, col[last], 3:] = np.where(write[last][:, None], written[last], 0)
+
+        return [cnt, mean, std_dev, magnitude, radius, cov, pcc]
+
+    def update_res_sum(self, res_sum, res_sum_ts, slot_xor, col, ts, res_0, res_1, decay, init):
+        # Same as the sums of residual products updates (decay check and process()).
+        # Returns the sum after each packet: int64 if all sums fit, else python ints (object).
+        n = len(slot_xor)
+        order, start_pos, seg, rank = segments(slot_xor)
+        slot = slot_xor[order]
+        col = col[order]
+        t = ts[order]
+        res_0 = res_0[order]
+        res_1 = res_1[order]
+        decay = decay[order]
+        init = init[order]
+        seg_end = np.append(start_pos[1:], n)
+
+        first_slot = slot[start_pos]
+        first_col = col[start_pos]
+        start_sums = res_sum[first_slot, first_col].tolist()
+        start_ts = res_sum_ts[first_slot, first_col].tolist()
+        sums_ts = res_sum_ts[first_slot, first_col]
+
+        # Increments (the sum is not incremented by the packets that apply the decay).
+        add = (res_1 != 0) & ~decay
+        shift = log2_floor_array(res_1)
+        inc_bits = bit_length_array(np.abs(res_0)) + shift
+
+        # Slots without any decay in the batch: cumulative sums, while they fit in int64.
+        seg_decay = np.add.reduceat(decay, start_pos) > 0
+        if n < (1 << 20) and (n == 0 or inc_bits.max() < 40) and \
+                all(-(1 << 60) < value < (1 << 60) for value in start_sums):
+            inc = np.where(add, res_0 << shift, 0)
+            cum_inc = np.cumsum(inc)
+            seg_base = np.array(start_sums, dtype=np.int64) - (cum_inc - inc)[start_pos]
+            sums = seg_base[seg] + cum_inc
+            # The timestamp follows the last packet that did not initialize its slot.
+            updated = np.flatnonzero(~init)
+            updated_seg, updated_last = last_index(seg[updated])
+            sums_ts[updated_seg] = t[updated[updated_last]]
+        else:
+            sums = np.zeros(n, dtype=object)
+            seg_decay[:] = True
+
+        # Remaining slots: sequential (the sums are halved on each decay).
+        dirty = np.flatnonzero(seg_decay[seg])
+        if len(dirty) > 0:
+            out_sums = []
+            interval = DECAY_INTERVALS[col[dirty]].tolist()
+            seg_first = start_pos.tolist()
+            seg_last = (seg_end - 1).tolist()
+            value = value_ts = 0
+            for i, (s, p, tp, r_0, r_1, decayed, initialized) in enumerate(zip(
+                    seg[dirty].tolist(), dirty.tolist(), t[dirty].tolist(),
+                    res_0[dirty].tolist(), res_1[dirty].tolist(), decay[dirty].tolist(),
+                    init[dirty].tolist())):
+                if p == seg_first[s]:
+                    value = start_sums[s]
+                    value_ts = start_ts[s]
+                if not initialized:
+                    if decayed:
+                        value_ts += interval[i]
+                        value = int(0.5 * value)
+                    else:
+                        value_ts = tp
+                if r_1 != 0 and not decayed:
+                    value += shift_mul(r_0, r_1)
+                out_sums.append(value)
+                if p == seg_last[s]:
+                    sums_ts[s] = value_ts
+            if sums.dtype != object and \
+                    not all(-INT64_SAFE < value < INT64_SAFE for value in out_sums):
+                sums = sums.astype(object)
+            sums[dirty] = out_sums
+
+        # Write back the sums after the last packet of each slot (as python ints).
+        last = seg_end - 1
+        res_sum[first_slot, first_col] = [int(value) for value in sums[last].tolist()]
+        res_sum_ts[first_slot, first_col] = sums_ts
+
+        # Back to packet order.
+        inv = np.empty(n, dtype=np.int64)
+        inv[order] = np.arange(n)
+        return sums[inv]
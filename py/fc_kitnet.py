@@ -1,12 +1,14 @@
-import os
-import subprocess
-import pandas as pd
-import binascii
-import socket
-import struct
-from math import isnan, sqrt, pow, log
+import numpy as np
+from math import sqrt, pow
 from math_unit import MathUnit
-import crcmod
+from fixed_point import log2_floor, shift_div, shift_mul
+from flow_hash import FlowHashCache, HASH_CACHE_SIZE, HASH_BITS, flow_keys
+from hash_telemetry import HashTelemetry
+from instrument import Instrument
+from registers import Registers
+from fc_batch import FCBatch, trace_columns, format_column
+from pcap_reader import mac_to_str, ip_to_str
+from trace_cache import load_trace, decode_trace
 
 sqr = MathUnit(shift=1, invert=False, scale=-6,
                lookup=[x*x for x in range(15, -1, -1)])
@@ -18,10 +20,13 @@ sqrt_mu = MathUnit(shift=-1, invert=False, scale=-7,
 
 
 class FCKitNET:
-    def __init__(self, file_path, sampling_rate, train_pkts, offset, train_skip):
+    def __init__(self, file_path, sampling_rate, train_pkts, offset, train_skip,
+                 hash_cache_size=HASH_CACHE_SIZE, hash_bits=HASH_BITS,
+                 hash_telemetry=False, instrument=None):
         self.file_path = file_path              # Path of the trace file / csv.
-        self.df_csv = None                      # Dataframe for the trace csv.
-        self.cur_pkt = pd.DataFrame()           # Stats of the packet being processed.
+        self.trace = None                       # Columns of the trace (memory-mapped cache).
+        self.cur_pkt = []                       # Stats of the packet being processed.
+        self.cur_key = ()                       # Packed flow keys (flow_keys()) of the packet.
         self.sampling_rate = sampling_rate      # Sampling rate during the execution phase.
         self.exec_phase_offset = offset         # offset from which to start the sampling.
         self.train_pkts = train_pkts            # Number of packets in the training phase.
@@ -37,20 +42,40 @@ class FCKitNET:
         self.decay_ip = 1
         self.decay_five_t = 1
 
+        # Register file holding the flow state, indexed by hash + hash_slots * (decay_cntr - 1).
+        self.registers = Registers(hash_bits)
+        self.hash_slots = self.registers.hash_slots
+
+        # Hash collision telemetry (distinct keys per slot, collision rate, occupancy).
+        if hash_telemetry:
+            self.telemetry = HashTelemetry(hash_bits)
+        else:
+            self.telemetry = None
+
         # Calculated 1D and 2D statistics for all flow keys.
-        self.stats_mac_ip_src = {}
-        self.stats_ip_src = {}
-        self.stats_ip = {}
-        self.stats_five_t = {}
+        self.stats_mac_ip_src_ts = self.registers['stats_mac_ip_src_ts']
+        self.stats_mac_ip_src_valid = self.registers['stats_mac_ip_src_valid']
+        self.stats_mac_ip_src = self.registers['stats_mac_ip_src']
+        self.stats_ip_src_ts = self.registers['stats_ip_src_ts']
+        self.stats_ip_src_valid = self.registers['stats_ip_src_valid']
+        self.stats_ip_src = self.registers['stats_ip_src']
+        self.stats_ip_ts = self.registers['stats_ip_ts']
+        self.stats_ip_valid = self.registers['stats_ip_valid']
+        self.stats_ip = self.registers['stats_ip']
+        self.stats_five_t_ts = self.registers['stats_five_t_ts']
+        self.stats_five_t_valid = self.registers['stats_five_t_valid']
+        self.stats_five_t = self.registers['stats_five_t']
 
         # Support structures for residue calculation.
-        self.ip_res = {}
-        self.ip_res_sum = {}
-        self.five_t_res = {}
-        self.five_t_res_sum = {}
+        self.ip_res = self.registers['ip_res']
+        self.ip_res_sum_ts = self.registers['ip_res_sum_ts']
+        self.ip_res_sum = self.registers['ip_res_sum']
+        self.five_t_res = self.registers['five_t_res']
+        self.five_t_res_sum_ts = self.registers['five_t_res_sum_ts']
+        self.five_t_res_sum = self.registers['five_t_res_sum']
 
-        # CRC 16 parameters, following the TNA.
-        self.crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0x0000, xorOut=0x0000)
+        # Batch feature computation over the same registers (process_batch()).
+        self.batch = FCBatch(self.registers, sqr, sqrt_mu, self.telemetry)
 
         # Hash values for all flow keys.
         self.hash_mac_ip_src = 0
@@ -62,39 +87,30 @@ class FCKitNET:
         self.hash_five_t_1 = 0
         self.hash_five_t_xor = 0
 
-        # Check if the pcap -> csv already exists and pass it to a dataframe.
-        self.__check_csv__()
+        # Hashes of the most recent flows (LRU, with hit/miss counters).
+        self.hash_cache = FlowHashCache(hash_cache_size, hash_bits)
 
-    def __check_csv__(self):
-        # Check the file type.
-        file_path = self.file_path.split('.')[0]
+        # Per-stage latency instrumentation (feature_extract, hash, decay_check, stats_calc).
+        self.instrument = instrument if instrument is not None else Instrument()
 
-        if not os.path.isfile(file_path + '.csv'):
-            self.parse_pcap(self.file_path)
+        # Load the trace columns, converting the trace to the binary cache if needed.
+        self.__load_trace__()
 
-        self.df_csv = pd.read_csv(file_path + '.csv')
+    def __load_trace__(self):
+        # Traces previously converted with tshark are still read from their csv.
+        # Either way, only the first run parses the trace: later runs memory-map the cache.
+        # The columns are then decoded once into the per-packet fields.
+        self.trace = decode_trace(load_trace(self.file_path))
 
     def trace_size(self):
-        return len(self.df_csv)
+        return len(self.trace['ts'])
 
     def trace_initial_ts(self):
-        return float(self.df_csv.iat[0, 0])
-
-    def parse_pcap(self, pcap_path):
-        fields = "-e frame.time_epoch -e frame.len -e eth.src -e eth.dst \
-                    -e ip.src -e ip.dst -e ip.len -e ip.proto -e tcp.srcport \
-                    -e tcp.dstport -e udp.srcport -e udp.dstport -e icmp.type \
-                    -e icmp.code -e arp.opcode -e arp.src.hw_mac \
-                    -e arp.src.proto_ipv4 -e arp.dst.hw_mac -e arp.dst.proto_ipv4 \
-                    -e ipv6.src -e ipv6.dst"
-        cmd = 'tshark -r ' + pcap_path + ' -T fields ' + \
-            fields + ' -E separator=\',\' -E header=y -E occurrence=f > ' + self.file_path.split('.')[0] + '.csv'
-
-        print('Parsing pcap file to csv.')
-        subprocess.call(cmd, shell=True)
+        return float(self.trace['ts'][0])
 
     def feature_extract(self):
-        # Parse the next packet from the csv.
+        # Read the next packet from the trace.
+        t = self.instrument.start()
         if self.global_pkt_index == self.train_pkts:
             # self.stats_mac_ip_src = {}
             # self.stats_ip_src = {}
@@ -108,166 +124,93 @@ class FCKitNET:
             self.phase_pkt_index = 0
             self.global_pkt_index += self.exec_phase_offset
 
-        timestamp = float(self.df_csv.iat[self.global_pkt_index, 0])
-        mac_src = str(self.df_csv.iat[self.global_pkt_index, 2])
-        mac_dst = str(self.df_csv.iat[self.global_pkt_index, 3])
-        pkt_len = self.df_csv.iat[self.global_pkt_index, 6]
-        if isnan(pkt_len):
-            pkt_len = 0
-        ip_src = self.df_csv.iat[self.global_pkt_index, 4]
-        if str(ip_src) == 'nan':
-            ip_src = '0.0.0.0'
-        ip_dst = self.df_csv.iat[self.global_pkt_index, 5]
-        if str(ip_dst) == 'nan':
-            ip_dst = '0.0.0.0'
-        ip_proto = self.df_csv.iat[self.global_pkt_index, 7]
-        if isnan(ip_proto):
-            ip_proto = 0
-        if ip_proto == 17:
-            port_src = self.df_csv.iat[self.global_pkt_index, 10]
-            port_dst = self.df_csv.iat[self.global_pkt_index, 11]
-        elif ip_proto == 6:
-            port_src = self.df_csv.iat[self.global_pkt_index, 8]
-            port_dst = self.df_csv.iat[self.global_pkt_index, 9]
-        else:
-            port_src = 0
-            port_dst = 0
-        if isnan(port_src) or isnan(port_dst):
-            port_src = 0
-            port_dst = 0
-
+        i = self.global_pkt_index
         self.global_pkt_index = self.global_pkt_index + 1
         self.phase_pkt_index = self.phase_pkt_index + 1
-        self.cur_pkt = [pkt_len, timestamp, mac_dst, mac_src, ip_src, ip_dst,
-                        str(int(ip_proto)), str(int(port_src)), str(int(port_dst))]
+        self.cur_pkt = [
+            int(self.trace['pkt_len'][i]), float(self.trace['ts'][i]),
+            int(self.trace['mac_src'][i]), int(self.trace['ip_src'][i]),
+            int(self.trace['ip_dst'][i]), int(self.trace['ip_proto'][i]),
+            int(self.trace['port_src'][i]), int(self.trace['port_dst'][i])]
+        self.instrument.lap('feature_extract', t)
 
     def process(self, phase):
+        instrument = self.instrument
+        t = instrument.start()
+
         # Update the current decay counter value.
-        # If we're in the training phase or the sampling rate is 1,
-        # simply alternate the decay counter values.
-        if phase == 'training' or self.sampling_rate == 1:
-            if self.decay_cntr < 4:
-                self.decay_cntr += 1
-            else:
-                self.decay_cntr = 1
-        # Else, for every epoch we must skip a decay counter change.
-        # This is necessary to ensure that the sampled packets keep
-        # alternating the decay counter values.
-        # (As we have 4 decay values, any sampling_rate equal to a multiple would always
-        # result in packets with the same decay counters being sent to the classifier)
-        else:
-            if self.sampl_pkt_index < self.sampling_rate:
-                if self.decay_cntr < 4:
-                    self.decay_cntr += 1
-                else:
-                    self.decay_cntr = 1
-                self.sampl_pkt_index += 1
-            else:
-                self.sampl_pkt_index = 1
+        self.decay_cntr_update(phase)
 
         # Hash calculation.
-        # CRC16, sliced to 13 bits (0-8191).
-        # To each hash value we then sum 8192 * (self.decay_cntr - 1)
+        # CRC16, sliced to hash_bits bits (0-8191 by default).
+        # To each hash value we then sum self.hash_slots * (self.decay_cntr - 1)
         # in order to obtain the current position based on the decay counter value.
-        mac_src_bytes = binascii.unhexlify(self.cur_pkt[3].replace(':', ''))
-        ip_src_bytes = socket.inet_aton(self.cur_pkt[4])
-        ip_dst_bytes = socket.inet_aton(self.cur_pkt[5])
-        ip_proto_bytes = struct.pack("!B", int(self.cur_pkt[6]))
-        proto_src_bytes = struct.pack("!H", int(self.cur_pkt[7]))
-        proto_dst_bytes = struct.pack("!H", int(self.cur_pkt[8]))
-
-        hash_mac_ip_src_temp = self.crc16(mac_src_bytes)
-        hash_mac_ip_src_temp = '{:016b}'.format(self.crc16(ip_src_bytes, hash_mac_ip_src_temp))
-
-        self.hash_mac_ip_src = int(hash_mac_ip_src_temp[-13:], 2) + 8192 * (self.decay_cntr - 1)
-
-        hash_ip_src_temp = '{:016b}'.format(self.crc16(ip_src_bytes))
-        self.hash_ip_src = int(hash_ip_src_temp[-13:], 2) + 8192 * (self.decay_cntr - 1)
-
-        # Hash xor value is used to access the sum of residual products.
-        # Xor is used since the value is the same for both flow directions.
-
-        hash_ip_0_temp = self.crc16(ip_src_bytes)
-        hash_ip_0_temp = '{:016b}'.format(self.crc16(ip_dst_bytes, hash_ip_0_temp))
-        self.hash_ip_0 = int(hash_ip_0_temp[-13:], 2)
-
-        hash_ip_1_temp = self.crc16(ip_dst_bytes)
-        hash_ip_1_temp = '{:016b}'.format(self.crc16(ip_src_bytes, hash_ip_1_temp))
-        self.hash_ip_1 = int(hash_ip_1_temp[-13:], 2)
-
-        self.hash_ip_xor = self.hash_ip_0 ^ self.hash_ip_1
-
-        self.hash_ip_0 += 8192 * (self.decay_cntr - 1)
-        self.hash_ip_1 += 8192 * (self.decay_cntr - 1)
-        self.hash_ip_xor += 8192 * (self.decay_cntr - 1)
-
-        hash_five_t_0_temp = self.crc16(ip_src_bytes)
-        hash_five_t_0_temp = self.crc16(ip_dst_bytes, hash_five_t_0_temp)
-        hash_five_t_0_temp = self.crc16(ip_proto_bytes, hash_five_t_0_temp)
-        hash_five_t_0_temp = self.crc16(proto_src_bytes, hash_five_t_0_temp)
-        hash_five_t_0_temp = '{:016b}'.format(self.crc16(proto_dst_bytes, hash_five_t_0_temp))
-        self.hash_five_t_0 = int(hash_five_t_0_temp[-13:], 2)
-
-        hash_five_t_1_temp = self.crc16(ip_dst_bytes)
-        hash_five_t_1_temp = self.crc16(ip_src_bytes, hash_five_t_1_temp)
-        hash_five_t_1_temp = self.crc16(ip_proto_bytes, hash_five_t_1_temp)
-        hash_five_t_1_temp = self.crc16(proto_dst_bytes, hash_five_t_1_temp)
-        hash_five_t_1_temp = '{:016b}'.format(self.crc16(proto_src_bytes, hash_five_t_1_temp))
-        self.hash_five_t_1 = int(hash_five_t_1_temp[-13:], 2)
-
-        self.hash_five_t_xor = self.hash_five_t_0 ^ self.hash_five_t_1
-
-        self.hash_five_t_0 += 8192 * (self.decay_cntr - 1)
-        self.hash_five_t_1 += 8192 * (self.decay_cntr - 1)
-        self.hash_five_t_xor += 8192 * (self.decay_cntr - 1)
+        hashes = self.hash_cache.lookup(*self.cur_pkt[2:])
+        if self.telemetry is not None:
+            self.telemetry.update(hashes, self.cur_pkt[2:])
+        (self.hash_mac_ip_src, self.hash_ip_src,
+         self.hash_ip_0, self.hash_ip_1, self.hash_ip_xor,
+         self.hash_five_t_0, self.hash_five_t_1, self.hash_five_t_xor) = hashes
+
+        decay_offset = self.hash_slots * (self.decay_cntr - 1)
+        self.hash_mac_ip_src += decay_offset
+        self.hash_ip_src += decay_offset
+        self.hash_ip_0 += decay_offset
+        self.hash_ip_1 += decay_offset
+        self.hash_ip_xor += decay_offset
+        self.hash_five_t_0 += decay_offset
+        self.hash_five_t_1 += decay_offset
+        self.hash_five_t_xor += decay_offset
+        t = instrument.lap('hash', t)
 
         # Decay check for all flow keys.
         self.decay_check()
+        t = instrument.lap('decay_check', t)
 
         # Calculate the 1D/2D statistics for each flow key.
 
         # 1D: Mac src, IP src
-        mac_ip_src_pkt_cnt = int(self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][0])
+        mac_ip_src_pkt_cnt = int(self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 0])
         mac_ip_src_mean, mac_ip_src_std_dev = \
             self.stats_calc_1d(mac_ip_src_pkt_cnt,
-                               int(self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][1]),
-                               int(self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][2]))
+                               int(self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 1]),
+                               int(self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 2]))
         # 1D: IP src
-        ip_src_pkt_cnt = int(self.stats_ip_src[self.hash_ip_src][self.decay_cntr][0])
+        ip_src_pkt_cnt = int(self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 0])
         ip_src_mean, ip_src_std_dev = \
             self.stats_calc_1d(ip_src_pkt_cnt,
-                               int(self.stats_ip_src[self.hash_ip_src][self.decay_cntr][1]),
-                               int(self.stats_ip_src[self.hash_ip_src][self.decay_cntr][2]))
+                               int(self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 1]),
+                               int(self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 2]))
         # 1D: IP
 
-        ip_pkt_cnt_0 = int(self.stats_ip[self.hash_ip_0][self.decay_cntr][0])
-        ip_pkt_len = int(self.stats_ip[self.hash_ip_0][self.decay_cntr][1])
-        ip_pkt_len_sqr = int(self.stats_ip[self.hash_ip_0][self.decay_cntr][2])
+        ip_pkt_cnt_0 = int(self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 0])
+        ip_pkt_len = int(self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 1])
+        ip_pkt_len_sqr = int(self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 2])
         ip_mean_0, ip_std_dev_0 = \
             self.stats_calc_1d(ip_pkt_cnt_0, ip_pkt_len, ip_pkt_len_sqr)
 
         # Calculate the residual products from flows A->B and B->A.
         ip_res_0 = ip_pkt_len - ip_mean_0
-        self.ip_res[self.hash_ip_0][self.decay_cntr-1] = ip_res_0
-        if self.hash_ip_1 in self.stats_ip:
-            ip_res_1 = int(self.ip_res[self.hash_ip_1][self.decay_cntr-1])
+        self.ip_res[self.hash_ip_0, self.decay_cntr-1] = ip_res_0
+        if self.stats_ip_valid[self.hash_ip_1]:
+            ip_res_1 = int(self.ip_res[self.hash_ip_1, self.decay_cntr-1])
         else:
             ip_res_1 = 0
 
         # Update the Sum of Residual Products.
         if ip_res_1 != 0 and self.decay_ip == 1:
-            self.ip_res_sum[self.hash_ip_xor][self.decay_cntr] += (ip_res_0 << self.pow_2(ip_res_1))
+            self.ip_res_sum[self.hash_ip_xor, self.decay_cntr-1] += shift_mul(ip_res_0, ip_res_1)
 
         # Update the counters for flow A->B / Read the counters for flow B->A.
         # Training phase: both are performed for all flows.
         if phase == 'training' or self.sampling_rate == 1:
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][3] = ip_pkt_cnt_0
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][4] = ip_pkt_len_sqr
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][5] = ip_mean_0
-            if self.hash_ip_1 in self.stats_ip:
-                ip_pkt_cnt_1 = int(self.stats_ip[self.hash_ip_1][self.decay_cntr][3])
-                ip_pkt_len_sqr_1 = int(self.stats_ip[self.hash_ip_1][self.decay_cntr][4])
-                ip_mean_1 = int(self.stats_ip[self.hash_ip_1][self.decay_cntr][5])
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 3] = ip_pkt_cnt_0
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 4] = ip_pkt_len_sqr
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 5] = ip_mean_0
+            if self.stats_ip_valid[self.hash_ip_1]:
+                ip_pkt_cnt_1 = int(self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 3])
+                ip_pkt_len_sqr_1 = int(self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 4])
+                ip_mean_1 = int(self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 5])
             else:
                 ip_pkt_cnt_1 = 0
                 ip_pkt_len_sqr_1 = 0
@@ -277,15 +220,15 @@ class FCKitNET:
         # and reading the previously stored counters for flow B->A according to the sampling rate.
         elif self.phase_pkt_index % self.sampling_rate != 0:
             # Update
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][3] = ip_pkt_cnt_0
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][4] = ip_pkt_len_sqr
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][5] = ip_mean_0
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 3] = ip_pkt_cnt_0
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 4] = ip_pkt_len_sqr
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 5] = ip_mean_0
         else:
             # Read
-            if self.hash_ip_1 in self.stats_ip:
-                ip_pkt_cnt_1 = int(self.stats_ip[self.hash_ip_1][self.decay_cntr][3])
-                ip_pkt_len_sqr_1 = int(self.stats_ip[self.hash_ip_1][self.decay_cntr][4])
-                ip_mean_1 = int(self.stats_ip[self.hash_ip_1][self.decay_cntr][5])
+            if self.stats_ip_valid[self.hash_ip_1]:
+                ip_pkt_cnt_1 = int(self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 3])
+                ip_pkt_len_sqr_1 = int(self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 4])
+                ip_mean_1 = int(self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 5])
             else:
                 ip_pkt_cnt_1 = 0
                 ip_pkt_len_sqr_1 = 0
@@ -293,34 +236,34 @@ class FCKitNET:
 
         # 1D: 5-tuple
 
-        five_t_pkt_cnt_0 = int(self.stats_five_t[self.hash_five_t_0][self.decay_cntr][0])
-        five_t_pkt_len = int(self.stats_five_t[self.hash_five_t_0][self.decay_cntr][1])
-        five_t_pkt_len_sqr = int(self.stats_five_t[self.hash_five_t_0][self.decay_cntr][2])
+        five_t_pkt_cnt_0 = int(self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 0])
+        five_t_pkt_len = int(self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 1])
+        five_t_pkt_len_sqr = int(self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 2])
         five_t_mean_0, five_t_std_dev_0 = \
             self.stats_calc_1d(five_t_pkt_cnt_0, five_t_pkt_len, five_t_pkt_len_sqr)
 
         # Calculate the residual products from flows A->B and B->A.
         five_t_res_0 = five_t_pkt_len - five_t_mean_0
-        self.five_t_res[self.hash_five_t_0][self.decay_cntr-1] = five_t_res_0
-        if self.hash_five_t_1 in self.stats_five_t:
-            five_t_res_1 = int(self.five_t_res[self.hash_five_t_1][self.decay_cntr-1])
+        self.five_t_res[self.hash_five_t_0, self.decay_cntr-1] = five_t_res_0
+        if self.stats_five_t_valid[self.hash_five_t_1]:
+            five_t_res_1 = int(self.five_t_res[self.hash_five_t_1, self.decay_cntr-1])
         else:
             five_t_res_1 = 0
 
         # Update the Sum of Residual Products.
         if five_t_res_1 != 0 and self.decay_five_t == 1:
-            self.five_t_res_sum[self.hash_five_t_xor][self.decay_cntr] += (five_t_res_0 << self.pow_2(five_t_res_1))
+            self.five_t_res_sum[self.hash_five_t_xor, self.decay_cntr-1] += shift_mul(five_t_res_0, five_t_res_1)
 
         # Update the counters for flow A->B / Read the counters for flow B->A.
         # Training phase: both are performed for all flows.
         if phase == 'training' or self.sampling_rate == 1:
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][3] = five_t_pkt_cnt_0
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][4] = five_t_pkt_len_sqr
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][5] = five_t_mean_0
-            if self.hash_five_t_1 in self.stats_five_t:
-                five_t_pkt_cnt_1 = int(self.stats_five_t[self.hash_five_t_1][self.decay_cntr][3])
-                five_t_pkt_len_sqr_1 = int(self.stats_five_t[self.hash_five_t_1][self.decay_cntr][4])
-                five_t_mean_1 = int(self.stats_five_t[self.hash_five_t_1][self.decay_cntr][5])
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 3] = five_t_pkt_cnt_0
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 4] = five_t_pkt_len_sqr
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 5] = five_t_mean_0
+            if self.stats_five_t_valid[self.hash_five_t_1]:
+                five_t_pkt_cnt_1 = int(self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 3])
+                five_t_pkt_len_sqr_1 = int(self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 4])
+                five_t_mean_1 = int(self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 5])
             else:
                 five_t_pkt_cnt_1 = 0
                 five_t_pkt_len_sqr_1 = 0
@@ -330,15 +273,15 @@ class FCKitNET:
         # and reading the previously stored counters for flow B->A according to the sampling rate.
         elif self.phase_pkt_index % self.sampling_rate != 0:
             # Update
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][3] = five_t_pkt_cnt_0
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][4] = five_t_pkt_len_sqr
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][5] = five_t_mean_0
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 3] = five_t_pkt_cnt_0
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 4] = five_t_pkt_len_sqr
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 5] = five_t_mean_0
         else:
             # Read
-            if self.hash_five_t_1 in self.stats_five_t:
-                five_t_pkt_cnt_1 = int(self.stats_five_t[self.hash_five_t_1][self.decay_cntr][3])
-                five_t_pkt_len_sqr_1 = int(self.stats_five_t[self.hash_five_t_1][self.decay_cntr][4])
-                five_t_mean_1 = int(self.stats_five_t[self.hash_five_t_1][self.decay_cntr][5])
+            if self.stats_five_t_valid[self.hash_five_t_1]:
+                five_t_pkt_cnt_1 = int(self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 3])
+                five_t_pkt_len_sqr_1 = int(self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 4])
+                five_t_mean_1 = int(self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 5])
             else:
                 five_t_pkt_cnt_1 = 0
                 five_t_pkt_len_sqr_1 = 0
@@ -346,16 +289,16 @@ class FCKitNET:
 
         # 2D: IP
 
-        ip_variance_0 = abs((ip_pkt_len_sqr >> self.pow_2(ip_pkt_cnt_0))
+        ip_variance_0 = abs(shift_div(ip_pkt_len_sqr, ip_pkt_cnt_0)
                             - sqr.compute(ip_mean_0))
 
         if phase == 'training' or self.phase_pkt_index % self.sampling_rate == 0:
-            ip_variance_1 = abs((ip_pkt_len_sqr_1 >> self.pow_2(ip_pkt_cnt_1))
+            ip_variance_1 = abs(shift_div(ip_pkt_len_sqr_1, ip_pkt_cnt_1)
                                 - sqr.compute(ip_mean_1))
             ip_std_dev_1 = sqrt_mu.compute(ip_variance_1)
             ip_magnitude, ip_radius, ip_cov, ip_pcc \
                 = self.stats_calc_2d(ip_pkt_cnt_0, ip_pkt_cnt_1, ip_mean_0, ip_mean_1,
-                                     int(self.ip_res_sum[self.hash_ip_xor][self.decay_cntr]),
+                                     int(self.ip_res_sum[self.hash_ip_xor, self.decay_cntr-1]),
                                      ip_variance_0, ip_variance_1, ip_std_dev_0, ip_std_dev_1)
         else:
             ip_magnitude = 0
@@ -365,17 +308,17 @@ class FCKitNET:
 
         # 2D: 5-tuple
 
-        five_t_variance_0 = abs((five_t_pkt_len_sqr >> self.pow_2(five_t_pkt_cnt_0))
+        five_t_variance_0 = abs(shift_div(five_t_pkt_len_sqr, five_t_pkt_cnt_0)
                                 - sqr.compute(five_t_mean_0))
 
         if phase == 'training' or self.phase_pkt_index % self.sampling_rate == 0:
-            five_t_variance_1 = abs((five_t_pkt_len_sqr_1 >> self.pow_2(five_t_pkt_cnt_1))
+            five_t_variance_1 = abs(shift_div(five_t_pkt_len_sqr_1, five_t_pkt_cnt_1)
                                     - sqr.compute(five_t_mean_1))
             five_t_std_dev_1 = sqrt_mu.compute(five_t_variance_1)
             five_t_magnitude, five_t_radius, five_t_cov, five_t_pcc \
                 = self.stats_calc_2d(five_t_pkt_cnt_0, five_t_pkt_cnt_1,
                                      five_t_mean_0, five_t_mean_1,
-                                     int(self.five_t_res_sum[self.hash_five_t_xor][self.decay_cntr]),
+                                     int(self.five_t_res_sum[self.hash_five_t_xor, self.decay_cntr-1]),
                                      five_t_variance_0, five_t_variance_1,
                                      five_t_std_dev_0, five_t_std_dev_1)
         else:
@@ -393,112 +336,70 @@ class FCKitNET:
                      int(five_t_pkt_cnt_0), int(five_t_mean_0), int(five_t_std_dev_0),
                      int(five_t_magnitude), int(five_t_radius), int(five_t_cov), int(five_t_pcc)]
 
-        self.cur_pkt = [self.cur_pkt[1]] + self.cur_pkt[3:]
+        # Timestamp, mac src, ip_src, ip_dst, ip_proto, port_src, port_dst.
+        # The headers are only formatted here, for the packets sent to the classifier.
+        self.cur_key = flow_keys(*self.cur_pkt[2:])
+        self.cur_pkt = [
+            self.cur_pkt[1], mac_to_str(self.cur_pkt[2]), ip_to_str(self.cur_pkt[3]),
+            ip_to_str(self.cur_pkt[4]), str(self.cur_pkt[5]), str(self.cur_pkt[6]),
+            str(self.cur_pkt[7])]
 
+        instrument.lap('stats_calc', t)
         return [self.cur_pkt, cur_stats]
 
     def process_exact(self, phase):
+        instrument = self.instrument
+        t = instrument.start()
+
         # Update the current decay counter value.
-        # If we're in the training phase or the sampling rate is 1,
-        # simply alternate the decay counter values.
-        if phase == 'training' or self.sampling_rate == 1:
-            if self.decay_cntr < 4:
-                self.decay_cntr += 1
-            else:
-                self.decay_cntr = 1
-        # Else, for every epoch we must skip a decay counter change.
-        # This is necessary to ensure that the sampled packets keep
-        # alternating the decay counter values.
-        # (As we have 4 decay values, any sampling_rate equal to a multiple would always
-        # result in packets with the same decay counters being sent to the classifier)
-        else:
-            if self.sampl_pkt_index < self.sampling_rate:
-                if self.decay_cntr < 4:
-                    self.decay_cntr += 1
-                else:
-                    self.decay_cntr = 1
-                self.sampl_pkt_index += 1
-            else:
-                self.sampl_pkt_index = 1
+        self.decay_cntr_update(phase)
 
         # Hash calculation.
-        # CRC16, sliced to 13 bits (0-8191).
-        # To each hash value we then sum 8192 * (self.decay_cntr - 1)
+        # CRC16, sliced to hash_bits bits (0-8191 by default).
+        # To each hash value we then sum self.hash_slots * (self.decay_cntr - 1)
         # in order to obtain the current position based on the decay counter value.
-        mac_src_bytes = binascii.unhexlify(self.cur_pkt[3].replace(':', ''))
-        ip_src_bytes = socket.inet_aton(self.cur_pkt[4])
-        ip_dst_bytes = socket.inet_aton(self.cur_pkt[5])
-        ip_proto_bytes = struct.pack("!B", int(self.cur_pkt[6]))
-        proto_src_bytes = struct.pack("!H", int(self.cur_pkt[7]))
-        proto_dst_bytes = struct.pack("!H", int(self.cur_pkt[8]))
-
-        hash_mac_ip_src_temp = self.crc16(mac_src_bytes)
-        hash_mac_ip_src_temp = '{:016b}'.format(self.crc16(ip_src_bytes, hash_mac_ip_src_temp))
-        self.hash_mac_ip_src = int(hash_mac_ip_src_temp[-13:], 2) + 8192 * (self.decay_cntr - 1)
-
-        hash_ip_src_temp = '{:016b}'.format(self.crc16(ip_src_bytes))
-        self.hash_ip_src = int(hash_ip_src_temp[-13:], 2) + 8192 * (self.decay_cntr - 1)
-
-        # Hash xor value is used to access the sum of residual products.
-        # Xor is used since the value is the same for both flow directions.
-
-        hash_ip_0_temp = self.crc16(ip_src_bytes)
-        hash_ip_0_temp = '{:016b}'.format(self.crc16(ip_dst_bytes, hash_ip_0_temp))
-        self.hash_ip_0 = int(hash_ip_0_temp[-13:], 2)
-
-        hash_ip_1_temp = self.crc16(ip_dst_bytes)
-        hash_ip_1_temp = '{:016b}'.format(self.crc16(ip_src_bytes, hash_ip_1_temp))
-        self.hash_ip_1 = int(hash_ip_1_temp[-13:], 2)
-
-        self.hash_ip_xor = self.hash_ip_0 ^ self.hash_ip_1
-
-        self.hash_ip_0 += 8192 * (self.decay_cntr - 1)
-        self.hash_ip_1 += 8192 * (self.decay_cntr - 1)
-        self.hash_ip_xor += 8192 * (self.decay_cntr - 1)
-
-        hash_five_t_0_temp = self.crc16(ip_src_bytes)
-        hash_five_t_0_temp = self.crc16(ip_dst_bytes, hash_five_t_0_temp)
-        hash_five_t_0_temp = self.crc16(ip_proto_bytes, hash_five_t_0_temp)
-        hash_five_t_0_temp = self.crc16(proto_src_bytes, hash_five_t_0_temp)
-        hash_five_t_0_temp = '{:016b}'.format(self.crc16(proto_dst_bytes, hash_five_t_0_temp))
-        self.hash_five_t_0 = int(hash_five_t_0_temp[-13:], 2)
-
-        hash_five_t_1_temp = self.crc16(ip_dst_bytes)
-        hash_five_t_1_temp = self.crc16(ip_src_bytes, hash_five_t_1_temp)
-        hash_five_t_1_temp = self.crc16(ip_proto_bytes, hash_five_t_1_temp)
-        hash_five_t_1_temp = self.crc16(proto_dst_bytes, hash_five_t_1_temp)
-        hash_five_t_1_temp = '{:016b}'.format(self.crc16(proto_src_bytes, hash_five_t_1_temp))
-        self.hash_five_t_1 = int(hash_five_t_1_temp[-13:], 2)
-
-        self.hash_five_t_xor = self.hash_five_t_0 ^ self.hash_five_t_1
-
-        self.hash_five_t_0 += 8192 * (self.decay_cntr - 1)
-        self.hash_five_t_1 += 8192 * (self.decay_cntr - 1)
-        self.hash_five_t_xor += 8192 * (self.decay_cntr - 1)
+        hashes = self.hash_cache.lookup(*self.cur_pkt[2:])
+        if self.telemetry is not None:
+            self.telemetry.update(hashes, self.cur_pkt[2:])
+        (self.hash_mac_ip_src, self.hash_ip_src,
+         self.hash_ip_0, self.hash_ip_1, self.hash_ip_xor,
+         self.hash_five_t_0, self.hash_five_t_1, self.hash_five_t_xor) = hashes
+
+        decay_offset = self.hash_slots * (self.decay_cntr - 1)
+        self.hash_mac_ip_src += decay_offset
+        self.hash_ip_src += decay_offset
+        self.hash_ip_0 += decay_offset
+        self.hash_ip_1 += decay_offset
+        self.hash_ip_xor += decay_offset
+        self.hash_five_t_0 += decay_offset
+        self.hash_five_t_1 += decay_offset
+        self.hash_five_t_xor += decay_offset
+        t = instrument.lap('hash', t)
 
         # Decay check for all flow keys.
         self.decay_check_exact()
+        t = instrument.lap('decay_check', t)
 
         # Calculate the 1D/2D statistics for each flow key.
 
         # 1D: Mac src, IP src
-        mac_ip_src_pkt_cnt = self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][0]
+        mac_ip_src_pkt_cnt = self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 0]
         mac_ip_src_mean, mac_ip_src_std_dev = self.stats_calc_1d_exact(
                 mac_ip_src_pkt_cnt,
-                self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][1],
-                self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][2])
+                self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 1],
+                self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 2])
 
         # 1D: IP src
-        ip_src_pkt_cnt = self.stats_ip_src[self.hash_ip_src][self.decay_cntr][0]
+        ip_src_pkt_cnt = self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 0]
         ip_src_mean, ip_src_std_dev = self.stats_calc_1d_exact(
             ip_src_pkt_cnt,
-            self.stats_ip_src[self.hash_ip_src][self.decay_cntr][1],
-            self.stats_ip_src[self.hash_ip_src][self.decay_cntr][2])
+            self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 1],
+            self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 2])
         # 1D: IP
 
-        ip_pkt_cnt_0 = self.stats_ip[self.hash_ip_0][self.decay_cntr][0]
-        ip_pkt_len = self.stats_ip[self.hash_ip_0][self.decay_cntr][1]
-        ip_pkt_len_sqr = self.stats_ip[self.hash_ip_0][self.decay_cntr][2]
+        ip_pkt_cnt_0 = self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 0]
+        ip_pkt_len = self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 1]
+        ip_pkt_len_sqr = self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 2]
         ip_mean_0, ip_std_dev_0 = self.stats_calc_1d_exact(
                 ip_pkt_cnt_0,
                 ip_pkt_len,
@@ -506,26 +407,26 @@ class FCKitNET:
 
         # Calculate the residual products from flows A->B and B->A.
         ip_res_0 = ip_pkt_len - ip_mean_0
-        self.ip_res[self.hash_ip_0][self.decay_cntr-1] = ip_res_0
-        if self.hash_ip_1 in self.stats_ip:
-            ip_res_1 = self.ip_res[self.hash_ip_1][self.decay_cntr-1]
+        self.ip_res[self.hash_ip_0, self.decay_cntr-1] = ip_res_0
+        if self.stats_ip_valid[self.hash_ip_1]:
+            ip_res_1 = self.ip_res[self.hash_ip_1, self.decay_cntr-1]
         else:
             ip_res_1 = 0
 
         # Update the Sum of Residual Products.
         if ip_res_1 != 0 and self.decay_ip == 1:
-            self.ip_res_sum[self.hash_ip_xor][self.decay_cntr] += (ip_res_0 * ip_res_1)
+            self.ip_res_sum[self.hash_ip_xor, self.decay_cntr-1] += (ip_res_0 * ip_res_1)
 
         # Update the counters for flow A->B / Read the counters for flow B->A.
         # Training phase: both are performed for all flows.
         if phase == 'training' or self.sampling_rate == 1:
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][3] = ip_pkt_cnt_0
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][4] = ip_pkt_len_sqr
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][5] = ip_mean_0
-            if self.hash_ip_1 in self.stats_ip:
-                ip_pkt_cnt_1 = self.stats_ip[self.hash_ip_1][self.decay_cntr][3]
-                ip_pkt_len_sqr_1 = self.stats_ip[self.hash_ip_1][self.decay_cntr][4]
-                ip_mean_1 = self.stats_ip[self.hash_ip_1][self.decay_cntr][5]
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 3] = ip_pkt_cnt_0
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 4] = ip_pkt_len_sqr
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 5] = ip_mean_0
+            if self.stats_ip_valid[self.hash_ip_1]:
+                ip_pkt_cnt_1 = self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 3]
+                ip_pkt_len_sqr_1 = self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 4]
+                ip_mean_1 = self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 5]
             else:
                 ip_pkt_cnt_1 = 0
                 ip_pkt_len_sqr_1 = 0
@@ -535,15 +436,15 @@ class FCKitNET:
         # and reading the previously stored counters for flow B->A according to the sampling rate.
         elif self.phase_pkt_index % self.sampling_rate != 0:
             # Update
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][3] = ip_pkt_cnt_0
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][4] = ip_pkt_len_sqr
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][5] = ip_mean_0
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 3] = ip_pkt_cnt_0
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 4] = ip_pkt_len_sqr
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 5] = ip_mean_0
         else:
             # Read
-            if self.hash_ip_1 in self.stats_ip:
-                ip_pkt_cnt_1 = self.stats_ip[self.hash_ip_1][self.decay_cntr][3]
-                ip_pkt_len_sqr_1 = self.stats_ip[self.hash_ip_1][self.decay_cntr][4]
-                ip_mean_1 = self.stats_ip[self.hash_ip_1][self.decay_cntr][5]
+            if self.stats_ip_valid[self.hash_ip_1]:
+                ip_pkt_cnt_1 = self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 3]
+                ip_pkt_len_sqr_1 = self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 4]
+                ip_mean_1 = self.stats_ip[self.hash_ip_1, self.decay_cntr-1, 5]
             else:
                 ip_pkt_cnt_1 = 0
                 ip_pkt_len_sqr_1 = 0
@@ -551,9 +452,9 @@ class FCKitNET:
 
         # 1D: 5-tuple
 
-        five_t_pkt_cnt_0 = self.stats_five_t[self.hash_five_t_0][self.decay_cntr][0]
-        five_t_pkt_len = self.stats_five_t[self.hash_five_t_0][self.decay_cntr][1]
-        five_t_pkt_len_sqr = self.stats_five_t[self.hash_five_t_0][self.decay_cntr][2]
+        five_t_pkt_cnt_0 = self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 0]
+        five_t_pkt_len = self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 1]
+        five_t_pkt_len_sqr = self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 2]
         five_t_mean_0, five_t_std_dev_0 = \
             self.stats_calc_1d_exact(
                 five_t_pkt_cnt_0,
@@ -562,27 +463,27 @@ class FCKitNET:
 
         # Calculate the residual products from flows A->B and B->A.
         five_t_res_0 = five_t_pkt_len - five_t_mean_0
-        self.five_t_res[self.hash_five_t_0][self.decay_cntr-1] = five_t_res_0
-        if self.hash_five_t_1 in self.stats_five_t:
-            five_t_res_1 = self.five_t_res[self.hash_five_t_1][self.decay_cntr-1]
+        self.five_t_res[self.hash_five_t_0, self.decay_cntr-1] = five_t_res_0
+        if self.stats_five_t_valid[self.hash_five_t_1]:
+            five_t_res_1 = self.five_t_res[self.hash_five_t_1, self.decay_cntr-1]
         else:
             five_t_res_1 = 0
 
         # Update the Sum of Residual Products.
         if five_t_res_1 != 0 and self.decay_five_t == 1:
-            self.five_t_res_sum[self.hash_five_t_xor][self.decay_cntr] += \
+            self.five_t_res_sum[self.hash_five_t_xor, self.decay_cntr-1] += \
                 (five_t_res_0 * five_t_res_1)
 
         # Update the counters for flow A->B / Read the counters for flow B->A.
         # Training phase: both are performed for all flows.
         if phase == 'training' or self.sampling_rate == 1:
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][3] = five_t_pkt_cnt_0
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][4] = five_t_pkt_len_sqr
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][5] = five_t_mean_0
-            if self.hash_five_t_1 in self.stats_five_t:
-                five_t_pkt_cnt_1 = self.stats_five_t[self.hash_five_t_1][self.decay_cntr][3]
-                five_t_pkt_len_sqr_1 = self.stats_five_t[self.hash_five_t_1][self.decay_cntr][4]
-                five_t_mean_1 = self.stats_five_t[self.hash_five_t_1][self.decay_cntr][5]
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 3] = five_t_pkt_cnt_0
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 4] = five_t_pkt_len_sqr
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 5] = five_t_mean_0
+            if self.stats_five_t_valid[self.hash_five_t_1]:
+                five_t_pkt_cnt_1 = self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 3]
+                five_t_pkt_len_sqr_1 = self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 4]
+                five_t_mean_1 = self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 5]
             else:
                 five_t_pkt_cnt_1 = 0
                 five_t_pkt_len_sqr_1 = 0
@@ -592,15 +493,15 @@ class FCKitNET:
         # and reading the previously stored counters for flow B->A according to the sampling rate.
         elif self.phase_pkt_index % self.sampling_rate != 0:
             # Update
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][3] = five_t_pkt_cnt_0
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][4] = five_t_pkt_len_sqr
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][5] = five_t_mean_0
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 3] = five_t_pkt_cnt_0
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 4] = five_t_pkt_len_sqr
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 5] = five_t_mean_0
         else:
             # Read
-            if self.hash_five_t_1 in self.stats_five_t:
-                five_t_pkt_cnt_1 = self.stats_five_t[self.hash_five_t_1][self.decay_cntr][3]
-                five_t_pkt_len_sqr_1 = self.stats_five_t[self.hash_five_t_1][self.decay_cntr][4]
-                five_t_mean_1 = self.stats_five_t[self.hash_five_t_1][self.decay_cntr][5]
+            if self.stats_five_t_valid[self.hash_five_t_1]:
+                five_t_pkt_cnt_1 = self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 3]
+                five_t_pkt_len_sqr_1 = self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 4]
+                five_t_mean_1 = self.stats_five_t[self.hash_five_t_1, self.decay_cntr-1, 5]
             else:
                 five_t_pkt_cnt_1 = 0
                 five_t_pkt_len_sqr_1 = 0
@@ -619,7 +520,7 @@ class FCKitNET:
             ip_magnitude, ip_radius, ip_cov, ip_pcc \
                 = self.stats_calc_2d_exact(
                     ip_pkt_cnt_0, ip_pkt_cnt_1, ip_mean_0, ip_mean_1,
-                    self.ip_res_sum[self.hash_ip_xor][self.decay_cntr],
+                    self.ip_res_sum[self.hash_ip_xor, self.decay_cntr-1],
                     ip_variance_0, ip_variance_1, ip_std_dev_0, ip_std_dev_1)
         else:
             ip_magnitude = 0
@@ -643,7 +544,7 @@ class FCKitNET:
                 = self.stats_calc_2d_exact(
                     five_t_pkt_cnt_0, five_t_pkt_cnt_1,
                     five_t_mean_0, five_t_mean_1,
-                    self.five_t_res_sum[self.hash_five_t_xor][self.decay_cntr],
+                    self.five_t_res_sum[self.hash_five_t_xor, self.decay_cntr-1],
                     five_t_variance_0, five_t_variance_1,
                     five_t_std_dev_0, five_t_std_dev_1)
         else:
@@ -660,17 +561,100 @@ class FCKitNET:
                      int(five_t_pkt_cnt_0), int(five_t_mean_0), int(five_t_std_dev_0),
                      int(five_t_magnitude), int(five_t_radius), int(five_t_cov), int(five_t_pcc)]
 
-        # Timestamp, mac src, ip_src, ip_dst, ip_proto, port_src, port_dst
-        self.cur_pkt = [self.cur_pkt[1]] + self.cur_pkt[3:]
+        # Timestamp, mac src, ip_src, ip_dst, ip_proto, port_src, port_dst.
+        # The headers are only formatted here, for the packets sent to the classifier.
+        self.cur_key = flow_keys(*self.cur_pkt[2:])
+        self.cur_pkt = [
+            self.cur_pkt[1], mac_to_str(self.cur_pkt[2]), ip_to_str(self.cur_pkt[3]),
+            ip_to_str(self.cur_pkt[4]), str(self.cur_pkt[5]), str(self.cur_pkt[6]),
+            str(self.cur_pkt[7])]
 
+        instrument.lap('stats_calc', t)
         return [self.cur_pkt, cur_stats]
 
+    def decay_cntr_update(self, phase):
+        # If we're in the training phase or the sampling rate is 1,
+        # simply alternate the decay counter values.
+        if phase == 'training' or self.sampling_rate == 1:
+            if self.decay_cntr < 4:
+                self.decay_cntr += 1
+            else:
+                self.decay_cntr = 1
+        # Else, for every epoch we must skip a decay counter change.
+        # This is necessary to ensure that the sampled packets keep
+        # alternating the decay counter values.
+        # (As we have 4 decay values, any sampling_rate equal to a multiple would always
+        # result in packets with the same decay counters being sent to the classifier)
+        else:
+            if self.sampl_pkt_index < self.sampling_rate:
+                if self.decay_cntr < 4:
+                    self.decay_cntr += 1
+                else:
+                    self.decay_cntr = 1
+                self.sampl_pkt_index += 1
+            else:
+                self.sampl_pkt_index = 1
+
+    def process_batch(self, phase, batch_size):
+        # Same as feature_extract() + process(phase) for the next batch_size packets.
+        # A batch stops at the end of the training phase and at the end of the trace.
+        # Returns the packet headers (as in process()), the cur_stats rows, as a NumPy matrix,
+        # and the packed flow keys of each packet (as cur_key).
+        if self.global_pkt_index == self.train_pkts:
+            self.decay_cntr = 1
+            self.phase_pkt_index = 0
+            self.global_pkt_index += self.exec_phase_offset
+
+        start = self.global_pkt_index
+        end = min(start + batch_size, self.trace_size())
+        if start < self.train_pkts:
+            end = min(end, self.train_pkts)
+        n = max(end - start, 0)
+
+        if phase == 'training' or self.sampling_rate == 1:
+            decay_cntr = (self.decay_cntr + np.arange(n)) % 4 + 1
+            if n > 0:
+                self.decay_cntr = int(decay_cntr[-1])
+        else:
+            decay_cntr = np.empty(n, dtype=np.int64)
+            for i in range(n):
+                self.decay_cntr_update(phase)
+                decay_cntr[i] = self.decay_cntr
+
+        # Update the counters for flow A->B / read the counters for flow B->A (see process()).
+        phase_pkt_index = self.phase_pkt_index + np.arange(1, n + 1)
+        if phase == 'training' or self.sampling_rate == 1:
+            write = np.ones(n, dtype=bool)
+            read = write
+        else:
+            write = phase_pkt_index % self.sampling_rate != 0
+            read = ~write
+
+        self.global_pkt_index = start + n
+        self.phase_pkt_index += n
+
+        pkts = trace_columns(self.trace, start, start + n)
+        stats = self.batch.process(pkts, decay_cntr, write, read)
+
+        # Timestamp, mac src, ip_src, ip_dst, ip_proto, port_src, port_dst.
+        headers = list(map(list, zip(
+            pkts[1].tolist(), format_column(pkts[2], mac_to_str),
+            format_column(pkts[3], ip_to_str), format_column(pkts[4], ip_to_str),
+            format_column(pkts[5], str), format_column(pkts[6], str),
+            format_column(pkts[7], str))))
+        keys = list(map(flow_keys, *[column.tolist() for column in pkts[2:]]))
+        if n > 0:
+            self.cur_pkt = headers[-1]
+            self.cur_key = keys[-1]
+
+        return [headers, stats, keys]
+
     def stats_calc_1d(self, pkt_cnt, pkt_len, pkt_len_sqr):
         # Mean
-        mean = pkt_len >> self.pow_2(pkt_cnt)
+        mean = shift_div(pkt_len, pkt_cnt)
 
         # Std. Dev
-        std_dev = int(sqrt_mu.compute(abs((pkt_len_sqr >> self.pow_2(pkt_cnt)) - sqr.compute(mean))))
+        std_dev = int(sqrt_mu.compute(abs(shift_div(pkt_len_sqr, pkt_cnt) - sqr.compute(mean))))
 
         return [mean, std_dev]
 
@@ -692,11 +676,11 @@ class FCKitNET:
         radius = sqrt_mu.compute(sqr.compute(variance_0) + sqr.compute(variance_1))
 
         # Covariance
-        cov = res_sum >> self.pow_2(pkt_cnt_0 + pkt_cnt_1)
+        cov = shift_div(res_sum, pkt_cnt_0 + pkt_cnt_1)
 
         # PCC
-        if self.pow_2(std_dev_1) != 0 and self.pow_2(std_dev_0 << self.pow_2(std_dev_1)) != 0:
-            pcc = cov >> self.pow_2(std_dev_0 << self.pow_2(std_dev_1))
+        if log2_floor(std_dev_1) != 0 and log2_floor(shift_mul(std_dev_0, std_dev_1)) != 0:
+            pcc = shift_div(cov, shift_mul(std_dev_0, std_dev_1))
         else:
             pcc = 0
 
@@ -732,62 +716,60 @@ class FCKitNET:
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_mac_ip_src in self.stats_mac_ip_src:
+        if self.stats_mac_ip_src_valid[self.hash_mac_ip_src]:
             mac_ip_src_ts_interval = \
-                self.cur_pkt[1] - self.stats_mac_ip_src[self.hash_mac_ip_src][0][self.decay_cntr-1]
+                self.cur_pkt[1] - self.stats_mac_ip_src_ts[self.hash_mac_ip_src, self.decay_cntr-1]
 
             decay = 1
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
-            if self.stats_mac_ip_src[self.hash_mac_ip_src][0][self.decay_cntr-1]:
+            if self.stats_mac_ip_src_ts[self.hash_mac_ip_src, self.decay_cntr-1]:
                 if self.decay_cntr == 1 and mac_ip_src_ts_interval > 0.1:
                     decay = 0.5
-                    self.stats_mac_ip_src[self.hash_mac_ip_src][0][0] += 0.1
+                    self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 0] += 0.1
                 elif self.decay_cntr == 2 and mac_ip_src_ts_interval > 1:
                     decay = 0.5
-                    self.stats_mac_ip_src[self.hash_mac_ip_src][0][1] += 1
+                    self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 1] += 1
                 elif self.decay_cntr == 3 and mac_ip_src_ts_interval > 10:
                     decay = 0.5
-                    self.stats_mac_ip_src[self.hash_mac_ip_src][0][2] += 10
+                    self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 2] += 10
                 elif self.decay_cntr == 4 and mac_ip_src_ts_interval > 60:
                     decay = 0.5
-                    self.stats_mac_ip_src[self.hash_mac_ip_src][0][3] += 60
+                    self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 3] += 60
                 else:
-                    self.stats_mac_ip_src[self.hash_mac_ip_src][0][self.decay_cntr-1] = self.cur_pkt[1]
+                    self.stats_mac_ip_src_ts[self.hash_mac_ip_src, self.decay_cntr-1] = self.cur_pkt[1]
             else:
-                self.stats_mac_ip_src[self.hash_mac_ip_src][0][self.decay_cntr-1] = self.cur_pkt[1]
+                self.stats_mac_ip_src_ts[self.hash_mac_ip_src, self.decay_cntr-1] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][0] = \
-                int(decay * self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][0] + 1)
+            self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 0] = \
+                int(decay * self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 0] + 1)
 
             # If the decay will not be applied, simply update the values from the current pkt.
             # Else, update the values with the current decay factor.
             if decay == 1:
                 # Pkt length.
-                self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][1] = \
-                    int(self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][1] + self.cur_pkt[0])
+                self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 1] = \
+                    int(self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 1] + self.cur_pkt[0])
                 # Pkt length squared.
-                self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][2] = \
-                    int(self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][2] + sqr.compute(self.cur_pkt[0]))
+                self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 2] = \
+                    int(self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 2] + sqr.compute(self.cur_pkt[0]))
             else:
                 # Pkt length.
-                self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][1] = \
-                    int(decay * self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][1])
+                self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 1] = \
+                    int(decay * self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 1])
                 # Pkt length squared.
-                self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][2] = \
-                    int(decay * self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr][2])
+                self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 2] = \
+                    int(decay * self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1, 2])
 
         else:
-            self.stats_mac_ip_src[self.hash_mac_ip_src] = ([[0, 0, 0, 0],
-                                                            [0, 0, 0],
-                                                            [0, 0, 0],
-                                                            [0, 0, 0],
-                                                            [0, 0, 0]])
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][self.decay_cntr-1] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][self.decay_cntr] = \
+            self.stats_mac_ip_src_valid[self.hash_mac_ip_src] = True
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src] = 0
+            self.stats_mac_ip_src[self.hash_mac_ip_src] = 0
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, self.decay_cntr-1] = self.cur_pkt[1]
+            self.stats_mac_ip_src[self.hash_mac_ip_src, self.decay_cntr-1] = \
                 [1, self.cur_pkt[0], sqr.compute(self.cur_pkt[0])]
 
         # IP src
@@ -795,217 +777,199 @@ class FCKitNET:
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_ip_src in self.stats_ip_src:
-            ip_src_ts_interval = self.cur_pkt[1] - self.stats_ip_src[self.hash_ip_src][0][self.decay_cntr-1]
+        if self.stats_ip_src_valid[self.hash_ip_src]:
+            ip_src_ts_interval = self.cur_pkt[1] - self.stats_ip_src_ts[self.hash_ip_src, self.decay_cntr-1]
 
             decay = 1
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
-            if self.stats_ip_src[self.hash_ip_src][0][self.decay_cntr-1]:
+            if self.stats_ip_src_ts[self.hash_ip_src, self.decay_cntr-1]:
                 if self.decay_cntr == 1 and ip_src_ts_interval > 0.1:
                     decay = 0.5
-                    self.stats_ip_src[self.hash_ip_src][0][0] += 0.1
+                    self.stats_ip_src_ts[self.hash_ip_src, 0] += 0.1
                 elif self.decay_cntr == 2 and ip_src_ts_interval > 1:
                     decay = 0.5
-                    self.stats_ip_src[self.hash_ip_src][0][1] += 1
+                    self.stats_ip_src_ts[self.hash_ip_src, 1] += 1
                 elif self.decay_cntr == 3 and ip_src_ts_interval > 10:
                     decay = 0.5
-                    self.stats_ip_src[self.hash_ip_src][0][2] += 10
+                    self.stats_ip_src_ts[self.hash_ip_src, 2] += 10
                 elif self.decay_cntr == 4 and ip_src_ts_interval > 60:
                     decay = 0.5
-                    self.stats_ip_src[self.hash_ip_src][0][3] += 60
+                    self.stats_ip_src_ts[self.hash_ip_src, 3] += 60
                 else:
-                    self.stats_ip_src[self.hash_ip_src][0][self.decay_cntr-1] = self.cur_pkt[1]
+                    self.stats_ip_src_ts[self.hash_ip_src, self.decay_cntr-1] = self.cur_pkt[1]
             else:
-                self.stats_ip_src[self.hash_ip_src][0][self.decay_cntr-1] = self.cur_pkt[1]
+                self.stats_ip_src_ts[self.hash_ip_src, self.decay_cntr-1] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_ip_src[self.hash_ip_src][self.decay_cntr][0] = \
-                int(decay * self.stats_ip_src[self.hash_ip_src][self.decay_cntr][0] + 1)
+            self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 0] = \
+                int(decay * self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 0] + 1)
 
             # If the decay will not be applied, simply update the values from the current pkt.
             # Else, update the values with the current decay factor.
             if decay == 1:
                 # Pkt length.
-                self.stats_ip_src[self.hash_ip_src][self.decay_cntr][1] = \
-                    int(self.stats_ip_src[self.hash_ip_src][self.decay_cntr][1] + self.cur_pkt[0])
+                self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 1] = \
+                    int(self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 1] + self.cur_pkt[0])
                 # Pkt length squared.
-                self.stats_ip_src[self.hash_ip_src][self.decay_cntr][2] = \
-                    int(self.stats_ip_src[self.hash_ip_src][self.decay_cntr][2] + sqr.compute(self.cur_pkt[0]))
+                self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 2] = \
+                    int(self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 2] + sqr.compute(self.cur_pkt[0]))
             else:
                 # Pkt length.
-                self.stats_ip_src[self.hash_ip_src][self.decay_cntr][1] = \
-                    int(decay * self.stats_ip_src[self.hash_ip_src][self.decay_cntr][1])
+                self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 1] = \
+                    int(decay * self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 1])
                 # Pkt length squared.
-                self.stats_ip_src[self.hash_ip_src][self.decay_cntr][2] = \
-                    int(decay * self.stats_ip_src[self.hash_ip_src][self.decay_cntr][2])
+                self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 2] = \
+                    int(decay * self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1, 2])
 
         else:
-            self.stats_ip_src[self.hash_ip_src] = ([[0, 0, 0, 0],
-                                                    [0, 0, 0],
-                                                    [0, 0, 0],
-                                                    [0, 0, 0],
-                                                    [0, 0, 0]])
-            self.stats_ip_src[self.hash_ip_src][0][self.decay_cntr-1] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][self.decay_cntr] = \
+            self.stats_ip_src_valid[self.hash_ip_src] = True
+            self.stats_ip_src_ts[self.hash_ip_src] = 0
+            self.stats_ip_src[self.hash_ip_src] = 0
+            self.stats_ip_src_ts[self.hash_ip_src, self.decay_cntr-1] = self.cur_pkt[1]
+            self.stats_ip_src[self.hash_ip_src, self.decay_cntr-1] = \
                 [1, self.cur_pkt[0], sqr.compute(self.cur_pkt[0])]
 
         # IP
 
-        if self.hash_ip_0 not in self.ip_res:
-            self.ip_res[self.hash_ip_0] = [0, 0, 0, 0]
-
-        if self.hash_ip_xor not in self.ip_res_sum:
-            self.ip_res_sum[self.hash_ip_xor] = ([[0, 0, 0, 0], 0, 0, 0, 0])
-
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_ip_0 in self.stats_ip:
-            ip_ts_interval = self.cur_pkt[1] - self.stats_ip[self.hash_ip_0][0][self.decay_cntr-1]
+        if self.stats_ip_valid[self.hash_ip_0]:
+            ip_ts_interval = self.cur_pkt[1] - self.stats_ip_ts[self.hash_ip_0, self.decay_cntr-1]
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
-            if self.stats_ip[self.hash_ip_0][0][self.decay_cntr-1]:
+            if self.stats_ip_ts[self.hash_ip_0, self.decay_cntr-1]:
                 if self.decay_cntr == 1 and ip_ts_interval > 0.1:
                     self.decay_ip = 0.5
-                    self.stats_ip[self.hash_ip_0][0][0] += 0.1
-                    self.ip_res_sum[self.hash_ip_xor][0][0] += 0.1
+                    self.stats_ip_ts[self.hash_ip_0, 0] += 0.1
+                    self.ip_res_sum_ts[self.hash_ip_xor, 0] += 0.1
                 elif self.decay_cntr == 2 and ip_ts_interval > 1:
                     self.decay_ip = 0.5
-                    self.stats_ip[self.hash_ip_0][0][1] += 1
-                    self.ip_res_sum[self.hash_ip_xor][0][1] += 1
+                    self.stats_ip_ts[self.hash_ip_0, 1] += 1
+                    self.ip_res_sum_ts[self.hash_ip_xor, 1] += 1
                 elif self.decay_cntr == 3 and ip_ts_interval > 10:
                     self.decay_ip = 0.5
-                    self.stats_ip[self.hash_ip_0][0][2] += 10
-                    self.ip_res_sum[self.hash_ip_xor][0][2] += 10
+                    self.stats_ip_ts[self.hash_ip_0, 2] += 10
+                    self.ip_res_sum_ts[self.hash_ip_xor, 2] += 10
                 elif self.decay_cntr == 4 and ip_ts_interval > 60:
                     self.decay_ip = 0.5
-                    self.stats_ip[self.hash_ip_0][0][3] += 60
-                    self.ip_res_sum[self.hash_ip_xor][0][3] += 60
+                    self.stats_ip_ts[self.hash_ip_0, 3] += 60
+                    self.ip_res_sum_ts[self.hash_ip_xor, 3] += 60
                 else:
-                    self.stats_ip[self.hash_ip_0][0][self.decay_cntr-1] = self.cur_pkt[1]
-                    self.ip_res_sum[self.hash_ip_xor][0][self.decay_cntr-1] = self.cur_pkt[1]
+                    self.stats_ip_ts[self.hash_ip_0, self.decay_cntr-1] = self.cur_pkt[1]
+                    self.ip_res_sum_ts[self.hash_ip_xor, self.decay_cntr-1] = self.cur_pkt[1]
             else:
-                self.stats_ip[self.hash_ip_0][0][self.decay_cntr-1] = self.cur_pkt[1]
-                self.ip_res_sum[self.hash_ip_xor][0][self.decay_cntr-1] = self.cur_pkt[1]
+                self.stats_ip_ts[self.hash_ip_0, self.decay_cntr-1] = self.cur_pkt[1]
+                self.ip_res_sum_ts[self.hash_ip_xor, self.decay_cntr-1] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_ip[self.hash_ip_0][self.decay_cntr][0] = \
-                int(self.decay_ip * self.stats_ip[self.hash_ip_0][self.decay_cntr][0] + 1)
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 0] = \
+                int(self.decay_ip * self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 0] + 1)
 
             # If the decay will not be applied, simply update the values from the current pkt.
             # Else, update the values with the current decay factor.
             if self.decay_ip == 1:
                 # Pkt length.
-                self.stats_ip[self.hash_ip_0][self.decay_cntr][1] = \
-                    int(self.stats_ip[self.hash_ip_0][self.decay_cntr][1] + self.cur_pkt[0])
+                self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 1] = \
+                    int(self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 1] + self.cur_pkt[0])
                 # Pkt length squared.
-                self.stats_ip[self.hash_ip_0][self.decay_cntr][2] = \
-                    int(self.stats_ip[self.hash_ip_0][self.decay_cntr][2] + sqr.compute(self.cur_pkt[0]))
+                self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 2] = \
+                    int(self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 2] + sqr.compute(self.cur_pkt[0]))
             else:
                 # Pkt length.
-                self.stats_ip[self.hash_ip_0][self.decay_cntr][1] = \
-                    int(self.decay_ip * self.stats_ip[self.hash_ip_0][self.decay_cntr][1])
+                self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 1] = \
+                    int(self.decay_ip * self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 1])
                 # Pkt length squared.
-                self.stats_ip[self.hash_ip_0][self.decay_cntr][2] = \
-                    int(self.decay_ip * self.stats_ip[self.hash_ip_0][self.decay_cntr][2])
+                self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 2] = \
+                    int(self.decay_ip * self.stats_ip[self.hash_ip_0, self.decay_cntr-1, 2])
                 # Sum of residual products.
-                self.ip_res_sum[self.hash_ip_xor][self.decay_cntr] = \
-                    int(self.decay_ip * self.ip_res_sum[self.hash_ip_xor][self.decay_cntr])
+                self.ip_res_sum[self.hash_ip_xor, self.decay_cntr-1] = \
+                    int(self.decay_ip * self.ip_res_sum[self.hash_ip_xor, self.decay_cntr-1])
 
         else:
-            self.stats_ip[self.hash_ip_0] = ([[0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0]])
-            self.stats_ip[self.hash_ip_0][0][self.decay_cntr-1] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][self.decay_cntr] = \
+            self.stats_ip_valid[self.hash_ip_0] = True
+            self.stats_ip_ts[self.hash_ip_0] = 0
+            self.stats_ip[self.hash_ip_0] = 0
+            self.stats_ip_ts[self.hash_ip_0, self.decay_cntr-1] = self.cur_pkt[1]
+            self.stats_ip[self.hash_ip_0, self.decay_cntr-1] = \
                 [1, self.cur_pkt[0], sqr.compute(self.cur_pkt[0]), 0, 0, 0]
 
         # Five tuple
 
-        if self.hash_five_t_0 not in self.five_t_res:
-            self.five_t_res[self.hash_five_t_0] = [0, 0, 0, 0]
-
-        if self.hash_five_t_xor not in self.five_t_res_sum:
-            self.five_t_res_sum[self.hash_five_t_xor] = ([[0, 0, 0, 0], 0, 0, 0, 0])
-
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_five_t_0 in self.stats_five_t:
+        if self.stats_five_t_valid[self.hash_five_t_0]:
             five_t_ts_interval = \
-                self.cur_pkt[1] - self.stats_five_t[self.hash_five_t_0][0][self.decay_cntr-1]
+                self.cur_pkt[1] - self.stats_five_t_ts[self.hash_five_t_0, self.decay_cntr-1]
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
-            if self.stats_five_t[self.hash_five_t_0][0][self.decay_cntr-1]:
+            if self.stats_five_t_ts[self.hash_five_t_0, self.decay_cntr-1]:
                 if self.decay_cntr == 1 and five_t_ts_interval > 0.1:
                     self.decay_five_t = 0.5
-                    self.stats_five_t[self.hash_five_t_0][0][0] += 0.1
-                    self.five_t_res_sum[self.hash_five_t_xor][0][0] += 0.1
+                    self.stats_five_t_ts[self.hash_five_t_0, 0] += 0.1
+                    self.five_t_res_sum_ts[self.hash_five_t_xor, 0] += 0.1
                 elif self.decay_cntr == 2 and five_t_ts_interval > 1:
                     self.decay_five_t = 0.5
-                    self.stats_five_t[self.hash_five_t_0][0][1] += 1
-                    self.five_t_res_sum[self.hash_five_t_xor][0][1] += 1
+                    self.stats_five_t_ts[self.hash_five_t_0, 1] += 1
+                    self.five_t_res_sum_ts[self.hash_five_t_xor, 1] += 1
                 elif self.decay_cntr == 3 and five_t_ts_interval > 10:
                     self.decay_five_t = 0.5
-                    self.stats_five_t[self.hash_five_t_0][0][2] += 10
-                    self.five_t_res_sum[self.hash_five_t_xor][0][2] += 10
+                    self.stats_five_t_ts[self.hash_five_t_0, 2] += 10
+                    self.five_t_res_sum_ts[self.hash_five_t_xor, 2] += 10
                 elif self.decay_cntr == 4 and five_t_ts_interval > 60:
                     self.decay_five_t = 0.5
-                    self.stats_five_t[self.hash_five_t_0][0][3] += 60
-                    self.five_t_res_sum[self.hash_five_t_xor][0][3] += 60
+                    self.stats_five_t_ts[self.hash_five_t_0, 3] += 60
+                    self.five_t_res_sum_ts[self.hash_five_t_xor, 3] += 60
                 else:
-                    self.stats_five_t[self.hash_five_t_0][0][self.decay_cntr-1] = self.cur_pkt[1]
-                    self.five_t_res_sum[self.hash_five_t_xor][0][self.decay_cntr-1] = \
+                    self.stats_five_t_ts[self.hash_five_t_0, self.decay_cntr-1] = self.cur_pkt[1]
+                    self.five_t_res_sum_ts[self.hash_five_t_xor, self.decay_cntr-1] = \
                         self.cur_pkt[1]
             else:
-                self.stats_five_t[self.hash_five_t_0][0][self.decay_cntr-1] = self.cur_pkt[1]
-                self.five_t_res_sum[self.hash_five_t_xor][0][self.decay_cntr-1] = self.cur_pkt[1]
+                self.stats_five_t_ts[self.hash_five_t_0, self.decay_cntr-1] = self.cur_pkt[1]
+                self.five_t_res_sum_ts[self.hash_five_t_xor, self.decay_cntr-1] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr][0] = \
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 0] = \
                 int(self.decay_five_t *
-                    self.stats_five_t[self.hash_five_t_0][self.decay_cntr][0] + 1)
+                    self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 0] + 1)
 
             # If the decay will not be applied, simply update the values from the current pkt.
             # Else, update the values with the current decay factor.
             if self.decay_five_t == 1:
                 # Pkt length.
-                self.stats_five_t[self.hash_five_t_0][self.decay_cntr][1] = \
-                    int(self.stats_five_t[self.hash_five_t_0][self.decay_cntr][1] + self.cur_pkt[0])
+                self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 1] = \
+                    int(self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 1] + self.cur_pkt[0])
                 # Pkt length squared.
-                self.stats_five_t[self.hash_five_t_0][self.decay_cntr][2] = \
-                    int(self.stats_five_t[self.hash_five_t_0][self.decay_cntr][2] +
+                self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 2] = \
+                    int(self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 2] +
                         sqr.compute(self.cur_pkt[0]))
             else:
                 # Pkt length.
-                self.stats_five_t[self.hash_five_t_0][self.decay_cntr][1] = \
+                self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 1] = \
                     int(self.decay_five_t *
-                        self.stats_five_t[self.hash_five_t_0][self.decay_cntr][1])
+                        self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 1])
                 # Pkt length squared.
-                self.stats_five_t[self.hash_five_t_0][self.decay_cntr][2] = \
+                self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 2] = \
                     int(self.decay_five_t *
-                        self.stats_five_t[self.hash_five_t_0][self.decay_cntr][2])
+                        self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1, 2])
                 # Sum of residual products.
-                self.five_t_res_sum[self.hash_five_t_xor][self.decay_cntr] = \
-                    int(self.decay_five_t * self.five_t_res_sum[self.hash_five_t_xor][self.decay_cntr])
+                self.five_t_res_sum[self.hash_five_t_xor, self.decay_cntr-1] = \
+                    int(self.decay_five_t * self.five_t_res_sum[self.hash_five_t_xor, self.decay_cntr-1])
 
         else:
-            self.stats_five_t[self.hash_five_t_0] = ([[0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0]])
-            self.stats_five_t[self.hash_five_t_0][0][self.decay_cntr-1] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][self.decay_cntr] = \
+            self.stats_five_t_valid[self.hash_five_t_0] = True
+            self.stats_five_t_ts[self.hash_five_t_0] = 0
+            self.stats_five_t[self.hash_five_t_0] = 0
+            self.stats_five_t_ts[self.hash_five_t_0, self.decay_cntr-1] = self.cur_pkt[1]
+            self.stats_five_t[self.hash_five_t_0, self.decay_cntr-1] = \
                 [1, self.cur_pkt[0], sqr.compute(self.cur_pkt[0]), 0, 0, 0]
 
     def decay_check_exact(self):
@@ -1019,89 +983,87 @@ class FCKitNET:
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_mac_ip_src in self.stats_mac_ip_src:
+        if self.stats_mac_ip_src_valid[self.hash_mac_ip_src]:
             mac_ip_src_ts_interval_0 = \
-                self.cur_pkt[1] - self.stats_mac_ip_src[self.hash_mac_ip_src][0][0]
+                self.cur_pkt[1] - self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 0]
             mac_ip_src_ts_interval_1 = \
-                self.cur_pkt[1] - self.stats_mac_ip_src[self.hash_mac_ip_src][0][1]
+                self.cur_pkt[1] - self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 1]
             mac_ip_src_ts_interval_2 = \
-                self.cur_pkt[1] - self.stats_mac_ip_src[self.hash_mac_ip_src][0][2]
+                self.cur_pkt[1] - self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 2]
             mac_ip_src_ts_interval_3 = \
-                self.cur_pkt[1] - self.stats_mac_ip_src[self.hash_mac_ip_src][0][3]
+                self.cur_pkt[1] - self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 3]
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
 
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][0] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][1] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][2] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][3] = self.cur_pkt[1]
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 0] = self.cur_pkt[1]
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 1] = self.cur_pkt[1]
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 2] = self.cur_pkt[1]
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 3] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_mac_ip_src[self.hash_mac_ip_src][1][0] = \
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 0, 0] = \
                 pow(2, (-10 * mac_ip_src_ts_interval_0)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][1][0] + 1
-            self.stats_mac_ip_src[self.hash_mac_ip_src][2][0] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 0, 0] + 1
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 1, 0] = \
                 pow(2, (-1 * mac_ip_src_ts_interval_1)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][2][0] + 1
-            self.stats_mac_ip_src[self.hash_mac_ip_src][3][0] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 1, 0] + 1
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 2, 0] = \
                 pow(2, (-0.1 * mac_ip_src_ts_interval_2)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][3][0] + 1
-            self.stats_mac_ip_src[self.hash_mac_ip_src][4][0] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 2, 0] + 1
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 3, 0] = \
                 pow(2, (-(1/60) * mac_ip_src_ts_interval_3)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][4][0] + 1
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 3, 0] + 1
 
             # Decay factor: pkt length.
-            self.stats_mac_ip_src[self.hash_mac_ip_src][1][1] = \
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 0, 1] = \
                 pow(2, (-10 * mac_ip_src_ts_interval_0)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][1][1] + self.cur_pkt[0]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][2][1] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 0, 1] + self.cur_pkt[0]
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 1, 1] = \
                 pow(2, (-1 * mac_ip_src_ts_interval_1)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][2][1] + self.cur_pkt[0]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][3][1] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 1, 1] + self.cur_pkt[0]
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 2, 1] = \
                 pow(2, (-0.1 * mac_ip_src_ts_interval_2)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][3][1] + self.cur_pkt[0]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][4][1] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 2, 1] + self.cur_pkt[0]
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 3, 1] = \
                 pow(2, (-(1/60) * mac_ip_src_ts_interval_3)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][4][1] + self.cur_pkt[0]
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 3, 1] + self.cur_pkt[0]
 
             # Decay factor: pkt length squared.
-            self.stats_mac_ip_src[self.hash_mac_ip_src][1][2] = \
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 0, 2] = \
                 pow(2, (-10 * mac_ip_src_ts_interval_0)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][1][2] + pow(self.cur_pkt[0], 2)
-            self.stats_mac_ip_src[self.hash_mac_ip_src][2][2] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 0, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 1, 2] = \
                 pow(2, (-1 * mac_ip_src_ts_interval_1)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][2][2] + pow(self.cur_pkt[0], 2)
-            self.stats_mac_ip_src[self.hash_mac_ip_src][3][2] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 1, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 2, 2] = \
                 pow(2, (-0.1 * mac_ip_src_ts_interval_2)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][3][2] + pow(self.cur_pkt[0], 2)
-            self.stats_mac_ip_src[self.hash_mac_ip_src][4][2] = \
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 2, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 3, 2] = \
                 pow(2, (-(1/60) * mac_ip_src_ts_interval_3)) * \
-                self.stats_mac_ip_src[self.hash_mac_ip_src][4][2] + pow(self.cur_pkt[0], 2)
+                self.stats_mac_ip_src[self.hash_mac_ip_src, 3, 2] + pow(self.cur_pkt[0], 2)
         else:
-            self.stats_mac_ip_src[self.hash_mac_ip_src] = ([[0, 0, 0, 0],
-                                                            [0, 0, 0],
-                                                            [0, 0, 0],
-                                                            [0, 0, 0],
-                                                            [0, 0, 0]])
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][0] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][1] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][2] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][0][3] = self.cur_pkt[1]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][1] = \
+            self.stats_mac_ip_src_valid[self.hash_mac_ip_src] = True
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src] = 0
+            self.stats_mac_ip_src[self.hash_mac_ip_src] = 0
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 0] = self.cur_pkt[1]
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 1] = self.cur_pkt[1]
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 2] = self.cur_pkt[1]
+            self.stats_mac_ip_src_ts[self.hash_mac_ip_src, 3] = self.cur_pkt[1]
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 0] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][2] = \
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 1] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][3] = \
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 2] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
-            self.stats_mac_ip_src[self.hash_mac_ip_src][4] = \
+            self.stats_mac_ip_src[self.hash_mac_ip_src, 3] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
@@ -1111,304 +1073,279 @@ class FCKitNET:
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_ip_src in self.stats_ip_src:
+        if self.stats_ip_src_valid[self.hash_ip_src]:
             ip_src_ts_interval_0 = \
-                self.cur_pkt[1] - self.stats_ip_src[self.hash_ip_src][0][0]
+                self.cur_pkt[1] - self.stats_ip_src_ts[self.hash_ip_src, 0]
             ip_src_ts_interval_1 = \
-                self.cur_pkt[1] - self.stats_ip_src[self.hash_ip_src][0][1]
+                self.cur_pkt[1] - self.stats_ip_src_ts[self.hash_ip_src, 1]
             ip_src_ts_interval_2 = \
-                self.cur_pkt[1] - self.stats_ip_src[self.hash_ip_src][0][2]
+                self.cur_pkt[1] - self.stats_ip_src_ts[self.hash_ip_src, 2]
             ip_src_ts_interval_3 = \
-                self.cur_pkt[1] - self.stats_ip_src[self.hash_ip_src][0][3]
+                self.cur_pkt[1] - self.stats_ip_src_ts[self.hash_ip_src, 3]
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
 
-            self.stats_ip_src[self.hash_ip_src][0][0] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][0][1] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][0][2] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][0][3] = self.cur_pkt[1]
+            self.stats_ip_src_ts[self.hash_ip_src, 0] = self.cur_pkt[1]
+            self.stats_ip_src_ts[self.hash_ip_src, 1] = self.cur_pkt[1]
+            self.stats_ip_src_ts[self.hash_ip_src, 2] = self.cur_pkt[1]
+            self.stats_ip_src_ts[self.hash_ip_src, 3] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_ip_src[self.hash_ip_src][1][0] = \
+            self.stats_ip_src[self.hash_ip_src, 0, 0] = \
                 pow(2, (-10 * ip_src_ts_interval_0)) * \
-                self.stats_ip_src[self.hash_ip_src][1][0] + 1
-            self.stats_ip_src[self.hash_ip_src][2][0] = \
+                self.stats_ip_src[self.hash_ip_src, 0, 0] + 1
+            self.stats_ip_src[self.hash_ip_src, 1, 0] = \
                 pow(2, (-1 * ip_src_ts_interval_1)) * \
-                self.stats_ip_src[self.hash_ip_src][2][0] + 1
-            self.stats_ip_src[self.hash_ip_src][3][0] = \
+                self.stats_ip_src[self.hash_ip_src, 1, 0] + 1
+            self.stats_ip_src[self.hash_ip_src, 2, 0] = \
                 pow(2, (-0.1 * ip_src_ts_interval_2)) * \
-                self.stats_ip_src[self.hash_ip_src][3][0] + 1
-            self.stats_ip_src[self.hash_ip_src][4][0] = \
+                self.stats_ip_src[self.hash_ip_src, 2, 0] + 1
+            self.stats_ip_src[self.hash_ip_src, 3, 0] = \
                 pow(2, (-(1/60) * ip_src_ts_interval_3)) * \
-                self.stats_ip_src[self.hash_ip_src][4][0] + 1
+                self.stats_ip_src[self.hash_ip_src, 3, 0] + 1
 
             # Decay factor: pkt length.
-            self.stats_ip_src[self.hash_ip_src][1][1] = \
+            self.stats_ip_src[self.hash_ip_src, 0, 1] = \
                 pow(2, (-10 * ip_src_ts_interval_0)) * \
-                self.stats_ip_src[self.hash_ip_src][1][1] + self.cur_pkt[0]
-            self.stats_ip_src[self.hash_ip_src][2][1] = \
+                self.stats_ip_src[self.hash_ip_src, 0, 1] + self.cur_pkt[0]
+            self.stats_ip_src[self.hash_ip_src, 1, 1] = \
                 pow(2, (-1 * ip_src_ts_interval_1)) * \
-                self.stats_ip_src[self.hash_ip_src][2][1] + self.cur_pkt[0]
-            self.stats_ip_src[self.hash_ip_src][3][1] = \
+                self.stats_ip_src[self.hash_ip_src, 1, 1] + self.cur_pkt[0]
+            self.stats_ip_src[self.hash_ip_src, 2, 1] = \
                 pow(2, (-0.1 * ip_src_ts_interval_2)) * \
-                self.stats_ip_src[self.hash_ip_src][3][1] + self.cur_pkt[0]
-            self.stats_ip_src[self.hash_ip_src][4][1] = \
+                self.stats_ip_src[self.hash_ip_src, 2, 1] + self.cur_pkt[0]
+            self.stats_ip_src[self.hash_ip_src, 3, 1] = \
                 pow(2, (-(1/60) * ip_src_ts_interval_3)) * \
-                self.stats_ip_src[self.hash_ip_src][4][1] + self.cur_pkt[0]
+                self.stats_ip_src[self.hash_ip_src, 3, 1] + self.cur_pkt[0]
 
             # Decay factor: pkt length squared.
-            self.stats_ip_src[self.hash_ip_src][1][2] = \
+            self.stats_ip_src[self.hash_ip_src, 0, 2] = \
                 pow(2, (-10 * ip_src_ts_interval_0)) * \
-                self.stats_ip_src[self.hash_ip_src][1][2] + pow(self.cur_pkt[0], 2)
-            self.stats_ip_src[self.hash_ip_src][2][2] = \
+                self.stats_ip_src[self.hash_ip_src, 0, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_ip_src[self.hash_ip_src, 1, 2] = \
                 pow(2, (-1 * ip_src_ts_interval_1)) * \
-                self.stats_ip_src[self.hash_ip_src][2][2] + pow(self.cur_pkt[0], 2)
-            self.stats_ip_src[self.hash_ip_src][3][2] = \
+                self.stats_ip_src[self.hash_ip_src, 1, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_ip_src[self.hash_ip_src, 2, 2] = \
                 pow(2, (-0.1 * ip_src_ts_interval_2)) * \
-                self.stats_ip_src[self.hash_ip_src][3][2] + pow(self.cur_pkt[0], 2)
-            self.stats_ip_src[self.hash_ip_src][4][2] = \
+                self.stats_ip_src[self.hash_ip_src, 2, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_ip_src[self.hash_ip_src, 3, 2] = \
                 pow(2, (-(1/60) * ip_src_ts_interval_3)) * \
-                self.stats_ip_src[self.hash_ip_src][4][2] + pow(self.cur_pkt[0], 2)
+                self.stats_ip_src[self.hash_ip_src, 3, 2] + pow(self.cur_pkt[0], 2)
         else:
-            self.stats_ip_src[self.hash_ip_src] = ([[0, 0, 0, 0],
-                                                    [0, 0, 0],
-                                                    [0, 0, 0],
-                                                    [0, 0, 0],
-                                                    [0, 0, 0]])
-            self.stats_ip_src[self.hash_ip_src][0][0] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][0][1] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][0][2] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][0][3] = self.cur_pkt[1]
-            self.stats_ip_src[self.hash_ip_src][1] = \
+            self.stats_ip_src_valid[self.hash_ip_src] = True
+            self.stats_ip_src_ts[self.hash_ip_src] = 0
+            self.stats_ip_src[self.hash_ip_src] = 0
+            self.stats_ip_src_ts[self.hash_ip_src, 0] = self.cur_pkt[1]
+            self.stats_ip_src_ts[self.hash_ip_src, 1] = self.cur_pkt[1]
+            self.stats_ip_src_ts[self.hash_ip_src, 2] = self.cur_pkt[1]
+            self.stats_ip_src_ts[self.hash_ip_src, 3] = self.cur_pkt[1]
+            self.stats_ip_src[self.hash_ip_src, 0] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
-            self.stats_ip_src[self.hash_ip_src][2] = \
+            self.stats_ip_src[self.hash_ip_src, 1] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
-            self.stats_ip_src[self.hash_ip_src][3] = \
+            self.stats_ip_src[self.hash_ip_src, 2] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
-            self.stats_ip_src[self.hash_ip_src][4] = \
+            self.stats_ip_src[self.hash_ip_src, 3] = \
                 [1,
                  self.cur_pkt[0],
                  pow(self.cur_pkt[0], 2)]
 
         # IP
 
-        if self.hash_ip_0 not in self.ip_res:
-            self.ip_res[self.hash_ip_0] = [0, 0, 0, 0]
-
-        if self.hash_ip_xor not in self.ip_res_sum:
-            self.ip_res_sum[self.hash_ip_xor] = ([[0, 0, 0, 0], 0, 0, 0, 0])
-
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_ip_0 in self.stats_ip:
+        if self.stats_ip_valid[self.hash_ip_0]:
             ip_ts_interval_0 = \
-                self.cur_pkt[1] - self.stats_ip[self.hash_ip_0][0][0]
+                self.cur_pkt[1] - self.stats_ip_ts[self.hash_ip_0, 0]
             ip_ts_interval_1 = \
-                self.cur_pkt[1] - self.stats_ip[self.hash_ip_0][0][1]
+                self.cur_pkt[1] - self.stats_ip_ts[self.hash_ip_0, 1]
             ip_ts_interval_2 = \
-                self.cur_pkt[1] - self.stats_ip[self.hash_ip_0][0][2]
+                self.cur_pkt[1] - self.stats_ip_ts[self.hash_ip_0, 2]
             ip_ts_interval_3 = \
-                self.cur_pkt[1] - self.stats_ip[self.hash_ip_0][0][3]
+                self.cur_pkt[1] - self.stats_ip_ts[self.hash_ip_0, 3]
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
 
-            self.stats_ip[self.hash_ip_0][0][0] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][0][1] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][0][2] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][0][3] = self.cur_pkt[1]
+            self.stats_ip_ts[self.hash_ip_0, 0] = self.cur_pkt[1]
+            self.stats_ip_ts[self.hash_ip_0, 1] = self.cur_pkt[1]
+            self.stats_ip_ts[self.hash_ip_0, 2] = self.cur_pkt[1]
+            self.stats_ip_ts[self.hash_ip_0, 3] = self.cur_pkt[1]
 
-            self.ip_res_sum[self.hash_ip_xor][0][0] = self.cur_pkt[1]
-            self.ip_res_sum[self.hash_ip_xor][0][1] = self.cur_pkt[1]
-            self.ip_res_sum[self.hash_ip_xor][0][2] = self.cur_pkt[1]
-            self.ip_res_sum[self.hash_ip_xor][0][3] = self.cur_pkt[1]
+            self.ip_res_sum_ts[self.hash_ip_xor, 0] = self.cur_pkt[1]
+            self.ip_res_sum_ts[self.hash_ip_xor, 1] = self.cur_pkt[1]
+            self.ip_res_sum_ts[self.hash_ip_xor, 2] = self.cur_pkt[1]
+            self.ip_res_sum_ts[self.hash_ip_xor, 3] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_ip[self.hash_ip_0][1][0] = \
+            self.stats_ip[self.hash_ip_0, 0, 0] = \
                 pow(2, (-10 * ip_ts_interval_0)) * \
-                self.stats_ip[self.hash_ip_0][1][0] + 1
-            self.stats_ip[self.hash_ip_0][2][0] = \
+                self.stats_ip[self.hash_ip_0, 0, 0] + 1
+            self.stats_ip[self.hash_ip_0, 1, 0] = \
                 pow(2, (-1 * ip_ts_interval_0)) * \
-                self.stats_ip[self.hash_ip_0][2][0] + 1
-            self.stats_ip[self.hash_ip_0][3][0] = \
+                self.stats_ip[self.hash_ip_0, 1, 0] + 1
+            self.stats_ip[self.hash_ip_0, 2, 0] = \
                 pow(2, (-0.1 * ip_ts_interval_0)) * \
-                self.stats_ip[self.hash_ip_0][3][0] + 1
-            self.stats_ip[self.hash_ip_0][4][0] = \
+                self.stats_ip[self.hash_ip_0, 2, 0] + 1
+            self.stats_ip[self.hash_ip_0, 3, 0] = \
                 pow(2, (-(1/60) * ip_ts_interval_0)) * \
-                self.stats_ip[self.hash_ip_0][4][0] + 1
+                self.stats_ip[self.hash_ip_0, 3, 0] + 1
 
             # Decay factor: pkt length.
-            self.stats_ip[self.hash_ip_0][1][1] = \
+            self.stats_ip[self.hash_ip_0, 0, 1] = \
                 pow(2, (-10 * ip_ts_interval_0)) * \
-                self.stats_ip[self.hash_ip_0][1][1] + self.cur_pkt[0]
-            self.stats_ip[self.hash_ip_0][2][1] = \
+                self.stats_ip[self.hash_ip_0, 0, 1] + self.cur_pkt[0]
+            self.stats_ip[self.hash_ip_0, 1, 1] = \
                 pow(2, (-1 * ip_ts_interval_1)) * \
-                self.stats_ip[self.hash_ip_0][2][1] + self.cur_pkt[0]
-            self.stats_ip[self.hash_ip_0][3][1] = \
+                self.stats_ip[self.hash_ip_0, 1, 1] + self.cur_pkt[0]
+            self.stats_ip[self.hash_ip_0, 2, 1] = \
                 pow(2, (-0.1 * ip_ts_interval_2)) * \
-                self.stats_ip[self.hash_ip_0][3][1] + self.cur_pkt[0]
-            self.stats_ip[self.hash_ip_0][4][1] = \
+                self.stats_ip[self.hash_ip_0, 2, 1] + self.cur_pkt[0]
+            self.stats_ip[self.hash_ip_0, 3, 1] = \
                 pow(2, (-(1/60) * ip_ts_interval_3)) * \
-                self.stats_ip[self.hash_ip_0][4][1] + self.cur_pkt[0]
+                self.stats_ip[self.hash_ip_0, 3, 1] + self.cur_pkt[0]
 
             # Decay factor: pkt length squared.
-            self.stats_ip[self.hash_ip_0][1][2] = \
+            self.stats_ip[self.hash_ip_0, 0, 2] = \
                 pow(2, (-10 * ip_ts_interval_0)) * \
-                self.stats_ip[self.hash_ip_0][1][2] + pow(self.cur_pkt[0], 2)
-            self.stats_ip[self.hash_ip_0][2][2] = \
+                self.stats_ip[self.hash_ip_0, 0, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_ip[self.hash_ip_0, 1, 2] = \
                 pow(2, (-1 * ip_ts_interval_1)) * \
-                self.stats_ip[self.hash_ip_0][2][2] + pow(self.cur_pkt[0], 2)
-            self.stats_ip[self.hash_ip_0][3][2] = \
+                self.stats_ip[self.hash_ip_0, 1, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_ip[self.hash_ip_0, 2, 2] = \
                 pow(2, (-0.1 * ip_ts_interval_2)) * \
-                self.stats_ip[self.hash_ip_0][3][2] + pow(self.cur_pkt[0], 2)
-            self.stats_ip[self.hash_ip_0][4][2] = \
+                self.stats_ip[self.hash_ip_0, 2, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_ip[self.hash_ip_0, 3, 2] = \
                 pow(2, (-(1/60) * ip_ts_interval_3)) * \
-                self.stats_ip[self.hash_ip_0][4][2] + pow(self.cur_pkt[0], 2)
-
-            self.ip_res_sum[self.hash_ip_xor][1] = \
-                pow(2, (-10 * ip_ts_interval_0)) * self.ip_res_sum[self.hash_ip_xor][1]
-            self.ip_res_sum[self.hash_ip_xor][2] = \
-                pow(2, (-1 * ip_ts_interval_1)) * self.ip_res_sum[self.hash_ip_xor][2]
-            self.ip_res_sum[self.hash_ip_xor][3] = \
-                pow(2, (-0.1 * ip_ts_interval_2)) * self.ip_res_sum[self.hash_ip_xor][3]
-            self.ip_res_sum[self.hash_ip_xor][4] = \
-                pow(2, (-(1/60) * ip_ts_interval_3)) * self.ip_res_sum[self.hash_ip_xor][4]
+                self.stats_ip[self.hash_ip_0, 3, 2] + pow(self.cur_pkt[0], 2)
+
+            self.ip_res_sum[self.hash_ip_xor, 0] = \
+                pow(2, (-10 * ip_ts_interval_0)) * self.ip_res_sum[self.hash_ip_xor, 0]
+            self.ip_res_sum[self.hash_ip_xor, 1] = \
+                pow(2, (-1 * ip_ts_interval_1)) * self.ip_res_sum[self.hash_ip_xor, 1]
+            self.ip_res_sum[self.hash_ip_xor, 2] = \
+                pow(2, (-0.1 * ip_ts_interval_2)) * self.ip_res_sum[self.hash_ip_xor, 2]
+            self.ip_res_sum[self.hash_ip_xor, 3] = \
+                pow(2, (-(1/60) * ip_ts_interval_3)) * self.ip_res_sum[self.hash_ip_xor, 3]
         else:
-            self.stats_ip[self.hash_ip_0] = ([[0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0],
-                                              [0, 0, 0, 0, 0, 0]])
-            self.stats_ip[self.hash_ip_0][0][0] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][0][1] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][0][2] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][0][3] = self.cur_pkt[1]
-            self.stats_ip[self.hash_ip_0][1] = \
+            self.stats_ip_valid[self.hash_ip_0] = True
+            self.stats_ip_ts[self.hash_ip_0] = 0
+            self.stats_ip[self.hash_ip_0] = 0
+            self.stats_ip_ts[self.hash_ip_0, 0] = self.cur_pkt[1]
+            self.stats_ip_ts[self.hash_ip_0, 1] = self.cur_pkt[1]
+            self.stats_ip_ts[self.hash_ip_0, 2] = self.cur_pkt[1]
+            self.stats_ip_ts[self.hash_ip_0, 3] = self.cur_pkt[1]
+            self.stats_ip[self.hash_ip_0, 0] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
-            self.stats_ip[self.hash_ip_0][2] = \
+            self.stats_ip[self.hash_ip_0, 1] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
-            self.stats_ip[self.hash_ip_0][3] = \
+            self.stats_ip[self.hash_ip_0, 2] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
-            self.stats_ip[self.hash_ip_0][4] = \
+            self.stats_ip[self.hash_ip_0, 3] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
 
         # Five tuple
 
-        if self.hash_five_t_0 not in self.five_t_res:
-            self.five_t_res[self.hash_five_t_0] = [0, 0, 0, 0]
-
-        if self.hash_five_t_xor not in self.five_t_res_sum:
-            self.five_t_res_sum[self.hash_five_t_xor] = ([[0, 0, 0, 0], 0, 0, 0, 0])
-
         # Check if the current flow ID has already been seen.
         # If it exists, calculate the decay.
         # Else, initialize all values and perform the update from the current pkt.
-        if self.hash_five_t_0 in self.stats_five_t:
+        if self.stats_five_t_valid[self.hash_five_t_0]:
             five_t_ts_interval_0 = \
-                self.cur_pkt[1] - self.stats_five_t[self.hash_five_t_0][0][0]
+                self.cur_pkt[1] - self.stats_five_t_ts[self.hash_five_t_0, 0]
             five_t_ts_interval_1 = \
-                self.cur_pkt[1] - self.stats_five_t[self.hash_five_t_0][0][1]
+                self.cur_pkt[1] - self.stats_five_t_ts[self.hash_five_t_0, 1]
             five_t_ts_interval_2 = \
-                self.cur_pkt[1] - self.stats_five_t[self.hash_five_t_0][0][2]
+                self.cur_pkt[1] - self.stats_five_t_ts[self.hash_five_t_0, 2]
             five_t_ts_interval_3 = \
-                self.cur_pkt[1] - self.stats_five_t[self.hash_five_t_0][0][3]
+                self.cur_pkt[1] - self.stats_five_t_ts[self.hash_five_t_0, 3]
 
             # Check if the current decay counter has been previously updated.
             # If so, perform the decay factor update.
             # Else, the current decay counter value becomes the current pkt timestamp.
 
-            self.stats_five_t[self.hash_five_t_0][0][0] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][0][1] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][0][2] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][0][3] = self.cur_pkt[1]
+            self.stats_five_t_ts[self.hash_five_t_0, 0] = self.cur_pkt[1]
+            self.stats_five_t_ts[self.hash_five_t_0, 1] = self.cur_pkt[1]
+            self.stats_five_t_ts[self.hash_five_t_0, 2] = self.cur_pkt[1]
+            self.stats_five_t_ts[self.hash_five_t_0, 3] = self.cur_pkt[1]
 
-            self.five_t_res_sum[self.hash_five_t_xor][0][0] = self.cur_pkt[1]
-            self.five_t_res_sum[self.hash_five_t_xor][0][1] = self.cur_pkt[1]
-            self.five_t_res_sum[self.hash_five_t_xor][0][2] = self.cur_pkt[1]
-            self.five_t_res_sum[self.hash_five_t_xor][0][3] = self.cur_pkt[1]
+            self.five_t_res_sum_ts[self.hash_five_t_xor, 0] = self.cur_pkt[1]
+            self.five_t_res_sum_ts[self.hash_five_t_xor, 1] = self.cur_pkt[1]
+            self.five_t_res_sum_ts[self.hash_five_t_xor, 2] = self.cur_pkt[1]
+            self.five_t_res_sum_ts[self.hash_five_t_xor, 3] = self.cur_pkt[1]
 
             # Decay factor: pkt count.
-            self.stats_five_t[self.hash_five_t_0][1][0] = \
+            self.stats_five_t[self.hash_five_t_0, 0, 0] = \
                 pow(2, (-10 * five_t_ts_interval_0)) * \
-                self.stats_five_t[self.hash_five_t_0][1][0] + 1
-            self.stats_five_t[self.hash_five_t_0][2][0] = \
+                self.stats_five_t[self.hash_five_t_0, 0, 0] + 1
+            self.stats_five_t[self.hash_five_t_0, 1, 0] = \
                 pow(2, (-1 * five_t_ts_interval_0)) * \
-                self.stats_five_t[self.hash_five_t_0][2][0] + 1
-            self.stats_five_t[self.hash_five_t_0][3][0] = \
+                self.stats_five_t[self.hash_five_t_0, 1, 0] + 1
+            self.stats_five_t[self.hash_five_t_0, 2, 0] = \
                 pow(2, (-0.1 * five_t_ts_interval_0)) * \
-                self.stats_five_t[self.hash_five_t_0][3][0] + 1
-            self.stats_five_t[self.hash_five_t_0][4][0] = \
+                self.stats_five_t[self.hash_five_t_0, 2, 0] + 1
+            self.stats_five_t[self.hash_five_t_0, 3, 0] = \
                 pow(2, (-(1/60) * five_t_ts_interval_0)) * \
-                self.stats_five_t[self.hash_five_t_0][4][0] + 1
+                self.stats_five_t[self.hash_five_t_0, 3, 0] + 1
 
             # Decay factor: pkt length.
-            self.stats_five_t[self.hash_five_t_0][1][1] = \
+            self.stats_five_t[self.hash_five_t_0, 0, 1] = \
                 pow(2, (-10 * five_t_ts_interval_0)) * \
-                self.stats_five_t[self.hash_five_t_0][1][1] + self.cur_pkt[0]
-            self.stats_five_t[self.hash_five_t_0][2][1] = \
+                self.stats_five_t[self.hash_five_t_0, 0, 1] + self.cur_pkt[0]
+            self.stats_five_t[self.hash_five_t_0, 1, 1] = \
                 pow(2, (-1 * five_t_ts_interval_1)) * \
-                self.stats_five_t[self.hash_five_t_0][2][1] + self.cur_pkt[0]
-            self.stats_five_t[self.hash_five_t_0][3][1] = \
+                self.stats_five_t[self.hash_five_t_0, 1, 1] + self.cur_pkt[0]
+            self.stats_five_t[self.hash_five_t_0, 2, 1] = \
                 pow(2, (-0.1 * five_t_ts_interval_2)) * \
-                self.stats_five_t[self.hash_five_t_0][3][1] + self.cur_pkt[0]
-            self.stats_five_t[self.hash_five_t_0][4][1] = \
+                self.stats_five_t[self.hash_five_t_0, 2, 1] + self.cur_pkt[0]
+            self.stats_five_t[self.hash_five_t_0, 3, 1] = \
                 pow(2, (-(1/60) * five_t_ts_interval_3)) * \
-                self.stats_five_t[self.hash_five_t_0][4][1] + self.cur_pkt[0]
+                self.stats_five_t[self.hash_five_t_0, 3, 1] + self.cur_pkt[0]
 
             # Decay factor: pkt length squared.
-            self.stats_five_t[self.hash_five_t_0][1][2] = \
+            self.stats_five_t[self.hash_five_t_0, 0, 2] = \
                 pow(2, (-10 * five_t_ts_interval_0)) * \
-                self.stats_five_t[self.hash_five_t_0][1][2] + pow(self.cur_pkt[0], 2)
-            self.stats_five_t[self.hash_five_t_0][2][2] = \
+                self.stats_five_t[self.hash_five_t_0, 0, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_five_t[self.hash_five_t_0, 1, 2] = \
                 pow(2, (-1 * five_t_ts_interval_1)) * \
-                self.stats_five_t[self.hash_five_t_0][2][2] + pow(self.cur_pkt[0], 2)
-            self.stats_five_t[self.hash_five_t_0][3][2] = \
+                self.stats_five_t[self.hash_five_t_0, 1, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_five_t[self.hash_five_t_0, 2, 2] = \
                 pow(2, (-0.1 * five_t_ts_interval_2)) * \
-                self.stats_five_t[self.hash_five_t_0][3][2] + pow(self.cur_pkt[0], 2)
-            self.stats_five_t[self.hash_five_t_0][4][2] = \
+                self.stats_five_t[self.hash_five_t_0, 2, 2] + pow(self.cur_pkt[0], 2)
+            self.stats_five_t[self.hash_five_t_0, 3, 2] = \
                 pow(2, (-(1/60) * five_t_ts_interval_3)) * \
-                self.stats_five_t[self.hash_five_t_0][4][2] + pow(self.cur_pkt[0], 2)
-
-            self.five_t_res_sum[self.hash_five_t_xor][1] = \
-                pow(2, (-10 * five_t_ts_interval_0)) * self.five_t_res_sum[self.hash_five_t_xor][1]
-            self.five_t_res_sum[self.hash_five_t_xor][2] = \
-                pow(2, (-1 * five_t_ts_interval_1)) * self.five_t_res_sum[self.hash_five_t_xor][2]
-            self.five_t_res_sum[self.hash_five_t_xor][3] = \
-                pow(2, (-0.1 * five_t_ts_interval_2)) * self.five_t_res_sum[self.hash_five_t_xor][3]
-            self.five_t_res_sum[self.hash_five_t_xor][4] = \
-                pow(2, (-(1/60) * five_t_ts_interval_3)) * self.five_t_res_sum[self.hash_five_t_xor][4]
+                self.stats_five_t[self.hash_five_t_0, 3, 2] + pow(self.cur_pkt[0], 2)
+
+            self.five_t_res_sum[self.hash_five_t_xor, 0] = \
+                pow(2, (-10 * five_t_ts_interval_0)) * self.five_t_res_sum[self.hash_five_t_xor, 0]
+            self.five_t_res_sum[self.hash_five_t_xor, 1] = \
+                pow(2, (-1 * five_t_ts_interval_1)) * self.five_t_res_sum[self.hash_five_t_xor, 1]
+            self.five_t_res_sum[self.hash_five_t_xor, 2] = \
+                pow(2, (-0.1 * five_t_ts_interval_2)) * self.five_t_res_sum[self.hash_five_t_xor, 2]
+            self.five_t_res_sum[self.hash_five_t_xor, 3] = \
+                pow(2, (-(1/60) * five_t_ts_interval_3)) * self.five_t_res_sum[self.hash_five_t_xor, 3]
         else:
-            self.stats_five_t[self.hash_five_t_0] = ([[0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0],
-                                                      [0, 0, 0, 0, 0, 0]])
-            self.stats_five_t[self.hash_five_t_0][0][0] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][0][1] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][0][2] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][0][3] = self.cur_pkt[1]
-            self.stats_five_t[self.hash_five_t_0][1] = \
+            self.stats_five_t_valid[self.hash_five_t_0] = True
+            self.stats_five_t_ts[self.hash_five_t_0] = 0
+            self.stats_five_t[self.hash_five_t_0] = 0
+            self.stats_five_t_ts[self.hash_five_t_0, 0] = self.cur_pkt[1]
+            self.stats_five_t_ts[self.hash_five_t_0, 1] = self.cur_pkt[1]
+            self.stats_five_t_ts[self.hash_five_t_0, 2] = self.cur_pkt[1]
+            self.stats_five_t_ts[self.hash_five_t_0, 3] = self.cur_pkt[1]
+            self.stats_five_t[self.hash_five_t_0, 0] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
-            self.stats_five_t[self.hash_five_t_0][2] = \
+            self.stats_five_t[self.hash_five_t_0, 1] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
-            self.stats_five_t[self.hash_five_t_0][3] = \
+            self.stats_five_t[self.hash_five_t_0, 2] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
-            self.stats_five_t[self.hash_five_t_0][4] = \
+            self.stats_five_t[self.hash_five_t_0, 3] = \
                 [1, self.cur_pkt[0], pow(self.cur_pkt[0], 2), 0, 0, 0]
-
-    # Returns the nearest lower power of two.
-    def pow_2(self, n):
-        if n > 1:
-            return int(log(n, 2))
-        else:
-            return 0
@@ -1,96 +1,57 @@
-import os
-import subprocess
-import pandas as pd
-import socket
-from math import isnan
-import crcmod
+from flow_hash import crc16, hash_mask, HASH_BITS, IP_BYTES
+from pcap_reader import mac_to_str, ip_to_str
+from trace_cache import load_trace, decode_trace
+from instrument import Instrument
 
 
 class FCWhisper:
-    def __init__(self, file_path):
+    def __init__(self, file_path, hash_bits=HASH_BITS, instrument=None):
         self.file_path = file_path          # Path of the trace file / csv.
-        self.df_csv = None                  # Dataframe for the trace csv.
-        self.cur_pkt = pd.DataFrame()       # Stats of the packet being processed.
+        self.hash_mask = hash_mask(hash_bits)
+        self.trace = None                   # Columns of the trace (memory-mapped cache).
+        self.cur_pkt = []                   # Stats of the packet being processed.
         self.global_pkt_index = 0
 
         self.ip_src_ts = {}
 
-        # CRC 16 parameters, following the TNA.
-        self.crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0x0000, xorOut=0x0000)
-
         # Hash values for all flow keys.
         self.hash_ip_src = 0
 
-        # Check if the pcap -> csv already exists and pass it to a dataframe.
-        self.__check_csv__()
-
-    def __check_csv__(self):
-        # Check the file type.
-        file_path = self.file_path.split('.')[0]
+        # Per-stage latency instrumentation (feature_extract, hash, stats_calc).
+        self.instrument = instrument if instrument is not None else Instrument()
 
-        if not os.path.isfile(file_path + '.csv'):
-            self.parse_pcap(self.file_path)
+        # Load the trace columns, converting the trace to the binary cache if needed.
+        self.__load_trace__()
 
-        self.df_csv = pd.read_csv(file_path + '.csv')
+    def __load_trace__(self):
+        # Traces previously converted with tshark are still read from their csv.
+        # Either way, only the first run parses the trace: later runs memory-map the cache.
+        # The columns are then decoded once into the per-packet fields.
+        self.trace = decode_trace(load_trace(self.file_path))
 
     def trace_size(self):
-        return len(self.df_csv)
-
-    def parse_pcap(self, pcap_path):
-        fields = "-e frame.time_epoch -e frame.len -e eth.src -e eth.dst \
-                    -e ip.src -e ip.dst -e ip.len -e ip.proto -e tcp.srcport \
-                    -e tcp.dstport -e udp.srcport -e udp.dstport -e icmp.type \
-                    -e icmp.code -e arp.opcode -e arp.src.hw_mac \
-                    -e arp.src.proto_ipv4 -e arp.dst.hw_mac -e arp.dst.proto_ipv4 \
-                    -e ipv6.src -e ipv6.dst"
-        cmd = 'tshark -r ' + pcap_path + ' -T fields ' + \
-            fields + ' -E separator=\',\' -E header=y -E occurrence=f > ' + \
-            self.file_path.split('.')[0] + '.csv'
-
-        print('Parsing pcap file to csv.')
-        subprocess.call(cmd, shell=True)
+        return len(self.trace['ts'])
 
     def feature_extract(self):
-        # Parse the next packet from the csv.
-        timestamp = float(self.df_csv.iat[self.global_pkt_index, 0])
-        mac_src = str(self.df_csv.iat[self.global_pkt_index, 2])
-        pkt_len = self.df_csv.iat[self.global_pkt_index, 6]
-        if isnan(pkt_len):
-            pkt_len = 0
-        ip_src = self.df_csv.iat[self.global_pkt_index, 4]
-        if str(ip_src) == 'nan':
-            ip_src = '0.0.0.0'
-        ip_dst = self.df_csv.iat[self.global_pkt_index, 5]
-        if str(ip_dst) == 'nan':
-            ip_dst = '0.0.0.0'
-        ip_proto = self.df_csv.iat[self.global_pkt_index, 7]
-        if isnan(ip_proto):
-            ip_proto = 0
-        if ip_proto == 17:
-            port_src = self.df_csv.iat[self.global_pkt_index, 10]
-            port_dst = self.df_csv.iat[self.global_pkt_index, 11]
-        elif ip_proto == 6:
-            port_src = self.df_csv.iat[self.global_pkt_index, 8]
-            port_dst = self.df_csv.iat[self.global_pkt_index, 9]
-        else:
-            port_src = 0
-            port_dst = 0
-        if isnan(port_src) or isnan(port_dst):
-            port_src = 0
-            port_dst = 0
-
+        # Read the next packet from the trace.
+        t = self.instrument.start()
+        i = self.global_pkt_index
         self.global_pkt_index = self.global_pkt_index + 1
         self.cur_pkt = [
-            pkt_len, timestamp, mac_src, ip_src, ip_dst,
-            str(int(ip_proto)), str(int(port_src)), str(int(port_dst))]
+            int(self.trace['pkt_len'][i]), float(self.trace['ts'][i]),
+            int(self.trace['mac_src'][i]), int(self.trace['ip_src'][i]),
+            int(self.trace['ip_dst'][i]), int(self.trace['ip_proto'][i]),
+            int(self.trace['port_src'][i]), int(self.trace['port_dst'][i])]
+        self.instrument.lap('feature_extract', t)
 
     def process(self):
-        # Hash calculation.
-        # CRC16, sliced to 13 bits (0-8191).
-        ip_src_bytes = socket.inet_aton(self.cur_pkt[3])
+        instrument = self.instrument
+        t = instrument.start()
 
-        hash_ip_src_temp = '{:016b}'.format(self.crc16(ip_src_bytes))
-        self.hash_ip_src = int(hash_ip_src_temp[-13:], 2)
+        # Hash calculation.
+        # CRC16, sliced to hash_bits bits (0-8191 by default).
+        self.hash_ip_src = crc16(self.cur_pkt[3], IP_BYTES) & self.hash_mask
+        t = instrument.lap('hash', t)
 
         # Calculate the 1D/2D statistics for each flow key.
 
@@ -103,7 +64,14 @@ class FCWhisper:
         else:
             self.ip_src_ts[self.hash_ip_src] = 0
 
+        # The headers are only formatted here, for the packets sent to Whisper.
+        self.cur_pkt = [
+            self.cur_pkt[0], self.cur_pkt[1], mac_to_str(self.cur_pkt[2]),
+            ip_to_str(self.cur_pkt[3]), ip_to_str(self.cur_pkt[4]), str(self.cur_pkt[5]),
+            str(self.cur_pkt[6]), str(self.cur_pkt[7])]
+
         cur_stats = [
             self.cur_pkt[3], self.cur_pkt[5], self.cur_pkt[0], self.ip_src_ts[self.hash_ip_src]]
 
+        instrument.lap('stats_calc', t)
         return [self.cur_pkt, cur_stats]
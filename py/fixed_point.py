@@ -0,0 +1,74 @@
+#!env python
+
+import numpy as np
+
+#
+# Fixed-point ALU helpers for the shift-based statistics computed on the switch.
+#
+# Divisions and multiplications are approximated by shifts, using the floor log2 of the
+# divisor/multiplier (nearest lower power of two), as in the P4 implementation.
+# Every primitive has a scalar form (python ints) and a vector form (NumPy int64 arrays).
+#
+# Usage:
+#
+#  mean = shift_div(pkt_len, pkt_cnt)
+#  means = shift_div_array(pkt_lens, pkt_cnts)
+#
+
+
+# Integers up to this value are exact as float64.
+FLOAT_EXACT = 1 << 53
+
+
+# Nearest lower power of two (exponent). 0 for any value <= 1.
+def log2_floor(n):
+    if n > 1:
+        return int(n).bit_length() - 1
+    else:
+        return 0
+
+
+# n / d, with d rounded down to a power of two.
+def shift_div(n, d):
+    return n >> log2_floor(d)
+
+
+# n * m, with m rounded down to a power of two.
+def shift_mul(n, m):
+    return n << log2_floor(m)
+
+
+# Approximate square root: n / 2^ceil(log2(n) / 2).
+def sqrt_approx(n):
+    return n >> ((log2_floor(n) + 1) >> 1)
+
+
+# Number of bits of each (non-negative) value, as int.bit_length().
+def bit_length_array(x):
+    x = np.asarray(x, dtype=np.int64)
+    # Values below 2^53 are exact as float64: the bit length is the float exponent.
+    if x.size == 0 or x.max() < FLOAT_EXACT:
+        return np.frexp(x.astype(np.float64))[1].astype(np.int64)
+    bits = np.zeros(x.shape, dtype=np.int64)
+    for shift in [32, 16, 8, 4, 2, 1]:
+        high = (x >> shift) != 0
+        bits += np.where(high, shift, 0)
+        x = np.where(high, x >> shift, x)
+    return bits + (x != 0)
+
+
+def log2_floor_array(n):
+    n = np.asarray(n, dtype=np.int64)
+    return np.where(n > 1, bit_length_array(np.maximum(n, 0)) - 1, 0)
+
+
+def shift_div_array(n, d):
+    return np.asarray(n, dtype=np.int64) >> log2_floor_array(d)
+
+
+def shift_mul_array(n, m):
+    return np.asarray(n, dtype=np.int64) << log2_floor_array(m)
+
+
+def sqrt_approx_array(n):
+    return np.asarray(n, dtype=np.int64) >> ((log2_floor_array(n) + 1) >> 1)
@@ -0,0 +1,222 @@
+import numpy as np
+from collections import OrderedDict
+
+#
+# Table-driven CRC16 flow hashing, following the TNA.
+#
+# CRC16 with poly 0x18005, reflected (0xA001), init 0x0000 and no final xor:
+# the same values as crcmod.mkCrcFun(0x18005, rev=True, initCrc=0x0000, xorOut=0x0000).
+# Header fields are hashed in network byte order and the CRC is sliced to hash_bits bits
+# (13 by default, i.e. 0-8191).
+#
+# flow_hashes() hashes a single packet; flow_hashes_array() hashes whole NumPy columns at once.
+# Both return the hashes for all flow keys, before the decay counter offset is applied:
+# (mac_ip_src, ip_src, ip_0, ip_1, ip_xor, five_t_0, five_t_1, five_t_xor).
+#
+# flow_keys() packs the header fields of each flow key into a single int (fixed-width fields):
+# (mac_ip_src, ip_src, ip, five_t), e.g. to key the per-flow tables of the pipelines.
+#
+# FlowHashCache memoizes flow_hashes() for the most recent flows (LRU):
+#
+#  hash_cache = FlowHashCache(65536)
+#  hashes = hash_cache.lookup(mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst)
+#
+
+HASH_BITS = 13
+HASH_MASK = (1 << HASH_BITS) - 1
+CRC_BITS = 16
+
+# Header field sizes, in bytes.
+MAC_BYTES = 6
+IP_BYTES = 4
+PROTO_BYTES = 1
+PORT_BYTES = 2
+
+# Header field sizes, in bits.
+IP_BITS = 8 * IP_BYTES
+PROTO_BITS = 8 * PROTO_BYTES
+PORT_BITS = 8 * PORT_BYTES
+
+# Default number of flows kept by FlowHashCache.
+HASH_CACHE_SIZE = 1 << 16
+
+
+def crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+
+CRC16_TABLE = crc16_table()
+CRC16_TABLE_ARRAY = np.array(CRC16_TABLE, dtype=np.int64)
+
+
+# Mask slicing the CRC to hash_bits bits.
+def hash_mask(hash_bits):
+    if not 1 <= hash_bits <= CRC_BITS:
+        raise ValueError(f"hash_bits must be between 1 and {CRC_BITS}")
+    return (1 << hash_bits) - 1
+
+
+# CRC16 over the nbytes of value (big-endian), continuing from crc.
+def crc16(value, nbytes, crc=0):
+    for shift in range(8 * (nbytes - 1), -1, -8):
+        crc = (crc >> 8) ^ CRC16_TABLE[(crc ^ (value >> shift)) & 0xFF]
+    return crc
+
+
+# Vector form of crc16: value and crc are int64 arrays.
+def crc16_array(value, nbytes, crc=0):
+    crc = np.zeros(len(value), dtype=np.int64) + crc
+    for shift in range(8 * (nbytes - 1), -1, -8):
+        crc = (crc >> 8) ^ CRC16_TABLE_ARRAY[(crc ^ (value >> shift)) & 0xFF]
+    return crc
+
+
+def flow_hashes_1d(mac_src, ip_src, mask=HASH_MASK):
+    crc_ip_src = crc16(ip_src, IP_BYTES)
+    return (crc16(ip_src, IP_BYTES, crc16(mac_src, MAC_BYTES)) & mask,
+            crc_ip_src & mask)
+
+
+# Hashes of both directions of a bidirectional flow: (ip_0, ip_1, five_t_0, five_t_1).
+# Swapping the ips/ports swaps the two directions.
+def flow_hashes_2d(ip_src, ip_dst, ip_proto, port_src, port_dst, mask=HASH_MASK):
+    crc_ip_src = crc16(ip_src, IP_BYTES)
+    crc_ip_dst = crc16(ip_dst, IP_BYTES)
+
+    # The bidirectional keys share their prefix with the unidirectional ones.
+    crc_ip_0 = crc16(ip_dst, IP_BYTES, crc_ip_src)
+    crc_ip_1 = crc16(ip_src, IP_BYTES, crc_ip_dst)
+
+    crc_five_t_0 = crc16(ip_proto, PROTO_BYTES, crc_ip_0)
+    crc_five_t_0 = crc16(port_src, PORT_BYTES, crc_five_t_0)
+    crc_five_t_0 = crc16(port_dst, PORT_BYTES, crc_five_t_0)
+
+    crc_five_t_1 = crc16(ip_proto, PROTO_BYTES, crc_ip_1)
+    crc_five_t_1 = crc16(port_dst, PORT_BYTES, crc_five_t_1)
+    crc_five_t_1 = crc16(port_src, PORT_BYTES, crc_five_t_1)
+
+    return (crc_ip_0 & mask, crc_ip_1 & mask,
+            crc_five_t_0 & mask, crc_five_t_1 & mask)
+
+
+def join_hashes(hashes_1d, hashes_2d):
+    hash_ip_0, hash_ip_1, hash_five_t_0, hash_five_t_1 = hashes_2d
+    # Xor is used since the value is the same for both flow directions.
+    return (hashes_1d[0], hashes_1d[1],
+            hash_ip_0, hash_ip_1, hash_ip_0 ^ hash_ip_1,
+            hash_five_t_0, hash_five_t_1, hash_five_t_0 ^ hash_five_t_1)
+
+
+def flow_hashes(mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst, hash_bits=HASH_BITS):
+    mask = hash_mask(hash_bits)
+    return join_hashes(flow_hashes_1d(mac_src, ip_src, mask),
+                       flow_hashes_2d(ip_src, ip_dst, ip_proto, port_src, port_dst, mask))
+
+
+def flow_keys(mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst):
+    key_ip = (ip_src << IP_BITS) | ip_dst
+    key_five_t = (((key_ip << PROTO_BITS | ip_proto) << PORT_BITS | port_src) << PORT_BITS) \
+        | port_dst
+    return ((mac_src << IP_BITS) | ip_src, ip_src, key_ip, key_five_t)
+
+
+class FlowHashCache:
+    # LRU cache of flow_hashes(), keyed on the (mac_src, ip_src, ip_dst, ip_proto, port_src,
+    # port_dst) tuple. On a miss, the bidirectional hashes are still reused when the 5-tuple
+    # (or the reverse 5-tuple, e.g. the reply of a cached flow) is cached.
+    def __init__(self, capacity=HASH_CACHE_SIZE, hash_bits=HASH_BITS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.mask = hash_mask(hash_bits)
+        self.flows = OrderedDict()      # Flow tuple -> all hashes.
+        self.pairs = OrderedDict()      # 5-tuple -> bidirectional hashes (flow_hashes_2d).
+
+        self.hits = 0
+        self.misses = 0
+        self.pair_hits = 0              # Misses resolved with the (reverse) 5-tuple hashes.
+
+    def lookup(self, mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst):
+        key = (mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst)
+        hashes = self.flows.get(key)
+        if hashes is not None:
+            self.hits += 1
+            self.flows.move_to_end(key)
+            return hashes
+
+        self.misses += 1
+        pair = key[1:]
+        hashes_2d = self.pairs.get(pair)
+        if hashes_2d is not None:
+            self.pair_hits += 1
+            self.pairs.move_to_end(pair)
+        else:
+            reverse = (ip_dst, ip_src, ip_proto, port_dst, port_src)
+            hashes_2d = self.pairs.get(reverse)
+            if hashes_2d is not None:
+                self.pair_hits += 1
+                hashes_2d = (hashes_2d[1], hashes_2d[0], hashes_2d[3], hashes_2d[2])
+            else:
+                hashes_2d = flow_hashes_2d(
+                    ip_src, ip_dst, ip_proto, port_src, port_dst, self.mask)
+            self.pairs[pair] = hashes_2d
+            if len(self.pairs) > self.capacity:
+                self.pairs.popitem(last=False)
+
+        hashes = join_hashes(flow_hashes_1d(mac_src, ip_src, self.mask), hashes_2d)
+        self.flows[key] = hashes
+        if len(self.flows) > self.capacity:
+            self.flows.popitem(last=False)
+        return hashes
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def summary(self):
+        return (f'{self.hits} hits, {self.misses} misses ({self.pair_hits} with cached '
+                f'5-tuple hashes), hit rate {self.hit_rate():.3f}, {len(self.flows)} flows cached')
+
+
+def flow_hashes_array(mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst,
+                      hash_bits=HASH_BITS):
+    mask = hash_mask(hash_bits)
+    mac_src = np.asarray(mac_src, dtype=np.int64)
+    ip_src = np.asarray(ip_src, dtype=np.int64)
+    ip_dst = np.asarray(ip_dst, dtype=np.int64)
+    ip_proto = np.asarray(ip_proto, dtype=np.int64)
+    port_src = np.asarray(port_src, dtype=np.int64)
+    port_dst = np.asarray(port_dst, dtype=np.int64)
+
+    crc_ip_src = crc16_array(ip_src, IP_BYTES)
+    crc_ip_dst = crc16_array(ip_dst, IP_BYTES)
+
+    crc_ip_0 = crc16_array(ip_dst, IP_BYTES, crc_ip_src)
+    crc_ip_1 = crc16_array(ip_src, IP_BYTES, crc_ip_dst)
+
+    crc_five_t_0 = crc16_array(ip_proto, PROTO_BYTES, crc_ip_0)
+    crc_five_t_0 = crc16_array(port_src, PORT_BYTES, crc_five_t_0)
+    crc_five_t_0 = crc16_array(port_dst, PORT_BYTES, crc_five_t_0)
+
+    crc_five_t_1 = crc16_array(ip_proto, PROTO_BYTES, crc_ip_1)
+    crc_five_t_1 = crc16_array(port_dst, PORT_BYTES, crc_five_t_1)
+    crc_five_t_1 = crc16_array(port_src, PORT_BYTES, crc_five_t_1)
+
+    hash_ip_0 = crc_ip_0 & mask
+    hash_ip_1 = crc_ip_1 & mask
+    hash_five_t_0 = crc_five_t_0 & mask
+    hash_five_t_1 = crc_five_t_1 & mask
+
+    return (crc16_array(ip_src, IP_BYTES, crc16_array(mac_src, MAC_BYTES)) & mask,
+            crc_ip_src & mask,
+            hash_ip_0, hash_ip_1, hash_ip_0 ^ hash_ip_1,
+            hash_five_t_0, hash_five_t_1, hash_five_t_0 ^ hash_five_t_1)
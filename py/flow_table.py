@@ -0,0 +1,83 @@
+import numpy as np
+from collections import OrderedDict
+
+#
+# Bounded flow table for the per-flow stats kept by the pipelines (update_stats).
+#
+# Maps a flow key to its stats vector (float64, zeros for a new flow), in least recently used
+# order. A flow is evicted when the table is over capacity (LRU) or when it was not seen
+# for idle_timeout seconds of trace time. An evicted flow that shows up again starts over
+# from zeros, like a new flow. capacity / idle_timeout 0: no limit.
+#
+# Usage:
+#
+#  table = FlowTable(12, capacity=1000000, idle_timeout=600)
+#  stats = table.lookup(key, ts)
+#  stats[0:3] = ...
+#
+
+class FlowTable:
+    def __init__(self, size, capacity=0, idle_timeout=0):
+        self.size = size                    # Length of the stats vector of each flow.
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self.flows = OrderedDict()          # Key -> [last seen ts, stats].
+
+        self.lookups = 0
+        self.inserts = 0
+        self.evictions_capacity = 0
+        self.evictions_idle = 0
+
+    def __len__(self):
+        return len(self.flows)
+
+    def __contains__(self, key):
+        return key in self.flows
+
+    def lookup(self, key, ts):
+        self.lookups += 1
+        entry = self.flows.get(key)
+        if entry is not None:
+            entry[0] = ts
+            self.flows.move_to_end(key)
+        else:
+            entry = [ts, np.zeros(self.size)]
+            self.flows[key] = entry
+            self.inserts += 1
+            if self.capacity and len(self.flows) > self.capacity:
+                self.flows.popitem(last=False)
+                self.evictions_capacity += 1
+
+        # The least recently used flows are the idle ones (trace timestamps are non-decreasing).
+        if self.idle_timeout and ts is not None:
+            while True:
+                oldest = next(iter(self.flows.values()))
+                # Flows loaded with update() are idle from the first check on.
+                if oldest[0] is None:
+                    oldest[0] = ts
+                if ts - oldest[0] <= self.idle_timeout:
+                    break
+                self.flows.popitem(last=False)
+                self.evictions_idle += 1
+
+        return entry[1]
+
+    def clear(self):
+        self.flows.clear()
+
+    def occupancy(self):
+        return len(self.flows) / self.capacity if self.capacity else 0
+
+    # Plain dict (key -> stats), e.g. to save the trained stats.
+    def to_dict(self):
+        return {key: entry[1] for key, entry in self.flows.items()}
+
+    # Adds the flows of a dict (key -> stats), e.g. previously saved trained stats.
+    def update(self, flows):
+        for key, stats in flows.items():
+            self.lookup(key, None)[:] = stats
+
+    def summary(self):
+        return (f'{len(self.flows)} flows, occupancy {self.occupancy():.3f}, '
+                f'{self.inserts} inserts, {self.evictions_capacity} capacity evictions, '
+                f'{self.evictions_idle} idle evictions')
@@ -0,0 +1,103 @@
+import numpy as np
+from flow_hash import HASH_BITS, hash_mask
+
+#
+# Hash collision telemetry for the FC register tables.
+#
+# Tracks, for each flow key table, the last flow key of each slot and the packets whose slot
+# was last used by a different flow key (i.e., packets updating a slot shared with another
+# flow, overwriting its state), in total and per slot. The state is bounded by the number of
+# slots, whatever the number of flows. Slots are the hash values, before the decay counter
+# offset is applied.
+#
+# Usage:
+#
+#  telemetry = HashTelemetry(hash_bits=13)
+#  telemetry.update(hashes, (mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst))
+#  telemetry.update_array(hashes, columns)    # Same, for whole NumPy columns (batches).
+#  print(telemetry.summary())
+#
+
+# Flow key tables: index in the flow_hashes() output, header fields of the flow key
+# (indexes of mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst).
+TABLES = {
+    'mac_ip_src': (0, (0, 1)),
+    'ip_src': (1, (1,)),
+    'ip': (2, (1, 2)),
+    'five_t': (5, (1, 2, 3, 4, 5))}
+
+
+class HashTelemetry:
+    def __init__(self, hash_bits=HASH_BITS):
+        self.hash_slots = hash_mask(hash_bits) + 1
+        self.packets = 0
+        self.last_key = {table: {} for table in TABLES}     # Slot -> last flow key.
+        # Slot -> packets overwriting the slot of another flow key.
+        self.overwrites = {table: np.zeros(self.hash_slots, dtype=np.int64) for table in TABLES}
+        self.collisions = {table: 0 for table in TABLES}
+
+    def update(self, hashes, fields):
+        self.packets += 1
+        for table, (hash_index, key_fields) in TABLES.items():
+            slot = hashes[hash_index]
+            key = tuple(fields[i] for i in key_fields)
+            last = self.last_key[table].get(slot)
+            if last is not None and last != key:
+                self.collisions[table] += 1
+                self.overwrites[table][slot] += 1
+            self.last_key[table][slot] = key
+
+    def update_array(self, hashes, fields):
+        fields = [np.asarray(field, dtype=np.int64) for field in fields]
+        n = len(fields[0])
+        if n == 0:
+            return
+        self.packets += n
+        for table, (hash_index, key_fields) in TABLES.items():
+            rows = np.column_stack(
+                [np.asarray(hashes[hash_index], dtype=np.int64)]
+                + [fields[i] for i in key_fields])
+
+            # Packets (sorted by slot, in packet order) using a slot last used by another key.
+            rows = rows[np.argsort(rows[:, 0], kind='stable')]
+            same_slot = rows[1:, 0] == rows[:-1, 0]
+            other_key = (rows[1:, 1:] != rows[:-1, 1:]).any(axis=1)
+            overwrite = same_slot & other_key
+            np.add.at(self.overwrites[table], rows[1:, 0][overwrite], 1)
+            collisions = int(overwrite.sum())
+
+            # First packet of each slot: compared with the last key before the batch.
+            first = np.flatnonzero(np.concatenate(([True], ~same_slot)))
+            last = np.append(first[1:], n) - 1
+            last_key = self.last_key[table]
+            for row_first, row_last in zip(rows[first].tolist(), rows[last].tolist()):
+                prev = last_key.get(row_first[0])
+                if prev is not None and prev != tuple(row_first[1:]):
+                    collisions += 1
+                    self.overwrites[table][row_first[0]] += 1
+                last_key[row_last[0]] = tuple(row_last[1:])
+            self.collisions[table] += collisions
+
+    def report(self):
+        # Per table: occupied slots, occupancy, slots overwritten by more than one flow key
+        # (shared), max overwrites of a slot and collision rate (packets).
+        report = {}
+        for table in TABLES:
+            occupied = len(self.last_key[table])
+            report[table] = {
+                'occupied_slots': occupied,
+                'occupancy': occupied / self.hash_slots,
+                'shared_slots': int(np.count_nonzero(self.overwrites[table])),
+                'max_overwrites_per_slot': int(self.overwrites[table].max()),
+                'collision_rate': self.collisions[table] / self.packets if self.packets else 0}
+        return report
+
+    def summary(self):
+        lines = [f'Hash telemetry: {self.hash_slots} slots, {self.packets} pkts.']
+        for table, values in self.report().items():
+            lines.append(
+                f'  {table}: occupancy {values["occupancy"]:.3f} '
+                f'({values["occupied_slots"]} slots), {values["shared_slots"]} shared slots '
+                f'(max {values["max_overwrites_per_slot"]} overwrites/slot), '
+                f'collision rate {values["collision_rate"]:.4f}')
+        return '\n'.join(lines)
@@ -0,0 +1,86 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+#
+# Memoized inference results of a frozen model, for repeated input vectors.
+#
+# The FC stats are integer, shift-quantized values, so the input vectors of steady flows often
+# repeat exactly. InferenceCache maps a hash of the input vector bytes (128-bit BLAKE2b) to the
+# model output (e.g. the KitNET rmse), for the most recently seen vectors (LRU). It is only
+# valid while the model does not change.
+#
+# Usage:
+#
+#  cache = InferenceCache(65536)
+#  rmse = cache.lookup(input_stats, kitnet.process)
+#  rmse_list = cache.lookup_batch(input_matrix, kitnet_exec.execute)
+#  print(cache.summary())
+#
+
+# Default number of input vectors kept by InferenceCache.
+INFERENCE_CACHE_SIZE = 1 << 16
+
+
+def vector_key(x):
+    return hashlib.blake2b(np.ascontiguousarray(x, dtype=np.float64).tobytes(),
+                           digest_size=16).digest()
+
+
+class InferenceCache:
+    def __init__(self, capacity=INFERENCE_CACHE_SIZE):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.results = OrderedDict()    # Vector key -> model output.
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is not None:
+            self.hits += 1
+            self.results.move_to_end(key)
+        else:
+            self.misses += 1
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+
+    # Output of a vector, computed with infer(vector) on a miss.
+    def lookup(self, x, infer):
+        key = vector_key(x)
+        result = self.get(key)
+        if result is None:
+            result = infer(x)
+            self.put(key, result)
+        return result
+
+    # Outputs of the rows of a matrix, the missed rows computed with infer(matrix) at once.
+    def lookup_batch(self, x, infer):
+        keys = [vector_key(row) for row in x]
+        results = [self.get(key) for key in keys]
+        missed = [i for i, result in enumerate(results) if result is None]
+        if missed:
+            for i, result in zip(missed, infer(x[missed])):
+                results[i] = result
+                self.put(keys[i], result)
+        return results
+
+    def clear(self):
+        self.results.clear()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def summary(self):
+        return (f'{self.hits} hits, {self.misses} misses, hit rate {self.hit_rate():.3f}, '
+                f'{len(self.results)} vectors cached')
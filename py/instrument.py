@@ -0,0 +1,127 @@
+import json
+import time
+
+#
+# Per-stage latency instrumentation of the pipelines' packet loop.
+#
+# Each stage (feature_extract, hash, decay_check, stats_calc, update_stats, model, I/O...) has
+# a nanosecond timer (time.perf_counter_ns()) feeding an HDR-style latency histogram:
+# log-linear buckets, exact up to 2^SUB_BITS ns and then 2^SUB_BITS buckets per power of two
+# (at most 1/2^SUB_BITS relative error), so the percentiles (p50/p99/p99.9) are cheap to keep.
+#
+# Instrumentation can be switched on and off at runtime (enabled): when off, the timers are
+# not read and nothing is recorded. A stage timed across a switch is not recorded.
+#
+# Usage:
+#
+#  instrument = Instrument(enabled=True)
+#  t = instrument.start()
+#  ...
+#  t = instrument.lap('feature_extract', t)    # Records the stage, returns the current time.
+#  ...
+#  instrument.lap('update_stats', t)
+#  instrument.dump('instrument.json')
+#
+
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+
+PERCENTILES = {'p50': 50, 'p99': 99, 'p99.9': 99.9}
+
+
+# Bucket of a latency value (ns).
+def bucket(value):
+    exp = value.bit_length() - 1
+    if exp < SUB_BITS:
+        return value
+    return (exp - SUB_BITS + 1) * SUB_BUCKETS + (value >> (exp - SUB_BITS)) - SUB_BUCKETS
+
+
+# Lowest value and width of a bucket.
+def bucket_range(index):
+    if index < SUB_BUCKETS:
+        return index, 1
+    shift = index // SUB_BUCKETS - 1
+    return (index % SUB_BUCKETS + SUB_BUCKETS) << shift, 1 << shift
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = {}            # Bucket -> count.
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        index = bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    # Value at the given percentile (middle of its bucket, within [min, max]).
+    def percentile(self, percentile):
+        if not self.count:
+            return 0
+        rank = percentile / 100 * self.count
+        cumulative = 0
+        for index in sorted(self.counts):
+            cumulative += self.counts[index]
+            if cumulative >= rank:
+                low, width = bucket_range(index)
+                return min(max(low + (width - 1) / 2, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        values = {
+            'count': self.count,
+            'total_ns': self.total,
+            'mean_ns': self.total / self.count if self.count else 0,
+            'min_ns': self.min or 0,
+            'max_ns': self.max}
+        for name, percentile in PERCENTILES.items():
+            values[f'{name}_ns'] = self.percentile(percentile)
+        return values
+
+
+class Instrument:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}            # Stage -> Histogram.
+
+    def start(self):
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def lap(self, stage, start):
+        # Records the time since start (start() / previous lap()) for stage.
+        if not self.enabled:
+            return 0
+        now = time.perf_counter_ns()
+        if start:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.record(now - start)
+        return now
+
+    def toggle(self):
+        self.enabled = not self.enabled
+
+    def to_dict(self):
+        return {stage: histogram.to_dict() for stage, histogram in self.stages.items()}
+
+    def summary(self):
+        lines = ['Stage latency (ns): count, mean, p50, p99, p99.9, max.']
+        for stage, values in self.to_dict().items():
+            lines.append(
+                f'  {stage}: {values["count"]}, {values["mean_ns"]:.0f}, {values["p50_ns"]:.0f}, '
+                f'{values["p99_ns"]:.0f}, {values["p99.9_ns"]:.0f}, {values["max_ns"]}')
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        with open(path, 'w') as f_json:
+            json.dump(self.to_dict(), f_json, indent=2)
@@ -0,0 +1,64 @@
+import numpy as np
+
+#
+# Batched execution of a trained (frozen) KitNET model.
+#
+# Scores a matrix of input vectors (one per row) with the same operations as
+# KitNET.execute() / dA.execute() for a single vector, so that the rmse of each row is
+# identical to the per-vector path:
+#  - the vector-matrix products are stacked (K, 1, n) @ (n, m) products, i.e. one gemv per row,
+#    the same BLAS call as numpy.dot(vector, matrix) (a single K x n matrix product, gemm,
+#    rounds differently);
+#  - the other operations are elementwise, and the row means are taken over C-contiguous rows
+#    (same summation order as the mean of a vector).
+#
+# Usage:
+#
+#  kitnet_exec = KitNETExec(kitnet)
+#  if model_frozen(kitnet):
+#      rmse = kitnet_exec.execute(input_matrix)
+#
+
+
+# Same as the KitNET/dA sigmoid.
+def sigmoid(x):
+    return 1. / (1 + np.exp(-x))
+
+
+# KitNET.process() only executes the model (no training) after both grace periods.
+def model_frozen(kitnet):
+    return kitnet.n_trained > kitnet.FM_grace_period + kitnet.AD_grace_period
+
+
+# Rows of x times matrix, as numpy.dot(row, matrix) for each row.
+def rows_dot(x, matrix):
+    return np.matmul(x[:, None, :], matrix)[:, 0, :]
+
+
+class KitNETExec:
+    def __init__(self, kitnet):
+        self.kitnet = kitnet
+
+    def execute(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        kitnet = self.kitnet
+
+        # Ensemble layer.
+        s_l1 = np.zeros((len(x), len(kitnet.ensembleLayer)))
+        for a, ae in enumerate(kitnet.ensembleLayer):
+            s_l1[:, a] = self.ae_execute(ae, x[:, kitnet.v[a]])
+        kitnet.n_executed += len(x)
+
+        # Output layer.
+        return self.ae_execute(kitnet.outputLayer, s_l1)
+
+    def ae_execute(self, ae, x):
+        if ae.n < ae.params.gracePeriod:
+            return np.zeros(len(x))
+
+        # 0-1 normalize
+        x = np.ascontiguousarray(x)
+        x = (x - ae.norm_min) / (ae.norm_max - ae.norm_min + 0.0000000000000001)
+        y = sigmoid(rows_dot(x, ae.W) + ae.hbias)
+        z = sigmoid(rows_dot(y, ae.W.T) + ae.vbias)
+        return np.sqrt(np.ascontiguousarray((x - z) ** 2).mean(axis=1))
@@ -0,0 +1,150 @@
+import numpy as np
+from multiprocessing import Pool, shared_memory
+
+#
+# Training of the KitNET ensemble and output layers (AD grace period), off the per-vector
+# KitNET.process() path.
+#
+# KitNETTrain: parallel training of the ensemble layer.
+# The ensemble autoencoders are independent: each one only sees its own feature cluster
+# (kitnet.v). A chunk of input vectors (one per row) is copied into shared memory (attached
+# once by each worker), and each autoencoder is trained on all the rows of its feature slice
+# in a pool worker, with its own dA.train(). The trained autoencoders and their per-row rmse
+# are then gathered, and the output layer is trained on the rmse rows, in order. Every
+# autoencoder gets the same updates, in the same order, as in KitNET.process().
+#
+# KitNETTrainBatch: mini-batch SGD. Each autoencoder is trained on batch_size vectors at a
+# time, with vectorized forward and backward passes (matrix-matrix products) and the mean
+# gradient of the batch. The normalization bounds are updated once per batch. The rmse of
+# each vector is computed with the weights before the batch update (as the online rmse is
+# computed before the vector update), but the trained model is not the online one.
+#
+# Usage:
+#
+#  kitnet_train = KitNETTrain(kitnet, workers=8, chunk_rows=50000)
+#  kitnet_train = KitNETTrainBatch(kitnet, batch_size=32)
+#  if ad_training(kitnet):
+#      rmse = kitnet_train.train(input_matrix)
+#  kitnet_train.close()
+#
+
+# KitNET.process() trains the ensemble and output layers (AD grace period), i.e. the feature
+# map is known and both grace periods are not over yet.
+def ad_training(kitnet):
+    return kitnet.v is not None and \
+        kitnet.n_trained <= kitnet.FM_grace_period + kitnet.AD_grace_period
+
+
+# Shared memory block of the pool workers (attached once per worker).
+worker_shm = None
+
+
+def worker_init(shm_name):
+    global worker_shm
+    worker_shm = shared_memory.SharedMemory(name=shm_name)
+
+
+# Pool worker: trains an autoencoder on its feature slice of the rows in shared memory.
+def train_ae(task):
+    shape, v, ae = task
+    x_slice = np.ndarray(shape, dtype=np.float64, buffer=worker_shm.buf)[:, v]
+    rmse = np.array([ae.train(row) for row in x_slice])
+    return ae, rmse
+
+
+class KitNETTrain:
+    def __init__(self, kitnet, workers, chunk_rows):
+        self.kitnet = kitnet
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.shm = None
+        self.pool = None
+
+    def train(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        kitnet = self.kitnet
+        if self.pool is None:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=max(self.chunk_rows, len(x)) * x.shape[1] * x.itemsize)
+            self.pool = Pool(self.workers, initializer=worker_init, initargs=(self.shm.name,))
+
+        np.ndarray(x.shape, dtype=np.float64, buffer=self.shm.buf)[:] = x
+        results = self.pool.map(
+            train_ae, [(x.shape, kitnet.v[a], ae) for a, ae in enumerate(kitnet.ensembleLayer)])
+
+        # Ensemble layer.
+        s_l1 = np.zeros((len(x), len(kitnet.ensembleLayer)))
+        for a, (ae, rmse) in enumerate(results):
+            kitnet.ensembleLayer[a] = ae
+            s_l1[:, a] = rmse
+
+        # Output layer.
+        rmse = [kitnet.outputLayer.train(row) for row in s_l1]
+        kitnet.n_trained += len(x)
+        return rmse
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+def sigmoid(x):
+    return 1. / (1 + np.exp(-x))
+
+
+# One mini-batch SGD update of an autoencoder (dA) on the rows of x. Returns the rmse of each row.
+def ae_train_batch(ae, x):
+    ae.n += len(x)
+
+    # Update the norms, 0-1 normalize.
+    ae.norm_max = np.maximum(ae.norm_max, x.max(axis=0))
+    ae.norm_min = np.minimum(ae.norm_min, x.min(axis=0))
+    x = (x - ae.norm_min) / (ae.norm_max - ae.norm_min + 0.0000000000000001)
+
+    if ae.params.corruption_level > 0.0:
+        tilde_x = ae.get_corrupted_input(x, ae.params.corruption_level)
+    else:
+        tilde_x = x
+    y = sigmoid(np.dot(tilde_x, ae.W) + ae.hbias)
+    z = sigmoid(np.dot(y, ae.W.T) + ae.vbias)
+
+    # Mean gradient of the batch.
+    l_h2 = x - z
+    l_h1 = np.dot(l_h2, ae.W) * y * (1 - y)
+    lr = ae.params.lr / len(x)
+    ae.W += lr * (np.dot(tilde_x.T, l_h1) + np.dot(l_h2.T, y))
+    ae.hbias += lr * l_h1.sum(axis=0)
+    ae.vbias += lr * l_h2.sum(axis=0)
+
+    return np.sqrt((l_h2 ** 2).mean(axis=1))
+
+
+class KitNETTrainBatch:
+    def __init__(self, kitnet, batch_size):
+        self.kitnet = kitnet
+        self.batch_size = batch_size
+
+    def train(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        kitnet = self.kitnet
+        rmse = []
+        for i in range(0, len(x), self.batch_size):
+            batch = x[i:i+self.batch_size]
+
+            # Ensemble layer.
+            s_l1 = np.zeros((len(batch), len(kitnet.ensembleLayer)))
+            for a, ae in enumerate(kitnet.ensembleLayer):
+                s_l1[:, a] = ae_train_batch(ae, batch[:, kitnet.v[a]])
+
+            # Output layer.
+            rmse.extend(ae_train_batch(kitnet.outputLayer, s_l1))
+        kitnet.n_trained += len(x)
+        return rmse
+
+    def close(self):
+        pass
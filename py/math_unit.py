@@ -1,6 +1,8 @@
 #!env python
 
 from __future__ import print_function
+import numpy as np
+from fixed_point import bit_length_array
 #
 # This class simulates Tofino Math unit. Please, see BEACON-201 or similar
 # course for more details
@@ -14,6 +16,13 @@ from __future__ import print_function
 #  result = math_unit.compute(100)
 #  # Hopefully this is close to 10000 :) Should be 9216, so 7.84% error
 #
+#  # Same computation for a whole array of (integer) arguments
+#  results = math_unit.compute_array(np.array([100, 200, 300]))
+#
+
+
+# Arguments below this value are precomputed: compute() becomes a single table lookup.
+TABLE_SIZE = 1 << 16
 
 
 class MathUnit():
@@ -42,8 +51,9 @@ class MathUnit():
         for x in lookup:
             if not (0 <= x <= 255):
                 raise ValueError("All lookup values must be between 0 and 255")
-        self.lookup = lookup
-        self.lookup.reverse()
+        # Reversed copy: the caller's list is left untouched.
+        self.lookup = list(reversed(lookup))
+        self.lookup_array = np.array(self.lookup, dtype=np.int64)
 
         if size not in [8, 16, 32]:
             raise ValueError("Size can only be 8, 16 or 32 (bits)")
@@ -51,7 +61,20 @@ class MathUnit():
         self.size = size
         self.mask = (1 << size) - 1
 
+        # Results for the common range of arguments (e.g. pkt lengths).
+        self.table_array = None
+        self.table_array = self.compute_array(np.arange(TABLE_SIZE))
+        self.table = self.table_array.tolist()
+
     def compute(self, arg):
+        arg = int(arg)
+
+        if 0 <= arg < TABLE_SIZE:
+            return self.table[arg]
+
+        return self.compute_direct(arg)
+
+    def compute_direct(self, arg):
 
         sqrt_flag = False
 
@@ -107,3 +130,64 @@ class MathUnit():
             result = new_mantissa << new_exp
 
         return result & self.mask
+
+    # Vectorized compute(), bit-exact with the scalar version for any int64 argument.
+    def compute_array(self, arg):
+        arg = np.asarray(arg).astype(np.int64)
+
+        # Arguments all in the table range: a single lookup.
+        if self.table_array is not None and arg.size > 0 and \
+                arg.min() >= 0 and arg.max() < TABLE_SIZE:
+            return self.table_array[arg]
+
+        result = np.zeros(arg.shape, dtype=np.int64)
+
+        # Negative arguments are left to the scalar version.
+        neg = arg < 0
+        for i in zip(*np.nonzero(neg)):
+            result[i] = self.compute_direct(int(arg[i]))
+
+        pos = arg > 0
+        x = arg[pos]
+        bits = bit_length_array(x)
+
+        # Exponent of the argument (x << 3 has bits + 2 as its exponent).
+        exp = bits - 1
+        if self.shift == -1:
+            sqrt_flag = (bits % 2) != 0
+            exp = exp + sqrt_flag
+        else:
+            sqrt_flag = np.zeros(len(x), dtype=bool)
+
+        # First 4 bits, normalized so that the top bit is always set.
+        mantissa = np.where(bits >= 4, x >> np.maximum(bits - 4, 0),
+                            x << np.maximum(4 - bits, 0)) & 0xF
+        # For sqrt with an odd exponent, the first (up to) 4 bits are used as they are,
+        # and the lookup index is mantissa - 8 (negative indexes wrap around, as for lists).
+        mantissa_sqrt = x >> np.maximum(bits - 4, 0)
+        index = np.where(sqrt_flag, (mantissa_sqrt - 8) % 16, mantissa)
+
+        if self.shift == -1:
+            new_exp = exp >> 1
+        elif self.shift == 0:
+            new_exp = exp
+        else:
+            new_exp = exp << 1
+
+        if self.invert:
+            new_exp = -new_exp
+
+        new_exp = new_exp + self.scale
+
+        new_mantissa = self.lookup_array[index]
+
+        # Shifts of 64 bits or more are not defined for int64: their result is 0 after the mask.
+        right = np.minimum(np.maximum(-new_exp, 0), 63)
+        left = np.minimum(np.maximum(new_exp, 0), 63)
+        shifted = new_mantissa.astype(np.uint64) << left.astype(np.uint64)
+        value = np.where(new_exp < 0, new_mantissa >> right, shifted.astype(np.int64))
+        value = np.where(new_exp >= 64, 0, value)
+
+        result[pos] = value & self.mask
+        return result
+
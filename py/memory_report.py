@@ -0,0 +1,266 @@
+import json
+import itertools
+import mmap
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import numpy as np
+
+#
+# Memory footprint of the pipelines' flow state and result buffers.
+#
+# A background thread samples, every interval seconds, the size in bytes and the number of
+# entries of each named structure (STRUCTURES: FC registers and hash cache, flow tables,
+# stats buffers, rmse/prediction lists, peregrine_eval, stats_global, pending batches...).
+# The sizes are structure-aware: the containers are measured with sys.getsizeof() and their
+# elements are sized from a sample of SAMPLE elements (deep size, scaled to the length), so a
+# sample costs the same whatever the size of the structures. The data of an array is counted once
+# per sample, at the structure holding the owning array: views (e.g. the StatsBuffer rows held by
+# the KitNET buffers) only count their header, unless their owner is held by no structure (then
+# its data is counted once, at the first structure holding a view). Views of memory-mapped files
+# (e.g. the trace columns) are not counted. With trace_malloc, the tracemalloc totals (current
+# and peak traced memory) are sampled too; the process RSS always is.
+#
+# Each sample logs the growth rate of every structure (bytes/s, bytes/packet since the first
+# sample) and estimates its size at the end of the trace: current size + bytes/packet *
+# remaining packets (an estimate: the buffers of each phase grow at different rates).
+#
+# Usage:
+#
+#  memory_report = MemoryReport(pipeline, interval=60)
+#  memory_report.start()
+#  pipeline.process()
+#  memory_report.stop()
+#  print(memory_report.summary())
+#  memory_report.dump('memory.json')
+#
+
+# Named structures (attribute paths of the pipeline), measured when present.
+STRUCTURES = [
+    'fc.registers', 'fc.hash_cache', 'fc.telemetry', 'fc_buffer',
+    'stats_mac_ip_src', 'stats_ip_src', 'stats_ip', 'stats_five_t',
+    'df_train_stats_list', 'df_exec_stats_list', 'train_buffer', 'exec_buffer', 'window',
+    'update_replay', 'inference_cache', 'rmse_list', 'prediction', 'peregrine_eval',
+    'stats_global', 'trace_labels', 'trace_labels_global']
+
+# Elements sampled per container.
+SAMPLE = 64
+
+# Nesting levels measured (deeper elements are only counted with sys.getsizeof()).
+MAX_DEPTH = 6
+
+
+# Array owning the data of a view (the end of its chain of bases).
+def owner(array):
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+# The array is a view of a memory-mapped file (e.g. the trace columns).
+def mapped(array):
+    base = array.base
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap):
+            return True
+        base = base.base
+    return isinstance(base, mmap.mmap)
+
+
+def sample_indices(n):
+    return np.linspace(0, n - 1, min(n, SAMPLE)).astype(np.int64).tolist() if n else []
+
+
+# Size in bytes of an object and (a sampled estimate of) everything it holds.
+# arrays: the arrays measured in the sample, {'owned': ids of the owning arrays measured,
+# 'viewed': {owner id: owner} of the views measured} (see MemoryReport.sample()).
+def deep_size(obj, arrays, depth=0):
+    size = sys.getsizeof(obj)
+    if depth >= MAX_DEPTH:
+        return size
+
+    if isinstance(obj, np.ndarray):
+        # getsizeof() counts the data of the arrays owning it, not of views: the data of a view
+        # is counted at its owner. Views of other buffers (e.g. bytes) are counted as is.
+        if obj.base is None:
+            arrays['owned'].add(id(obj))
+        elif not mapped(obj):
+            base = owner(obj)
+            if base.base is None:
+                arrays['viewed'].setdefault(id(base), base)
+            else:
+                size += obj.nbytes
+        if obj.dtype == object and obj.size:
+            flat = obj.reshape(-1)
+            sample = [deep_size(flat[i], arrays, depth + 1) for i in sample_indices(obj.size)]
+            size += sum(sample) * obj.size // len(sample)
+        return size
+    if hasattr(obj, 'memory_usage'):
+        # Pandas DataFrame/Series.
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+
+    if isinstance(obj, dict):
+        n = len(obj)
+        items = list(itertools.islice(obj.items(), SAMPLE))
+        sample = [deep_size(key, arrays, depth + 1) + deep_size(value, arrays, depth + 1)
+                  for key, value in items]
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        sample = [deep_size(obj[i], arrays, depth + 1) for i in sample_indices(n)]
+    elif hasattr(obj, '__iter__') and hasattr(obj, '__len__') and not hasattr(obj, '__dict__'):
+        # Sets, deques.
+        n = len(obj)
+        sample = [deep_size(value, arrays, depth + 1)
+                  for value in itertools.islice(obj, SAMPLE)]
+    elif hasattr(obj, '__dict__'):
+        return size + deep_size(vars(obj), arrays, depth + 1)
+    else:
+        return size
+    return size + (sum(sample) * n // len(sample) if sample else 0)
+
+
+def entries(obj):
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def resolve(pipeline, path):
+    obj = pipeline
+    for name in path.split('.'):
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return None
+    return obj
+
+
+def rss():
+    # Current resident set size (Linux), in bytes.
+    try:
+        with open('/proc/self/statm') as f_statm:
+            return int(f_statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def fmt_bytes(value):
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if abs(value) < 1024:
+            return f'{value:.1f} {unit}'
+        value /= 1024
+    return f'{value:.1f} TiB'
+
+
+class MemoryReport:
+    def __init__(self, pipeline, interval=60, trace_malloc=False):
+        self.pipeline = pipeline
+        self.interval = interval
+        self.trace_malloc = trace_malloc
+        self.samples = []               # [{time, packets, rss, traced, structures}].
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.trace_malloc:
+            tracemalloc.start()
+        self.sample()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+            print(self.summary())
+
+    def stop(self):
+        # Final sample (end of the run), then stops the thread.
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.sample()
+        if self.trace_malloc:
+            tracemalloc.stop()
+
+    def sample(self):
+        structures = {}
+        previous = self.samples[-1]['structures'] if self.samples else {}
+        arrays = {'owned': set(), 'viewed': {}}
+        viewed_by = {}          # Owner id -> first structure holding a view of it.
+        for path in STRUCTURES:
+            obj = resolve(self.pipeline, path)
+            if obj is None:
+                continue
+            try:
+                structures[path] = {'bytes': deep_size(obj, arrays), 'entries': entries(obj)}
+            except (RuntimeError, IndexError):
+                # Resized by the packet loop while being measured: keep the previous sample.
+                if path in previous:
+                    structures[path] = previous[path]
+                continue
+            for base_id in arrays['viewed']:
+                viewed_by.setdefault(base_id, path)
+        # Owners of views held by no structure: counted once, at the first structure viewing them.
+        for base_id, base in arrays['viewed'].items():
+            if base_id not in arrays['owned'] and viewed_by.get(base_id) in structures:
+                structures[viewed_by[base_id]]['bytes'] += base.nbytes
+        values = {
+            'time': time.time(), 'packets': sum(self.pipeline.metrics()['packets_total'].values()),
+            'rss': rss(), 'structures': structures}
+        if self.trace_malloc:
+            values['traced'], values['traced_peak'] = tracemalloc.get_traced_memory()
+        self.samples.append(values)
+        return values
+
+    # Growth of each structure between the first and the last sample, and its estimated size
+    # at the end of the trace: {path: (bytes/s, bytes/packet, estimated bytes)}.
+    def growth(self):
+        first = self.samples[0]
+        last = self.samples[-1]
+        seconds = last['time'] - first['time']
+        packets = last['packets'] - first['packets']
+        remaining = max(self.pipeline.trace_size - last['packets'], 0)
+        rates = {}
+        for path, values in last['structures'].items():
+            growth = values['bytes'] - first['structures'].get(path, {'bytes': 0})['bytes']
+            per_packet = growth / packets if packets else 0
+            rates[path] = (growth / seconds if seconds else 0, per_packet,
+                           values['bytes'] + max(per_packet, 0) * remaining)
+        return rates
+
+    def summary(self):
+        last = self.samples[-1]
+        rates = self.growth()
+        lines = [f'Memory: {last["packets"]} packets'
+                 + (f', RSS {fmt_bytes(last["rss"])}' if last['rss'] is not None else '')
+                 + (f', traced {fmt_bytes(last["traced"])} (peak {fmt_bytes(last["traced_peak"])})'
+                    if 'traced' in last else '')]
+        lines.append(f'  {"Structure":<22} {"Size":>12} {"Entries":>10} {"Bytes/s":>12} '
+                     f'{"Bytes/pkt":>10} {"End estimate":>14}')
+        for path, values in sorted(last['structures'].items(), key=lambda item: -item[1]['bytes']):
+            per_second, per_packet, estimate = rates[path]
+            n = values['entries'] if values['entries'] is not None else '-'
+            lines.append(f'  {path:<22} {fmt_bytes(values["bytes"]):>12} {n:>10} '
+                         f'{fmt_bytes(per_second):>12} {per_packet:>10.1f} '
+                         f'{fmt_bytes(estimate):>14}')
+        total = sum(values['bytes'] for values in last['structures'].values())
+        lines.append(f'  {"total":<22} {fmt_bytes(total):>12} {"":>10} {"":>12} {"":>10} '
+                     f'{fmt_bytes(sum(rate[2] for rate in rates.values())):>14}')
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {'samples': self.samples,
+                'growth': {path: {'bytes_per_second': rate[0], 'bytes_per_packet': rate[1],
+                                  'end_estimate': rate[2]}
+                           for path, rate in self.growth().items()}}
+
+    def dump(self, path):
+        with open(path, 'w') as f_json:
+            json.dump(self.to_dict(), f_json, indent=2)
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#
+# Machine-readable metrics of a running pipeline, in the Prometheus text format.
+#
+# A background thread takes a snapshot of the pipeline state every interval seconds
+# (pipeline.metrics(): packets per phase, training progress, flow table sizes, detections,
+# buffer depths), adds the packet rate over the interval and renders it. The packet loop is
+# not touched: the snapshot only reads counters and container sizes the pipeline already has.
+#
+# The rendered metrics are written to a textfile (path, e.g. for the node_exporter textfile
+# collector; replaced atomically) and/or served over HTTP on localhost (port, GET /metrics).
+#
+# Usage:
+#
+#  metrics = Metrics(pipeline, 'kitnet', path='eval/kitnet/peregrine.prom', port=9100)
+#  metrics.start()
+#  pipeline.process()
+#  metrics.stop()
+#
+
+# Metric name -> type, help, label of the per-key values (None: single value).
+METRICS = {
+    'packets_total': ('counter', 'Packets processed by the pipeline, per phase.', 'phase'),
+    'packets_per_second': ('gauge', 'Packet processing rate over the last interval.', None),
+    'training_progress': ('gauge', 'Training vectors processed / training vectors needed.', None),
+    'flow_table_flows': ('gauge', 'Flows stored in each flow table.', 'table'),
+    'detections_total': ('counter', 'Vectors flagged as anomalous.', None),
+    'queue_depth': ('gauge', 'Vectors waiting in each pipeline buffer.', 'queue'),
+    'uptime_seconds': ('gauge', 'Time since the metrics were started.', None),
+}
+
+PREFIX = 'peregrine'
+
+
+def render(values, plugin):
+    lines = []
+    for name, value in values.items():
+        metric_type, metric_help, label = METRICS[name]
+        lines.append(f'# HELP {PREFIX}_{name} {metric_help}')
+        lines.append(f'# TYPE {PREFIX}_{name} {metric_type}')
+        if label is None:
+            lines.append(f'{PREFIX}_{name}{{plugin="{plugin}"}} {value}')
+        else:
+            for key, key_value in value.items():
+                lines.append(f'{PREFIX}_{name}{{plugin="{plugin}",{label}="{key}"}} {key_value}')
+    return '\n'.join(lines) + '\n'
+
+
+class Metrics:
+    def __init__(self, pipeline, plugin, path=None, port=0, interval=10):
+        self.pipeline = pipeline
+        self.plugin = plugin
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self.text = ''
+
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.server = None
+        self.server_thread = None
+        self.time_start = 0
+        self.time_last = 0
+        self.packets_last = 0
+
+    def start(self):
+        self.time_start = self.time_last = time.time()
+        self.update()
+        if self.port:
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = metrics.text.encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+            self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+            self.server_thread.start()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.update()
+
+    def update(self):
+        values = self.pipeline.metrics()
+        now = time.time()
+        packets = sum(values['packets_total'].values())
+        values['packets_per_second'] = \
+            (packets - self.packets_last) / (now - self.time_last) if now > self.time_last else 0
+        values['uptime_seconds'] = now - self.time_start
+        self.packets_last = packets
+        self.time_last = now
+        self.text = render(values, self.plugin)
+
+        if self.path:
+            path_tmp = f'{self.path}.tmp'
+            with open(path_tmp, 'w') as f_prom:
+                f_prom.write(self.text)
+            os.replace(path_tmp, self.path)
+
+    def stop(self):
+        # Final update (end of the run), then stops the threads.
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.update()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
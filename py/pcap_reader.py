@@ -0,0 +1,278 @@
+import os
+import mmap
+import socket
+import struct
+import numpy as np
+import pandas as pd
+
+#
+# Native pcap/pcapng reader.
+#
+# Replaces the tshark -> csv step: the capture is memory-mapped, the record headers are walked
+# with struct and the header fields used by the FC classes are then gathered for a whole chunk
+# of packets at once with NumPy.
+#
+# Usage:
+#
+#  # Chunks of NumPy arrays (one array per column).
+#  for chunk in PcapReader('trace.pcap').chunks():
+#      chunk['ip_src']
+#
+#  # One tuple per packet, with the values in COLUMNS order.
+#  for ts, frame_len, eth_src, eth_dst, ip_src, ... in PcapReader('trace.pcap'):
+#      ...
+#
+# MAC addresses are returned as 48-bit integers and IPv4 addresses as 32-bit integers.
+# Fields that tshark would leave empty (e.g., ip.src of an ARP packet) are returned as 0,
+# which is the value the FC classes replace the csv NaNs with.
+#
+
+# Same fields (and order) as the tshark columns read by the FC classes.
+COLUMNS = ('ts', 'frame_len', 'eth_src', 'eth_dst', 'ip_src', 'ip_dst', 'ip_len', 'ip_proto',
+           'tcp_srcport', 'tcp_dstport', 'udp_srcport', 'udp_dstport')
+
+DTYPES = {
+    'ts': np.float64, 'frame_len': np.uint32, 'eth_src': np.uint64, 'eth_dst': np.uint64,
+    'ip_src': np.uint32, 'ip_dst': np.uint32, 'ip_len': np.uint16, 'ip_proto': np.uint8,
+    'tcp_srcport': np.uint16, 'tcp_dstport': np.uint16,
+    'udp_srcport': np.uint16, 'udp_dstport': np.uint16}
+
+# tshark field names for each column (header of the csv previously generated by parse_pcap).
+TSHARK_FIELDS = ('frame.time_epoch', 'frame.len', 'eth.src', 'eth.dst', 'ip.src', 'ip.dst',
+                 'ip.len', 'ip.proto', 'tcp.srcport', 'tcp.dstport', 'udp.srcport', 'udp.dstport')
+
+CHUNK_SIZE = 1 << 16
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = (0x8100, 0x88a8, 0x9100)
+
+# pcap magic numbers (as read from the file) -> (byte order, timestamp ticks per second).
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 10**6),
+    b'\xa1\xb2\xc3\xd4': ('>', 10**6),
+    b'\x4d\x3c\xb2\xa1': ('<', 10**9),
+    b'\xa1\xb2\x3c\x4d': ('>', 10**9)}
+
+PCAPNG_SHB = b'\x0a\x0d\x0d\x0a'
+PCAPNG_BOM_LE = b'\x4d\x3c\x2b\x1a'
+PCAPNG_IDB = 1
+PCAPNG_PB = 2
+PCAPNG_SPB = 3
+PCAPNG_EPB = 6
+PCAPNG_OPT_TSRESOL = 9
+PCAPNG_OPT_TSOFFSET = 14
+
+
+class PcapReader:
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path                # Path of the pcap/pcapng file.
+        self.chunk_size = chunk_size    # Number of packets per chunk.
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from zip(*[chunk[col].tolist() for col in COLUMNS])
+
+    def chunks(self):
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < 4:
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        try:
+            if mm[:4] == PCAPNG_SHB:
+                records = pcapng_records(mm)
+            elif mm[:4] in PCAP_MAGIC:
+                records = pcap_records(mm)
+            else:
+                raise ValueError(f'{self.path}: not a pcap or pcapng file')
+
+            batch = ([], [], [], [], [])
+            for record in records:
+                for field, value in zip(batch, record):
+                    field.append(value)
+                if len(batch[0]) == self.chunk_size:
+                    yield decode(buf, *batch)
+                    batch = ([], [], [], [], [])
+            if batch[0]:
+                yield decode(buf, *batch)
+        finally:
+            # The mmap can only be closed once no array references its buffer.
+            del buf
+            mm.close()
+
+    def read(self):
+        chunks = list(self.chunks())
+        if not chunks:
+            return {col: np.zeros(0, dtype=DTYPES[col]) for col in COLUMNS}
+        return {col: np.concatenate([chunk[col] for chunk in chunks]) for col in COLUMNS}
+
+
+# Each record generator yields (data offset, captured len, original len, timestamp, linktype).
+# Timestamps are computed as an exact integer division of the tick count, which matches the
+# rounding of the frame.time_epoch values printed by tshark.
+
+def pcap_records(mm):
+    endian, ticks = PCAP_MAGIC[mm[:4]]
+    if len(mm) < 24:
+        return
+    linktype = struct.unpack_from(endian + 'I', mm, 20)[0] & 0xFFFF
+    record_hdr = struct.Struct(endian + 'IIII')
+
+    pos = 24
+    size = len(mm)
+    while pos + 16 <= size:
+        ts_sec, ts_frac, caplen, origlen = record_hdr.unpack_from(mm, pos)
+        pos += 16
+        if pos + caplen > size:
+            break
+        yield pos, caplen, origlen, (ts_sec * ticks + ts_frac) / ticks, linktype
+        pos += caplen
+
+
+def pcapng_records(mm):
+    endian = '<'
+    interfaces = []
+
+    pos = 0
+    size = len(mm)
+    while pos + 12 <= size:
+        # The section header defines the byte order of all the blocks that follow it.
+        if mm[pos:pos + 4] == PCAPNG_SHB:
+            endian = '<' if mm[pos + 8:pos + 12] == PCAPNG_BOM_LE else '>'
+            interfaces = []
+
+        block_type, block_len = struct.unpack_from(endian + 'II', mm, pos)
+        if block_len < 12 or pos + block_len > size:
+            break
+
+        if block_type == PCAPNG_IDB:
+            linktype, _, snaplen = struct.unpack_from(endian + 'HHI', mm, pos + 8)
+            ticks, offset = pcapng_idb_options(mm, endian, pos + 16, pos + block_len - 4)
+            interfaces.append((linktype, snaplen, ticks, offset))
+        elif block_type == PCAPNG_EPB or block_type == PCAPNG_PB:
+            if block_type == PCAPNG_EPB:
+                iface, ts_high, ts_low, caplen, origlen = \
+                    struct.unpack_from(endian + 'IIIII', mm, pos + 8)
+            else:
+                iface, _, ts_high, ts_low, caplen, origlen = \
+                    struct.unpack_from(endian + 'HHIIII', mm, pos + 8)
+            linktype, _, ticks, offset = interfaces[iface]
+            caplen = min(caplen, block_len - 32)
+            yield (pos + 28, caplen, origlen,
+                   ((ts_high << 32 | ts_low) + offset * ticks) / ticks, linktype)
+        elif block_type == PCAPNG_SPB:
+            # Simple packet blocks carry no timestamp.
+            origlen = struct.unpack_from(endian + 'I', mm, pos + 8)[0]
+            linktype, snaplen, _, _ = interfaces[0]
+            caplen = min(origlen, block_len - 16)
+            if snaplen:
+                caplen = min(caplen, snaplen)
+            yield pos + 12, caplen, origlen, 0.0, linktype
+
+        pos += block_len
+
+
+def pcapng_idb_options(mm, endian, pos, end):
+    ticks = 10**6
+    offset = 0
+    while pos + 4 <= end:
+        code, length = struct.unpack_from(endian + 'HH', mm, pos)
+        if code == 0:
+            break
+        if code == PCAPNG_OPT_TSRESOL and length >= 1:
+            resol = mm[pos + 4]
+            ticks = 2 ** (resol & 0x7F) if resol & 0x80 else 10 ** resol
+        elif code == PCAPNG_OPT_TSOFFSET and length >= 8:
+            offset = struct.unpack_from(endian + 'q', mm, pos + 4)[0]
+        pos += 4 + ((length + 3) & ~3)
+    return ticks, offset
+
+
+# Gathers a big-endian unsigned integer of nbytes at each position (0 where mask is False).
+def gather_uint(buf, pos, nbytes, mask):
+    pos = np.where(mask, pos, 0)
+    value = np.zeros(len(pos), dtype=np.uint64)
+    for i in range(nbytes):
+        value = (value << np.uint64(8)) | buf[pos + i]
+    return np.where(mask, value, np.uint64(0))
+
+
+def decode(buf, offsets, caplens, origlens, timestamps, linktypes):
+    off = np.array(offsets, dtype=np.int64)
+    end = off + np.array(caplens, dtype=np.int64)
+    linktype = np.array(linktypes, dtype=np.int64)
+    n = len(off)
+
+    cols = {col: np.zeros(n, dtype=DTYPES[col]) for col in COLUMNS}
+    cols['ts'] = np.array(timestamps, dtype=np.float64)
+    cols['frame_len'] = np.array(origlens, dtype=np.uint32)
+
+    # L2: Ethernet (with up to two VLAN tags), Linux cooked capture or raw IP.
+    eth = (linktype == LINKTYPE_ETHERNET) & (off + 14 <= end)
+    cols['eth_dst'] = gather_uint(buf, off, 6, eth)
+    cols['eth_src'] = gather_uint(buf, off + 6, 6, eth)
+    ethertype = gather_uint(buf, off + 12, 2, eth).astype(np.int64)
+    l3 = np.where(eth, off + 14, off)
+    for _ in range(2):
+        vlan = eth & np.isin(ethertype, ETHERTYPE_VLAN) & (l3 + 4 <= end)
+        ethertype = np.where(vlan, gather_uint(buf, l3 + 2, 2, vlan).astype(np.int64), ethertype)
+        l3 = np.where(vlan, l3 + 4, l3)
+
+    sll = (linktype == LINKTYPE_LINUX_SLL) & (off + 16 <= end)
+    ethertype = np.where(sll, gather_uint(buf, off + 14, 2, sll).astype(np.int64), ethertype)
+    l3 = np.where(sll, off + 16, l3)
+
+    raw = (linktype == LINKTYPE_RAW) | (linktype == LINKTYPE_IPV4)
+    ethertype = np.where(raw, ETHERTYPE_IPV4, ethertype)
+
+    # L3: IPv4 only (ip.* fields are empty in tshark for anything else).
+    ip = (ethertype == ETHERTYPE_IPV4) & (l3 + 20 <= end)
+    ver_ihl = gather_uint(buf, l3, 1, ip).astype(np.int64)
+    ihl = (ver_ihl & 0xF) * 4
+    ip &= ((ver_ihl >> 4) == 4) & (ihl >= 20)
+
+    cols['ip_len'] = gather_uint(buf, l3 + 2, 2, ip).astype(np.uint16)
+    cols['ip_proto'] = gather_uint(buf, l3 + 9, 1, ip).astype(np.uint8)
+    cols['ip_src'] = gather_uint(buf, l3 + 12, 4, ip).astype(np.uint32)
+    cols['ip_dst'] = gather_uint(buf, l3 + 16, 4, ip).astype(np.uint32)
+
+    # L4: ports. As with tshark's default IP reassembly, fragments carry no transport fields.
+    frag = gather_uint(buf, l3 + 6, 2, ip).astype(np.int64)
+    l4 = l3 + ihl
+    l4_ok = ip & ((frag & 0x3FFF) == 0) & (l4 + 4 <= end)
+    for proto, prefix in ((6, 'tcp'), (17, 'udp')):
+        mask = l4_ok & (cols['ip_proto'] == proto)
+        cols[prefix + '_srcport'] = gather_uint(buf, l4, 2, mask).astype(np.uint16)
+        cols[prefix + '_dstport'] = gather_uint(buf, l4 + 2, 2, mask).astype(np.uint16)
+
+    return cols
+
+
+def mac_to_str(value):
+    return ':'.join(f'{b:02x}' for b in int(value).to_bytes(6, 'big'))
+
+
+def ip_to_str(value):
+    return socket.inet_ntoa(struct.pack('!I', int(value)))
+
+
+# Builds a dataframe with the same column layout as the csv previously generated with tshark.
+def read_pcap_df(path):
+    cols = PcapReader(path).read()
+
+    # Numeric fields are float64, as pandas reads the (partly empty) tshark columns.
+    df = pd.DataFrame({field: cols[col].astype(np.float64)
+                       for field, col in zip(TSHARK_FIELDS, COLUMNS)})
+    for field, col, to_str in (('eth.src', 'eth_src', mac_to_str),
+                               ('eth.dst', 'eth_dst', mac_to_str),
+                               ('ip.src', 'ip_src', ip_to_str),
+                               ('ip.dst', 'ip_dst', ip_to_str)):
+        df[field] = [to_str(v) for v in cols[col].tolist()]
+
+    return df
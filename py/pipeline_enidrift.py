@@ -1,14 +1,31 @@
+import copy
 import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from fc_enidrift import FCENIDrift
+from flow_hash import HASH_BITS
+from registers import decay_to_pos
+from flow_table import FlowTable
+from instrument import Instrument
 from plugins.ENIDrift.ENIDrift_main import ENIDrift_train
 
 LAMBDAS = 4
 
+
+# Sub-classifier generation, run by the background update worker.
+def update_run(enidrift, labels):
+    enidrift.update(labels)
+    return enidrift
+
+
 class PipelineENIDrift:
     def __init__(
             self, trace, labels, sampling, attack, hypr, delta, incr,
-            release_speed, save_stats_global):
+            release_speed, save_stats_global, fc_batch_size=0, hash_bits=HASH_BITS,
+            hash_telemetry=False, flow_table_capacity=0, flow_table_idle_timeout=0,
+            window_predict=False, update_max_stale=0, instrument=False):
 
         self.attack = attack
         self.sampling_rate = sampling
@@ -17,6 +34,7 @@ class PipelineENIDrift:
         self.incr = incr
         self.release_speed = release_speed
         self.save_stats_global = save_stats_global
+        self.fc_batch_size = fc_batch_size
 
         self.stats_global = []
         self.prediction = []
@@ -26,22 +44,51 @@ class PipelineENIDrift:
         self.pkt_cnt_global = 0
         self.train_skip = False
 
+        # FC results computed in batches (fc_batch_size > 0), not yet processed.
+        self.fc_buffer = deque()
+
+        # Packets of the current release_speed window not yet predicted (window_predict):
+        # (cur_stats, input_stats, pkt_cnt_global).
+        self.window_predict = window_predict
+        self.window = []
+
+        # Background sub-classifier generation (update_max_stale > 0): the update runs in a
+        # worker thread on a copy of the ensemble, while the current one keeps predicting (at
+        # most update_max_stale packets). The input vectors predicted meanwhile are replayed
+        # on the updated ensemble before switching to it.
+        self.update_max_stale = update_max_stale
+        self.update_executor = ThreadPoolExecutor(max_workers=1) if update_max_stale else None
+        self.update_future = None
+        self.update_replay = []
+
+        # Detections, counted by metrics() up to prediction[metrics_scanned].
+        self.detections = 0
+        self.metrics_scanned = 0
+        self.metrics_lock = threading.Lock()
+
         # Read the csv containing the ground truth labels.
         # self.trace_labels = pd.read_csv(labels, header=None)
         self.trace_labels_global = np.genfromtxt(labels, dtype='i4')
         self.trace_labels = []
 
-        self.stats_mac_ip_src = {}
-        self.stats_ip_src = {}
-        self.stats_ip = {}
-        self.stats_five_t = {}
+        # Per-flow stats, bounded by flow_table_capacity flows / flow_table_idle_timeout seconds.
+        self.stats_mac_ip_src = FlowTable(3 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
+        self.stats_ip_src = FlowTable(3 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
+        self.stats_ip = FlowTable(7 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
+        self.stats_five_t = FlowTable(7 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
 
         # Initialize ENIDrift.
         self.enidrift = ENIDrift_train(
             hypr=self.hypr, delta=self.delta, incremental=self.incr)
 
+        # Per-stage latency instrumentation (switchable at runtime), shared with the FC.
+        self.instrument = Instrument(instrument)
+
         # Initialize feature extraction/computation.
-        self.fc = FCENIDrift(trace, sampling)
+        self.fc = FCENIDrift(trace, sampling, hash_bits=hash_bits, hash_telemetry=hash_telemetry,
+                             instrument=self.instrument)
+
+        self.decay_to_pos = decay_to_pos(self.fc.hash_slots)
 
         self.trace_size = self.fc.trace_size()
 
@@ -49,16 +96,24 @@ class PipelineENIDrift:
         trace_labels_cur = []
         cur_pkt = 0
 
+        instrument = self.instrument
+        t_pkt = 0
+
         # Process the trace, packet by packet.
         while True:
             cur_stats = 0
+            t_pkt = instrument.lap('packet', t_pkt)
 
             if self.pkt_cnt_global % 1000 == 0:
                 print(f'Processed pkts: {self.pkt_cnt_global}')
 
             self.pkt_cnt_global += 1
-            self.fc.feature_extract()
-            cur_stats = self.fc.process()
+            if self.fc_batch_size:
+                cur_stats, cur_key = self.fc_next()
+            else:
+                self.fc.feature_extract()
+                cur_stats = self.fc.process()
+                cur_key = self.fc.cur_key
 
             # If any statistics were obtained, send them to the ML pipeline.
             # Proceed according to the sampling rate.
@@ -77,74 +132,138 @@ class PipelineENIDrift:
                     self.stats_global.append(cur_stats)
 
                 # Update the stored global stats with the latest packet stats.
-                input_stats = self.update_stats(cur_stats)
+                t = instrument.start()
+                input_stats = self.update_stats(
+                    cur_stats, cur_key, float(self.fc.trace['ts'][self.pkt_cnt_global - 1]))
+                t = instrument.lap('update_stats', t)
 
                 # ENIDrift's ensemble detection.
-                prediction = self.enidrift.predict(input_stats.reshape(1, -1))
+                # window_predict: the ensemble only changes on update(), so the packets of a
+                # window are predicted as one matrix right before it.
+                if self.window_predict:
+                    self.window.append((cur_stats, input_stats, self.pkt_cnt_global))
+                else:
+                    self.update_poll(len(self.update_replay) >= self.update_max_stale)
+                    prediction = self.enidrift.predict(input_stats.reshape(1, -1))
+                    if self.update_future is not None:
+                        self.update_replay.append(input_stats)
+                t = instrument.lap('enidrift_predict', t)
 
                 # ENIDrift's sub-classifier generation.
                 if cur_pkt % self.release_speed == 0:
+                    self.update_poll(True)
+                    self.window_flush()
                     print(f'pkt_cnt_global: {self.pkt_cnt_global}')
                     print(f'cur_pkt: {cur_pkt}')
                     print(f'release_speed: {self.release_speed}')
-                    self.enidrift.update(np.array(trace_labels_cur))
+                    if self.update_max_stale:
+                        self.update_start(np.array(trace_labels_cur))
+                    else:
+                        self.enidrift.update(np.array(trace_labels_cur))
                     trace_labels_cur = []
+                    instrument.lap('enidrift_update', t)
 
-                self.prediction.append(prediction[0])
-                self.trace_labels.append(self.trace_labels_global[self.pkt_cnt_global-1])
-
-                try:
-                    self.peregrine_eval.append([
-                        cur_stats[0], cur_stats[1], cur_stats[2], cur_stats[3], cur_stats[4],
-                        cur_stats[5], prediction[0], prediction[1], prediction[2],
-                        self.trace_labels_global[self.pkt_cnt_global - 1]])
-                except IndexError:
-                    print(self.trace_labels.shape[0])
-                    print(self.pkt_cnt_global)
-                    print(self.pkt_cnt_global - 1)
+                if not self.window_predict:
+                    self.process_prediction(cur_stats, prediction, self.pkt_cnt_global)
             else:
                 print('TIMEOUT.')
                 break
 
-        return [self.prediction, self.stats_global, self.peregrine_eval]
-
-    def update_stats(self, cur_stats):
-
-        decay_to_pos = {
-            0: 0, 1: 0, 2: 1, 3: 2, 4: 3,
-            8192: 1, 16384: 2, 24576: 3}
-        cur_decay_pos = decay_to_pos[cur_stats[6]]
+        # Predict the packets of the last (incomplete) window.
+        self.update_poll(True)
+        self.window_flush()
+        if self.update_executor is not None:
+            self.update_executor.shutdown()
 
-        hdr_mac_ip_src = cur_stats[0] + cur_stats[1]
-        hdr_ip_src = cur_stats[1]
-        hdr_ip = cur_stats[1] + cur_stats[2]
-        hdr_five_t = cur_stats[1] + cur_stats[2] + cur_stats[3] + cur_stats[4] + cur_stats[5]
-
-        if hdr_mac_ip_src not in self.stats_mac_ip_src:
-            self.stats_mac_ip_src[hdr_mac_ip_src] = np.zeros(3 * LAMBDAS)
-        self.stats_mac_ip_src[hdr_mac_ip_src][(3*cur_decay_pos):(3*cur_decay_pos+3)] = \
-            cur_stats[7:10]
-
-        if hdr_ip_src not in self.stats_ip_src:
-            self.stats_ip_src[hdr_ip_src] = np.zeros(3 * LAMBDAS)
-        self.stats_ip_src[hdr_ip_src][(3*cur_decay_pos):(3*cur_decay_pos+3)] = \
-            cur_stats[10:13]
-
-        if hdr_ip not in self.stats_ip:
-            self.stats_ip[hdr_ip] = np.zeros(7 * LAMBDAS)
-        self.stats_ip[hdr_ip][(7*cur_decay_pos):(7*cur_decay_pos+7)] = \
-            cur_stats[13:20]
+        return [self.prediction, self.stats_global, self.peregrine_eval]
 
-        if hdr_five_t not in self.stats_five_t:
-            self.stats_five_t[hdr_five_t] = np.zeros(7 * LAMBDAS)
-        self.stats_five_t[hdr_five_t][(7*cur_decay_pos):(7*cur_decay_pos+7)] = \
-            cur_stats[20:]
+    def process_prediction(self, cur_stats, prediction, pkt_cnt_global):
+        self.prediction.append(prediction[0])
+        self.trace_labels.append(self.trace_labels_global[pkt_cnt_global-1])
+
+        try:
+            self.peregrine_eval.append([
+                cur_stats[0], cur_stats[1], cur_stats[2], cur_stats[3], cur_stats[4],
+                cur_stats[5], prediction[0], prediction[1], prediction[2],
+                self.trace_labels_global[pkt_cnt_global - 1]])
+        except IndexError:
+            print(self.trace_labels.shape[0])
+            print(pkt_cnt_global)
+            print(pkt_cnt_global - 1)
+
+    def metrics(self):
+        # Snapshot of the pipeline state, taken by the metrics thread (Metrics).
+        with self.metrics_lock:
+            prediction = self.prediction[self.metrics_scanned:]
+            self.detections += sum(1 for value in prediction if value == 1)
+            self.metrics_scanned += len(prediction)
+        return {
+            'packets_total': {'execution': self.pkt_cnt_global},
+            'flow_table_flows': {key: len(getattr(self, f'stats_{key}'))
+                                 for key in ['mac_ip_src', 'ip_src', 'ip', 'five_t']},
+            'detections_total': self.detections,
+            'queue_depth': {'fc': len(self.fc_buffer), 'window': len(self.window),
+                            'update_replay': len(self.update_replay)}}
+
+    def update_start(self, labels):
+        # Updates a copy of the ensemble in the background.
+        enidrift = copy.deepcopy(self.enidrift)
+        self.update_future = self.update_executor.submit(update_run, enidrift, labels)
+
+    def update_poll(self, wait):
+        # Switches to the updated ensemble once ready (wait: blocks until it is).
+        if self.update_future is None or not (wait or self.update_future.done()):
+            return
+        enidrift = self.update_future.result()
+        for input_stats in self.update_replay:
+            enidrift.predict(input_stats.reshape(1, -1))
+        self.enidrift = enidrift
+        self.update_future = None
+        self.update_replay = []
+
+    def window_flush(self):
+        # Predicts the window packets as one matrix (one prediction value per row for each
+        # field), then processes the predictions in packet order.
+        if not self.window:
+            return
+        predictions = self.enidrift.predict(np.array([entry[1] for entry in self.window]))
+        for (cur_stats, _, pkt_cnt_global), prediction in zip(self.window, zip(*predictions)):
+            self.process_prediction(cur_stats, prediction, pkt_cnt_global)
+        self.window = []
+
+    def fc_next(self):
+        # Stats and flow keys of the next packet, computed fc_batch_size packets at a time.
+        if not self.fc_buffer:
+            t = self.instrument.start()
+            headers, stats, keys = self.fc.process_batch(self.fc_batch_size)
+            self.instrument.lap('fc_batch', t)
+            self.fc_buffer.extend(zip(headers, stats.tolist(), keys))
+        if not self.fc_buffer:
+            return 0, None
+        headers, stats, key = self.fc_buffer.popleft()
+        return [headers, stats], key
+
+    def update_stats(self, cur_stats, cur_key, ts):
+
+        cur_decay_pos = self.decay_to_pos[cur_stats[6]]
+
+        # Packed integer flow keys (flow_keys()).
+        hdr_mac_ip_src, hdr_ip_src, hdr_ip, hdr_five_t = cur_key
+
+        stats_mac_ip_src = self.stats_mac_ip_src.lookup(hdr_mac_ip_src, ts)
+        stats_mac_ip_src[(3*cur_decay_pos):(3*cur_decay_pos+3)] = cur_stats[7:10]
+
+        stats_ip_src = self.stats_ip_src.lookup(hdr_ip_src, ts)
+        stats_ip_src[(3*cur_decay_pos):(3*cur_decay_pos+3)] = cur_stats[10:13]
+
+        stats_ip = self.stats_ip.lookup(hdr_ip, ts)
+        stats_ip[(7*cur_decay_pos):(7*cur_decay_pos+7)] = cur_stats[13:20]
+
+        stats_five_t = self.stats_five_t.lookup(hdr_five_t, ts)
+        stats_five_t[(7*cur_decay_pos):(7*cur_decay_pos+7)] = cur_stats[20:]
 
         input_stats = np.concatenate((
-            self.stats_mac_ip_src[hdr_mac_ip_src],
-            self.stats_ip_src[hdr_ip_src],
-            self.stats_ip[hdr_ip],
-            self.stats_five_t[hdr_five_t]))
+            stats_mac_ip_src, stats_ip_src, stats_ip, stats_five_t))
 
         # Convert any existing NaNs to 0.
         input_stats[np.isnan(input_stats)] = 0
@@ -1,14 +1,26 @@
 import os
 import time
+import threading
 import pickle
 import itertools
+from collections import deque
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from fc_kitnet import FCKitNET
+from flow_hash import HASH_BITS
+from registers import decay_to_pos
+from flow_table import FlowTable
+from stats_buffer import StatsBuffer
+from kitnet_exec import KitNETExec, model_frozen
+from inference_cache import InferenceCache
+from instrument import Instrument
+from kitnet_train import KitNETTrain, KitNETTrainBatch, ad_training
 from plugins.KitNET.KitNET import KitNET
 
 LAMBDAS = 4
+# KitNET input vector: mac_ip_src, ip_src (3 stats), ip, five_t (7 stats), per decay value.
+INPUT_SIZE = 20 * LAMBDAS
 LEARNING_RATE = 0.1
 HIDDEN_RATIO = 0.75
 
@@ -17,11 +29,10 @@ class PipelineKitNET:
     def __init__(
             self, trace, labels, sampling, fc_sampling, exec_sampl_offset, fm_grace, ad_grace,
             max_ae, fm_model, el_layer, ol_layer, train_stats, attack, train_exact_ratio,
-            save_stats_global, time_start):
-
-        self.decay_to_pos = {
-            0: 0, 1: 0, 2: 1, 3: 2, 4: 3,
-            8192: 1, 16384: 2, 24576: 3}
+            save_stats_global, time_start, fc_batch_size=0, hash_bits=HASH_BITS,
+            hash_telemetry=False, flow_table_capacity=0, flow_table_idle_timeout=0,
+            exec_batch_size=0, train_workers=0, train_chunk_rows=50000, train_batch_size=0,
+            inference_cache_size=0, instrument=False):
 
         self.fm_grace = fm_grace
         self.ad_grace = ad_grace
@@ -32,6 +43,7 @@ class PipelineKitNET:
         self.exec_sampl_offset = exec_sampl_offset
         self.train_exact_ratio = train_exact_ratio
         self.save_stats_global = save_stats_global
+        self.fc_batch_size = fc_batch_size
         self.attack_init_ts = 0
         self.attack_pkt_num_cntr = 0
         self.attack_pkt_num_cntr_dp = 0
@@ -47,8 +59,34 @@ class PipelineKitNET:
         self.pkt_cnt_global = 0
         self.train_skip = False
 
-        self.df_train_stats_list = []
-        self.df_exec_stats_list = []
+        # Input vectors of the training/execution phases (preallocated chunks of rows).
+        self.df_train_stats_list = StatsBuffer(INPUT_SIZE)
+        self.df_exec_stats_list = StatsBuffer(INPUT_SIZE)
+
+        # FC results computed in batches (fc_batch_size > 0), not yet processed.
+        self.fc_buffer = deque()
+
+        # Execution phase vectors not yet scored (exec_batch_size > 0):
+        # (input_stats, cur_stats, label index, attack_pkt_num_cntr_dp).
+        self.exec_batch_size = exec_batch_size
+        self.exec_buffer = []
+
+        # Memoized rmse of the execution phase vectors (frozen model), inference_cache_size > 0.
+        self.inference_cache = InferenceCache(inference_cache_size) if inference_cache_size \
+            else None
+
+        # AD grace period vectors not yet trained on (train_workers/train_batch_size > 0), same
+        # tuples. They are trained on train_chunk_rows vectors at a time: ensemble layer trained
+        # by a process pool, or mini-batch SGD with batches of train_batch_size vectors.
+        self.train_workers = train_workers
+        self.train_batch_size = train_batch_size
+        self.train_chunk_rows = train_chunk_rows
+        self.train_buffer = []
+
+        # Execution phase detections, counted by metrics() up to rmse_list[metrics_scanned].
+        self.detections = 0
+        self.metrics_scanned = 0
+        self.metrics_lock = threading.Lock()
 
         # Read the csv containing the ground truth labels.
         self.trace_labels = pd.read_csv(labels, header=None)
@@ -60,26 +98,44 @@ class PipelineKitNET:
             self.train_skip = True
 
         # If train_skip is true, import the previously generated models.
+        # Per-flow stats, bounded by flow_table_capacity flows / flow_table_idle_timeout seconds.
+        self.stats_mac_ip_src = FlowTable(3 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
+        self.stats_ip_src = FlowTable(3 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
+        self.stats_ip = FlowTable(7 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
+        self.stats_five_t = FlowTable(7 * LAMBDAS, flow_table_capacity, flow_table_idle_timeout)
         if self.train_skip:
             with open(train_stats, 'rb') as f_stats:
                 stats = pickle.load(f_stats)
-                self.stats_mac_ip_src = stats[0]
-                self.stats_ip_src = stats[1]
-                self.stats_ip = stats[2]
-                self.stats_five_t = stats[3]
-        else:
-            self.stats_mac_ip_src = {}
-            self.stats_ip_src = {}
-            self.stats_ip = {}
-            self.stats_five_t = {}
+                # Train stats saved before the integer flow keys (flow_keys()) are keyed by
+                # concatenated header strings, which match no flow.
+                if any(isinstance(next(iter(table), None), str) for table in stats):
+                    raise ValueError(
+                        f'{train_stats}: train stats keyed by header strings (saved by a '
+                        f'previous version), retrain the model to save them again')
+                self.stats_mac_ip_src.update(stats[0])
+                self.stats_ip_src.update(stats[1])
+                self.stats_ip.update(stats[2])
+                self.stats_five_t.update(stats[3])
 
         # Initialize KitNET.
         self.kitnet = KitNET(
-            80, max_ae, fm_grace, ad_grace, LEARNING_RATE, HIDDEN_RATIO, fm_model, el_layer,
-            ol_layer, attack, train_exact_ratio)
+            INPUT_SIZE, max_ae, fm_grace, ad_grace, LEARNING_RATE, HIDDEN_RATIO, fm_model,
+            el_layer, ol_layer, attack, train_exact_ratio)
+        self.kitnet_exec = KitNETExec(self.kitnet)
+        if train_batch_size:
+            self.kitnet_train = KitNETTrainBatch(self.kitnet, train_batch_size)
+        else:
+            self.kitnet_train = KitNETTrain(self.kitnet, train_workers, train_chunk_rows)
+
+        # Per-stage latency instrumentation (switchable at runtime), shared with the FC.
+        self.instrument = Instrument(instrument)
 
         # Initialize feature extraction/computation.
-        self.fc = FCKitNET(trace, sampling, fm_grace+ad_grace, exec_sampl_offset, self.train_skip)
+        self.fc = FCKitNET(trace, sampling, fm_grace+ad_grace, exec_sampl_offset, self.train_skip,
+                           hash_bits=hash_bits, hash_telemetry=hash_telemetry,
+                           instrument=self.instrument)
+
+        self.decay_to_pos = decay_to_pos(self.fc.hash_slots)
 
         self.trace_size = self.fc.trace_size()
         self.trace_initial_ts = self.fc.trace_initial_ts()
@@ -95,22 +151,26 @@ class PipelineKitNET:
         time_old = 0
         time_new = 0
 
+        instrument = self.instrument
+        t_pkt = 0
+
         # Process the trace, packet by packet.
         while True:
             cur_stats = 0
+            t_pkt = instrument.lap('packet', t_pkt)
 
             if not self.train_skip:
-                if len(self.rmse_list) % 1000 == 0 and \
-                        len(self.rmse_list) < self.fm_grace + self.ad_grace:
+                if self.train_cnt() % 1000 == 0 and \
+                        self.train_cnt() < self.fm_grace + self.ad_grace:
                     time_new = time.time()
-                    print(f'Processed pkts: {len(self.rmse_list)}. '
+                    print(f'Processed pkts: {self.train_cnt()}. '
                           f'Elapsed time: {time_new - time_old} '
                           f'({int(1000/(time_new - time_old))} pps)')
                     time_old = time_new
                     if self.save_stats_global:
                         self.update_stats_global()
                 elif self.pkt_cnt_global % 1000 == 0 and \
-                        len(self.rmse_list) >= self.fm_grace + self.ad_grace:
+                        self.train_cnt() >= self.fm_grace + self.ad_grace:
                     time_new = time.time()
                     print(f'Processed pkts: {self.fm_grace + self.ad_grace + self.pkt_cnt_global}. '
                           f'Elapsed time: {time_new - time_old} '
@@ -131,13 +191,18 @@ class PipelineKitNET:
                         self.update_stats_global()
 
             # Training phase.
-            if len(self.rmse_list) < (self.train_exact_ratio * (self.fm_grace + self.ad_grace)) \
+            if self.train_cnt() < (self.train_exact_ratio * (self.fm_grace + self.ad_grace)) \
                     and not self.train_skip:
                 self.fc.feature_extract()
                 cur_stats = self.fc.process_exact('training')
-            elif len(self.rmse_list) < self.fm_grace + self.ad_grace and not self.train_skip:
-                self.fc.feature_extract()
-                cur_stats = self.fc.process('training')
+                cur_key = self.fc.cur_key
+            elif self.train_cnt() < self.fm_grace + self.ad_grace and not self.train_skip:
+                if self.fc_batch_size:
+                    cur_stats, cur_key = self.fc_next_training()
+                else:
+                    self.fc.feature_extract()
+                    cur_stats = self.fc.process('training')
+                    cur_key = self.fc.cur_key
 
             # Execution phase.
             else:
@@ -151,6 +216,7 @@ class PipelineKitNET:
                 if self.fc_sampling and self.pkt_cnt_global % self.sampling_rate != 0:
                     continue
                 cur_stats = self.fc.process('execution')
+                cur_key = self.fc.cur_key
 
             # If any statistics were obtained, send them to the ML pipeline.
             # Execution phase: only proceed according to the sampling rate.
@@ -165,51 +231,45 @@ class PipelineKitNET:
                 cur_stats = list(itertools.chain(*cur_stats))
 
                 # Update the stored global stats with the latest packet stats.
-                input_stats = self.update_stats(cur_stats)
+                t = instrument.start()
+                input_stats = self.update_stats(cur_stats, cur_key)
+                t = instrument.lap('update_stats', t)
 
                 if self.save_stats_global:
                     self.stats_global.append(input_stats)
 
                 # Call function with the content of kitsune's main (before the eval/csv part).
-                rmse = self.kitnet.process(input_stats)
-
-                self.rmse_list.append(rmse)
-
-                if self.attack_init_ts == 0 and int(self.trace_labels.iat[
-                        self.fm_grace + self.ad_grace + offset + self.pkt_cnt_global - 1, 0]) == 1:
-                    self.attack_init_ts = cur_stats[0]
-                    self.attack_pkt_num_cntr += 1
-
-                if int(rmse) == 1 and self.attack_pkt_num_cntr != -1 and int(self.trace_labels.iat[
-                        self.fm_grace + self.ad_grace + offset + self.pkt_cnt_global - 1, 0]) == 1:
-                    self.det_init_time = cur_stats[0] - self.attack_init_ts
-                    self.det_init_pkt_num = self.attack_pkt_num_cntr
-                    self.det_init_pkt_num_dp = self.attack_pkt_num_cntr_dp
-                    self.attack_pkt_num_cntr = -1
-                    self.attack_pkt_num_cntr_dp = -1
-
-                if self.attack_pkt_num_cntr != -1 and int(self.trace_labels.iat[
-                        self.fm_grace + self.ad_grace + offset + self.pkt_cnt_global - 1, 0]) == 1:
-                    self.attack_pkt_num_cntr += 1
-
-                try:
-                    # 1-5: pkt headers
-                    # time_pkt_ml: processing time (ML classifier only)
-                    self.peregrine_eval.append([
-                        cur_stats[1], cur_stats[2], cur_stats[3], cur_stats[4], cur_stats[5],
-                        cur_stats[6], rmse, self.trace_labels.iat[
-                            self.fm_grace + self.ad_grace + offset + self.pkt_cnt_global - 1, 0]])
-                except IndexError:
-                    print(self.trace_labels.shape[0])
-                    print(self.pkt_cnt_global)
-                    print(self.fm_grace + self.ad_grace + offset + self.pkt_cnt_global - 1)
+                # Execution phase: the vectors are scored exec_batch_size at a time.
+                # AD grace period: the vectors are trained on in chunks (train_workers,
+                # train_batch_size).
+                training = not self.train_skip and \
+                    self.train_cnt() < self.fm_grace + self.ad_grace
+                label_index = self.fm_grace + self.ad_grace + offset + self.pkt_cnt_global - 1
+                if self.exec_batch_size and not training:
+                    self.exec_buffer.append(
+                        (input_stats, cur_stats, label_index, self.attack_pkt_num_cntr_dp))
+                    if len(self.exec_buffer) >= self.exec_batch_size:
+                        self.exec_flush()
+                elif (self.train_workers or self.train_batch_size) and training and \
+                        ad_training(self.kitnet):
+                    self.train_buffer.append(
+                        (input_stats, cur_stats, label_index, self.attack_pkt_num_cntr_dp))
+                    if len(self.train_buffer) >= self.train_chunk_rows or \
+                            self.train_cnt() == self.fm_grace + self.ad_grace:
+                        self.train_flush()
+                else:
+                    rmse = self.kitnet_process(input_stats)
+                    self.process_rmse(cur_stats, rmse, label_index, self.attack_pkt_num_cntr_dp)
+                instrument.lap('kitnet', t)
 
                 # At the end of the training phase, store the highest rmse value as the threshold.
                 # Also, save the stored stat values.
-                if not self.train_skip and len(self.rmse_list) == self.fm_grace + self.ad_grace:
+                if training and len(self.rmse_list) == self.fm_grace + self.ad_grace:
                     offset = self.exec_sampl_offset
                     self.threshold = max(self.rmse_list, key=float)
                     self.save_train_stats()
+                    if self.fc.telemetry is not None:
+                        print(self.fc.telemetry.summary())
                     print('Starting execution phase...')
                 # if len(self.rmse_list) == self.fm_grace + self.ad_grace:
                     # self.reset_stats()
@@ -221,55 +281,155 @@ class PipelineKitNET:
                 print('TIMEOUT.')
                 break
 
-    def update_stats(self, cur_stats):
+        # Train on/score the remaining vectors.
+        self.train_flush()
+        self.exec_flush()
+        self.kitnet_train.close()
+
+    def process_rmse(self, cur_stats, rmse, label_index, attack_pkt_num_cntr_dp):
+        # Stores the rmse of a packet and updates the detection counters.
+        # attack_pkt_num_cntr_dp: value of the counter when the packet was processed by the FC.
+        self.rmse_list.append(rmse)
+
+        if self.attack_init_ts == 0 and int(self.trace_labels.iat[label_index, 0]) == 1:
+            self.attack_init_ts = cur_stats[0]
+            self.attack_pkt_num_cntr += 1
+
+        if int(rmse) == 1 and self.attack_pkt_num_cntr != -1 and \
+                int(self.trace_labels.iat[label_index, 0]) == 1:
+            self.det_init_time = cur_stats[0] - self.attack_init_ts
+            self.det_init_pkt_num = self.attack_pkt_num_cntr
+            self.det_init_pkt_num_dp = attack_pkt_num_cntr_dp
+            self.attack_pkt_num_cntr = -1
+            self.attack_pkt_num_cntr_dp = -1
+
+        if self.attack_pkt_num_cntr != -1 and int(self.trace_labels.iat[label_index, 0]) == 1:
+            self.attack_pkt_num_cntr += 1
+
+        try:
+            # 1-5: pkt headers
+            # time_pkt_ml: processing time (ML classifier only)
+            self.peregrine_eval.append([
+                cur_stats[1], cur_stats[2], cur_stats[3], cur_stats[4], cur_stats[5],
+                cur_stats[6], rmse, self.trace_labels.iat[label_index, 0]])
+        except IndexError:
+            print(self.trace_labels.shape[0])
+            print(label_index)
+
+    def train_cnt(self):
+        # Training phase vectors, including the ones not yet trained on.
+        return len(self.rmse_list) + len(self.train_buffer)
+
+    def metrics(self):
+        # Snapshot of the pipeline state, taken by the metrics thread (Metrics).
+        train_total = self.fm_grace + self.ad_grace
+        train_cnt = 0 if self.train_skip else min(self.train_cnt(), train_total)
+        with self.metrics_lock:
+            if self.threshold:
+                start = max(self.metrics_scanned, 0 if self.train_skip else train_total)
+                rmse_list = self.rmse_list[start:]
+                self.detections += sum(1 for rmse in rmse_list if rmse >= self.threshold)
+                self.metrics_scanned = start + len(rmse_list)
+        return {
+            'packets_total': {'training': train_cnt, 'execution': self.pkt_cnt_global},
+            'training_progress': 1 if self.train_skip else train_cnt / train_total,
+            'flow_table_flows': {key: len(getattr(self, f'stats_{key}'))
+                                 for key in ['mac_ip_src', 'ip_src', 'ip', 'five_t']},
+            'detections_total': self.detections,
+            'queue_depth': {'fc': len(self.fc_buffer), 'execution': len(self.exec_buffer),
+                            'training': len(self.train_buffer)}}
+
+    def train_flush(self):
+        # Trains on the buffered AD grace period vectors, then processes the results in order.
+        if not self.train_buffer:
+            return
+        rmse_list = self.kitnet_train.train(np.array([entry[0] for entry in self.train_buffer]))
+        for (_, cur_stats, label_index, attack_pkt_num_cntr_dp), rmse in \
+                zip(self.train_buffer, rmse_list):
+            self.process_rmse(cur_stats, rmse, label_index, attack_pkt_num_cntr_dp)
+        self.train_buffer = []
+        if self.train_cnt() == self.fm_grace + self.ad_grace:
+            self.kitnet_train.close()
+
+    def kitnet_process(self, input_stats):
+        # KitNET.process(), memoized once the model is frozen (inference_cache_size > 0).
+        if self.inference_cache is None or not model_frozen(self.kitnet):
+            return self.kitnet.process(input_stats)
+        return self.inference_cache.lookup(input_stats, self.kitnet.process)
+
+    def exec_flush(self):
+        # Scores the buffered execution phase vectors as one matrix (once the model is frozen),
+        # then processes the results in packet order.
+        if not self.exec_buffer:
+            return
+        if model_frozen(self.kitnet):
+            x = np.array([entry[0] for entry in self.exec_buffer])
+            if self.inference_cache is None:
+                rmse_list = self.kitnet_exec.execute(x)
+            else:
+                rmse_list = self.inference_cache.lookup_batch(x, self.kitnet_exec.execute)
+        else:
+            rmse_list = [self.kitnet.process(entry[0]) for entry in self.exec_buffer]
+        for (_, cur_stats, label_index, attack_pkt_num_cntr_dp), rmse in \
+                zip(self.exec_buffer, rmse_list):
+            self.process_rmse(cur_stats, rmse, label_index, attack_pkt_num_cntr_dp)
+        self.exec_buffer = []
+
+    def fc_next_training(self):
+        # Training phase stats and flow keys, computed fc_batch_size packets at a time.
+        # A batch never goes past the training phase.
+        if not self.fc_buffer:
+            batch_size = min(self.fc_batch_size,
+                             self.fm_grace + self.ad_grace - self.train_cnt())
+            t = self.instrument.start()
+            headers, stats, keys = self.fc.process_batch('training', batch_size)
+            self.instrument.lap('fc_batch', t)
+            self.fc_buffer.extend(zip(headers, stats.tolist(), keys))
+        if not self.fc_buffer:
+            return 0, None
+        headers, stats, key = self.fc_buffer.popleft()
+        return [headers, stats], key
+
+    def update_stats(self, cur_stats, cur_key):
 
         cur_decay_pos = self.decay_to_pos[cur_stats[7]]
 
-        hdr_mac_ip_src = cur_stats[1] + cur_stats[2]
-        hdr_ip_src = cur_stats[2]
-        hdr_ip = cur_stats[2] + cur_stats[3]
-        hdr_five_t = cur_stats[2] + cur_stats[3] + cur_stats[4] + cur_stats[5] + cur_stats[6]
+        # Packed integer flow keys (flow_keys()).
+        hdr_mac_ip_src, hdr_ip_src, hdr_ip, hdr_five_t = cur_key
 
-        if hdr_mac_ip_src not in self.stats_mac_ip_src:
-            self.stats_mac_ip_src[hdr_mac_ip_src] = np.zeros(3 * LAMBDAS)
-        self.stats_mac_ip_src[hdr_mac_ip_src][(3*cur_decay_pos):(3*cur_decay_pos+3)] = \
-            cur_stats[8:11]
+        ts = cur_stats[0]
 
-        if hdr_ip_src not in self.stats_ip_src:
-            self.stats_ip_src[hdr_ip_src] = np.zeros(3 * LAMBDAS)
-        self.stats_ip_src[hdr_ip_src][(3*cur_decay_pos):(3*cur_decay_pos+3)] = \
-            cur_stats[11:14]
+        stats_mac_ip_src = self.stats_mac_ip_src.lookup(hdr_mac_ip_src, ts)
+        stats_mac_ip_src[(3*cur_decay_pos):(3*cur_decay_pos+3)] = cur_stats[8:11]
 
-        if hdr_ip not in self.stats_ip:
-            self.stats_ip[hdr_ip] = np.zeros(7 * LAMBDAS)
-        self.stats_ip[hdr_ip][(7*cur_decay_pos):(7*cur_decay_pos+7)] = \
-            cur_stats[14:21]
+        stats_ip_src = self.stats_ip_src.lookup(hdr_ip_src, ts)
+        stats_ip_src[(3*cur_decay_pos):(3*cur_decay_pos+3)] = cur_stats[11:14]
 
-        if hdr_five_t not in self.stats_five_t:
-            self.stats_five_t[hdr_five_t] = np.zeros(7 * LAMBDAS)
-        self.stats_five_t[hdr_five_t][(7*cur_decay_pos):(7*cur_decay_pos+7)] = \
-            cur_stats[21:]
+        stats_ip = self.stats_ip.lookup(hdr_ip, ts)
+        stats_ip[(7*cur_decay_pos):(7*cur_decay_pos+7)] = cur_stats[14:21]
 
-        input_stats = np.concatenate((
-            self.stats_mac_ip_src[hdr_mac_ip_src],
-            self.stats_ip_src[hdr_ip_src],
-            self.stats_ip[hdr_ip],
-            self.stats_five_t[hdr_five_t]))
-
-        # Convert any existing NaNs to 0.
-        input_stats[np.isnan(input_stats)] = 0
+        stats_five_t = self.stats_five_t.lookup(hdr_five_t, ts)
+        stats_five_t[(7*cur_decay_pos):(7*cur_decay_pos+7)] = cur_stats[21:]
 
+        # The input vector is written in place into the next row of the stored stats.
+        # (Any NaNs are converted to 0 once per chunk of rows.)
         if len(self.df_train_stats_list) < self.fm_grace + self.ad_grace:
-            self.df_train_stats_list.append(input_stats)
+            input_stats = self.df_train_stats_list.next_row()
         else:
-            self.df_exec_stats_list.append(input_stats)
+            input_stats = self.df_exec_stats_list.next_row()
+
+        input_stats[0:3*LAMBDAS] = stats_mac_ip_src
+        input_stats[3*LAMBDAS:6*LAMBDAS] = stats_ip_src
+        input_stats[6*LAMBDAS:13*LAMBDAS] = stats_ip
+        input_stats[13*LAMBDAS:20*LAMBDAS] = stats_five_t
 
         return input_stats
 
     def save_train_stats(self):
+        t = self.instrument.start()
         train_stats = [
-            self.stats_mac_ip_src, self.stats_ip_src,
-            self.stats_ip, self.stats_five_t]
+            self.stats_mac_ip_src.to_dict(), self.stats_ip_src.to_dict(),
+            self.stats_ip.to_dict(), self.stats_five_t.to_dict()]
 
         outdir = str(Path(__file__).parents[0]) + '/plugins/KitNET/models'
         if not os.path.exists(str(Path(__file__).parents[0]) + '/plugins/KitNET/models'):
@@ -280,12 +440,11 @@ class PipelineKitNET:
                   + '.txt', 'wb') as f_stats:
             pickle.dump(train_stats, f_stats)
 
-        for i in range(0, len(self.df_train_stats_list), 50000):
-            self.df_train_stats_list[i:i + 50000]
-            df_train_stats = pd.DataFrame(self.df_train_stats_list[i:i + 50000])
+        for i, chunk in enumerate(self.df_train_stats_list.chunks()):
+            df_train_stats = pd.DataFrame(chunk)
             df_train_stats.to_pickle(
                 f'{outdir}/{self.attack}-m-{self.m}-r-'
-                f'{self.train_exact_ratio}-train-full-{int(i/50000)}.pkl')
+                f'{self.train_exact_ratio}-train-full-{i}.pkl')
 
         outdir_params = f'{Path(__file__).parents[0]}/plugins/KitNET/models/spatial/{self.attack}'\
                         f'-m-{self.m}-r-{self.train_exact_ratio}/params'
@@ -332,21 +491,24 @@ class PipelineKitNET:
 
         pd.DataFrame([len(self.kitnet.v)]).T.to_csv(
             f'{outdir_maps}/N_LAYERS.csv', header=False, index=False)
+        self.instrument.lap('io', t)
 
     def save_exec_stats(self):
+        t = self.instrument.start()
         outdir = str(Path(__file__).parents[0]) + '/plugins/KitNET/models'
         if not os.path.exists(str(Path(__file__).parents[0]) + '/plugins/KitNET/models'):
             os.mkdir(outdir)
 
-        for i in range(0, len(self.df_exec_stats_list), 50000):
-            self.df_exec_stats_list[i:i + 50000]
-            df_exec_stats = pd.DataFrame(self.df_exec_stats_list[i:i + 50000])
+        for i, chunk in enumerate(self.df_exec_stats_list.chunks()):
+            df_exec_stats = pd.DataFrame(chunk)
             df_exec_stats.to_pickle(
                 f'{outdir}/{self.attack}-m-{self.m}-r-'
                 f'{self.train_exact_ratio}-o-{self.exec_sampl_offset}'
-                f'-exec-full-{int(i/50000)}.pkl')
+                f'-exec-full-{i}.pkl')
+        self.instrument.lap('io', t)
 
     def update_stats_global(self):
+        t = self.instrument.start()
         outdir = f'{Path(__file__).parents[0]}/eval/kitnet'
         if not os.path.exists(f'{Path(__file__).parents[0]}/eval/kitnet'):
             os.makedirs(outdir, exist_ok=True)
@@ -357,11 +519,12 @@ class PipelineKitNET:
         df_stats_global.to_csv(outpath_stats_global, mode='a', chunksize=10000, index=None,
                                header=False)
         self.stats_global = []
+        self.instrument.lap('io', t)
 
     def reset_stats(self):
         print('Reset stats')
 
-        self.stats_mac_ip_src = {}
-        self.stats_ip_src = {}
-        self.stats_ip = {}
-        self.stats_five_t = {}
+        self.stats_mac_ip_src.clear()
+        self.stats_ip_src.clear()
+        self.stats_ip.clear()
+        self.stats_five_t.clear()
@@ -1,12 +1,15 @@
 import itertools
 import numpy as np
 from fc_whisper import FCWhisper
+from flow_hash import HASH_BITS
+from instrument import Instrument
 from scapy.all import *
 from utils.peregrine_hdr import WhisperPeregrineHdr
 import time
 
 class PipelineWhisper:
-    def __init__(self, trace, labels, sampling, train_size, dst_mac):
+    def __init__(self, trace, labels, sampling, train_size, dst_mac, hash_bits=HASH_BITS,
+                 instrument=False):
 
         self.sampling_rate = sampling
         self.dst_mac = dst_mac
@@ -25,16 +28,22 @@ class PipelineWhisper:
 
         # Initialize Whisper.
 
+        # Per-stage latency instrumentation (switchable at runtime), shared with the FC.
+        self.instrument = Instrument(instrument)
+
         # Initialize feature extraction/computation.
-        self.fc = FCWhisper(trace)
+        self.fc = FCWhisper(trace, hash_bits, self.instrument)
 
         self.trace_size = self.fc.trace_size()
 
     def process(self):
         # Process the trace, packet by packet.
         s = conf.L2socket('enp1s0')
+        instrument = self.instrument
+        t_pkt = 0
         while True:
             cur_stats = 0
+            t_pkt = instrument.lap('packet', t_pkt)
 
             if self.pkt_cnt_global % 1000 == 0:
                 print(f'Processed pkts: {self.pkt_cnt_global}')
@@ -57,6 +66,7 @@ class PipelineWhisper:
                 self.stats_global.append(cur_stats)
 
                 # Generate pkt w/ peregrine custom hdr and send it to Whisper.
+                t = instrument.start()
                 s.send(
                     Ether(dst=self.dst_mac, src=cur_stats[2])/
                     IP(src=cur_stats[3],dst=cur_stats[4],proto=253)/
@@ -64,8 +74,18 @@ class PipelineWhisper:
                         ip_src=cur_stats[8], ip_proto=int(cur_stats[9]),
                         length=int(cur_stats[10]), timestamp=cur_stats[11])
                     )
+                instrument.lap('send', t)
             else:
                 print('TIMEOUT.')
                 break
 
         return [self.stats_global]
+
+    def metrics(self):
+        # Snapshot of the pipeline state, taken by the metrics thread (Metrics).
+        # The detection itself runs on Whisper, not here.
+        train_cnt = min(self.pkt_cnt_global, self.train_size)
+        return {
+            'packets_total': {'training': train_cnt, 'execution': self.pkt_cnt_global - train_cnt},
+            'training_progress': train_cnt / self.train_size if self.train_size else 1,
+            'flow_table_flows': {'ip_src': len(self.stats_ip_src)}}
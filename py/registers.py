@@ -0,0 +1,83 @@
+import numpy as np
+from flow_hash import HASH_BITS, hash_mask
+
+#
+# Register file for the FC flow state, following the Tofino register layout.
+#
+# Every flow key table is a set of preallocated register arrays, indexed by the slot
+# hash + hash_slots * (decay_cntr - 1): 4 decay counters x hash_slots hash values
+# (hash_slots = 2^hash_bits, 8192 by default).
+#
+# Register layouts (per slot):
+#
+#  stats_<key>_ts:      last update timestamp, per decay counter.
+#  stats_<key>_valid:   the slot has already been initialized by a packet.
+#  stats_<key>:         per decay counter, [pkt_cnt, pkt_len, pkt_len_sqr].
+#                       IP and 5-tuple keys also hold the values read by the reverse direction:
+#                       [pkt_cnt, pkt_len, pkt_len_sqr, pkt_cnt copy, pkt_len_sqr copy, mean].
+#  <key>_res:           residue (pkt_len - mean), per decay counter.
+#  <key>_res_sum_ts:    last update timestamp of the sum of residual products, per decay counter.
+#  <key>_res_sum:       sum of residual products, per decay counter.
+#                       Kept as python numbers: the shifted residues can exceed the float64 precision.
+#
+
+LAMBDAS = 4
+HASH_SLOTS = 1 << HASH_BITS
+SLOTS = LAMBDAS * HASH_SLOTS
+
+# Fields of the uni-directional (MAC src + IP src, IP src) and bi-directional (IP, 5-tuple) keys.
+FIELDS_1D = 3
+FIELDS_2D = 6
+
+UNI_KEYS = ['mac_ip_src', 'ip_src']
+BI_KEYS = ['ip', 'five_t']
+
+
+# Position of the decay counter values in the per-flow stats (pipelines' update_stats).
+# The slot offsets of the decay counters (hash_slots * (decay_cntr - 1)) map to the same positions.
+def decay_to_pos(hash_slots=HASH_SLOTS):
+    positions = {0: 0}
+    for pos in range(1, LAMBDAS):
+        positions[hash_slots * pos] = pos
+    for decay_cntr in range(1, LAMBDAS + 1):
+        positions[decay_cntr] = decay_cntr - 1
+    return positions
+
+
+class Registers:
+    def __init__(self, hash_bits=HASH_BITS):
+        self.hash_bits = hash_bits
+        self.hash_slots = hash_mask(hash_bits) + 1
+        self.slots = LAMBDAS * self.hash_slots
+        slots = self.slots
+        self.arrays = {}
+
+        for key in UNI_KEYS + BI_KEYS:
+            fields = FIELDS_1D if key in UNI_KEYS else FIELDS_2D
+            self.arrays[f'stats_{key}_ts'] = np.zeros((slots, LAMBDAS))
+            self.arrays[f'stats_{key}_valid'] = np.zeros(slots, dtype=bool)
+            self.arrays[f'stats_{key}'] = np.zeros((slots, LAMBDAS, fields))
+
+        for key in BI_KEYS:
+            self.arrays[f'{key}_res'] = np.zeros((slots, LAMBDAS))
+            self.arrays[f'{key}_res_sum_ts'] = np.zeros((slots, LAMBDAS))
+            self.arrays[f'{key}_res_sum'] = np.zeros((slots, LAMBDAS), dtype=object)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+    # Copy of all registers, e.g. to save/compare the flow state at a given point.
+    def snapshot(self):
+        return {name: array.copy() for name, array in self.arrays.items()}
+
+    # Restores a snapshot in place: the FC classes keep references to the register arrays.
+    def restore(self, snapshot):
+        for name, array in self.arrays.items():
+            array[...] = snapshot[name]
+
+    def reset(self):
+        for array in self.arrays.values():
+            array[...] = 0
@@ -0,0 +1,54 @@
+import numpy as np
+
+#
+# Input stats rows, stored in preallocated chunks (matrices) of chunk_rows rows.
+#
+# Each row is a view into the current chunk: the per-packet input vector is written in place
+# (no concatenation nor per-packet array allocation) and is kept as is when the chunk is full.
+# NaNs are set to 0 once per chunk, when it is full (or when the chunks are read).
+#
+# Usage:
+#
+#  buffer = StatsBuffer(80)
+#  row = buffer.next_row()
+#  row[0:12] = ...
+#  for chunk in buffer.chunks():
+#      pd.DataFrame(chunk)
+#
+
+# Same as the number of rows of each saved stats pickle.
+CHUNK_ROWS = 50000
+
+
+class StatsBuffer:
+    def __init__(self, width, chunk_rows=CHUNK_ROWS):
+        self.width = width
+        self.chunk_rows = chunk_rows
+        self.full_chunks = []
+        self.cur_chunk = np.empty((chunk_rows, width))
+        self.cur_rows = 0
+
+    def __len__(self):
+        return len(self.full_chunks) * self.chunk_rows + self.cur_rows
+
+    def next_row(self):
+        if self.cur_rows == self.chunk_rows:
+            clear_nans(self.cur_chunk)
+            self.full_chunks.append(self.cur_chunk)
+            self.cur_chunk = np.empty((self.chunk_rows, self.width))
+            self.cur_rows = 0
+        row = self.cur_chunk[self.cur_rows]
+        self.cur_rows += 1
+        return row
+
+    # All the rows, chunk_rows rows per chunk (the last one holds the remaining rows).
+    def chunks(self):
+        chunks = list(self.full_chunks)
+        if self.cur_rows > 0:
+            chunks.append(clear_nans(self.cur_chunk[:self.cur_rows]))
+        return chunks
+
+
+def clear_nans(chunk):
+    chunk[np.isnan(chunk)] = 0
+    return chunk
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The modules are flat files in py/ (and py/bench/), run as scripts: not a package.
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.path.insert(0, str(Path(__file__).parents[1] / 'bench'))
@@ -0,0 +1,59 @@
+import functools
+import numpy as np
+import pytest
+
+from golden import make_fc, fc_process, fc_process_batch, chunk_columns
+from synth_trace import write_trace
+
+#
+# FCBatch (process_batch()) vs. the per packet process(): same cur_stats rows and registers.
+#
+
+# Small hash tables: many slots are shared by several flows.
+HASH_BITS = 6
+
+PACKETS = 3000
+TRAIN_PKTS = 2000
+
+
+@pytest.fixture(scope='module', params=['uniform', 'zipf'])
+def trace(request, tmp_path_factory):
+    # 3000 packets at 100 pkts/s: 30 s of traffic, every decay interval but the last elapses.
+    path = tmp_path_factory.mktemp('trace') / f'synth-{request.param}.pcap'
+    return write_trace(str(path), PACKETS, 300, 100, dist=request.param)[0]
+
+
+def fc_meta(fc_name, trace, sampling):
+    return {'fc': fc_name, 'trace': trace, 'sampling': sampling, 'train_pkts': TRAIN_PKTS,
+            'hash_bits': HASH_BITS}
+
+
+# FC output columns (golden.chunk_columns() of all the chunks) and final registers.
+def run(meta, fc, chunks):
+    columns = [chunk_columns(meta, headers, stats) for headers, stats in chunks]
+    return {field: np.concatenate([chunk[field] for chunk in columns]).tolist()
+            for field in columns[0]}, fc.registers.snapshot()
+
+
+# Reference run, shared by the batch sizes.
+@functools.lru_cache(maxsize=None)
+def run_process(fc_name, trace, sampling):
+    meta = fc_meta(fc_name, trace, sampling)
+    fc = make_fc(meta)
+    return run(meta, fc, fc_process(meta, fc))
+
+
+@pytest.mark.parametrize('fc_name', ['kitnet', 'enidrift'])
+@pytest.mark.parametrize('sampling', [1, 4])
+@pytest.mark.parametrize('batch_size', [7, 333, 4096])
+def test_process_batch(trace, fc_name, sampling, batch_size):
+    columns, registers = run_process(fc_name, trace, sampling)
+    meta = fc_meta(fc_name, trace, sampling)
+    fc = make_fc(meta)
+    batch_columns, batch_registers = run(meta, fc, fc_process_batch(meta, fc, batch_size))
+
+    assert len(batch_columns['decay_cntr']) == len(columns['decay_cntr']) == PACKETS
+    for field, values in columns.items():
+        assert batch_columns[field] == values, field
+    for name, array in batch_registers.items():
+        assert array.tolist() == registers[name].tolist(), name
@@ -0,0 +1,84 @@
+import numpy as np
+from math import log
+import pytest
+
+from fixed_point import log2_floor, shift_div, shift_mul, sqrt_approx, bit_length_array, \
+    log2_floor_array, shift_div_array, shift_mul_array, sqrt_approx_array
+from fc_kitnet import sqr, sqrt_mu
+
+#
+# Fixed-point primitives vs. the previous float log2 implementation and int.bit_length().
+#
+
+
+# Previous implementation of log2_floor (pow_2 in the FC classes).
+def pow_2_float(n):
+    if n > 1:
+        return int(log(n, 2))
+    else:
+        return 0
+
+
+# Exhaustive for the counters/lengths range, then around every power of two.
+# The float log rounds up just below 2^48 and above, so the values are compared below it.
+def check_values():
+    values = list(range(-1024, 1 << 20))
+    for exp in range(20, 48):
+        values += [(1 << exp) + delta for delta in range(-64, 65)]
+    return [n for n in values if n < (1 << 48) - 1]
+
+
+VALUES = check_values()
+ARRAY = np.array(VALUES, dtype=np.int64)
+OPERANDS = ARRAY[::97]
+SMALL = OPERANDS[np.abs(OPERANDS) < (1 << 20)]
+POSITIVE = ARRAY[ARRAY >= 0]
+LARGE = [(1 << exp) + delta for exp in range(50, 63) for delta in [-1, 0, 1]]
+OTHERS = [0, 1, 2, 3, 255, 1 << 20, (1 << 40) + 3]
+
+
+def test_log2_floor():
+    assert [log2_floor(n) for n in VALUES] == [pow_2_float(n) for n in VALUES]
+
+
+def test_log2_floor_array():
+    assert log2_floor_array(ARRAY).tolist() == [log2_floor(n) for n in VALUES]
+
+
+@pytest.mark.parametrize('other', OTHERS)
+def test_shift_div(other):
+    operands = OPERANDS.tolist()
+    expected = [n >> pow_2_float(other) for n in operands]
+    assert shift_div_array(OPERANDS, other).tolist() == expected
+    assert [shift_div(n, other) for n in operands] == expected
+    assert shift_div_array(other, OPERANDS).tolist() == [other >> pow_2_float(n) for n in operands]
+
+
+@pytest.mark.parametrize('other', OTHERS)
+def test_shift_mul(other):
+    expected = [n << pow_2_float(other) for n in SMALL.tolist()]
+    assert shift_mul_array(SMALL, other).tolist() == expected
+    assert [shift_mul(n, other) for n in SMALL.tolist()] == expected
+
+
+def test_bit_length_array():
+    assert bit_length_array(POSITIVE).tolist() == [n.bit_length() for n in POSITIVE.tolist()]
+    assert bit_length_array(LARGE).tolist() == [n.bit_length() for n in LARGE]
+    # Mixed small and large values (the shift path, not the float exponent one).
+    assert bit_length_array(LARGE + [0, 1, 2, 3]).tolist() == \
+        [n.bit_length() for n in LARGE + [0, 1, 2, 3]]
+    assert bit_length_array([]).tolist() == []
+
+
+def test_sqrt_approx_array():
+    assert sqrt_approx_array(POSITIVE).tolist() == [sqrt_approx(n) for n in POSITIVE.tolist()]
+
+
+# MathUnit.compute_array() takes the exponent of its arguments from bit_length_array():
+# around every power of two, up to the int64 range, it matches the scalar (bit_length) path.
+@pytest.mark.parametrize('math_unit', [sqr, sqrt_mu], ids=['sqr', 'sqrt_mu'])
+def test_math_unit_exponent(math_unit):
+    values = [(1 << exp) + delta for exp in range(3, 63) for delta in [-1, 0, 1]]
+    values += [(1 << 63) - 1]
+    assert math_unit.compute_array(np.array(values, dtype=np.int64)).tolist() == \
+        [math_unit.compute_direct(n) for n in values]
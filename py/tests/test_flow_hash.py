@@ -0,0 +1,91 @@
+import socket
+import struct
+import numpy as np
+import pytest
+
+from flow_hash import crc16, crc16_array, flow_hashes, flow_hashes_array, FlowHashCache
+
+#
+# CRC16 flow hashing: known answers (computed with crcmod.mkCrcFun(0x18005, rev=True,
+# initCrc=0x0000, xorOut=0x0000), as the FCs hashed the flow keys before the table-driven
+# CRC), and the vector form vs. the scalar one.
+#
+
+
+def mac(text):
+    return int(text.replace(':', ''), 16)
+
+
+def ip(text):
+    return struct.unpack('!I', socket.inet_aton(text))[0]
+
+
+# (bytes, CRC16).
+CRC16_VALUES = [
+    (b'123456789', 0xBB3D),         # CRC-16/ARC check value.
+    (b'\x00', 0x0000),
+    (b'\xff', 0x4040),
+    (bytes.fromhex('0a000001'), 0x18C2),
+    (bytes.fromhex('001122334455'), 0x4BF5),
+    (bytes.fromhex('deadbeef'), 0xE59B)]
+
+PACKETS = [
+    (mac('00:11:22:33:44:55'), ip('10.0.0.1'), ip('10.0.0.2'), 6, 12345, 80),
+    (mac('de:ad:be:ef:00:01'), ip('192.168.1.10'), ip('8.8.8.8'), 17, 53000, 53),
+    (mac('02:00:00:00:00:01'), ip('172.16.0.5'), ip('172.16.0.9'), 1, 0, 0),
+    (mac('ff:ff:ff:ff:ff:ff'), ip('255.255.255.255'), ip('0.0.0.0'), 255, 65535, 0)]
+
+# flow_hashes() of PACKETS, per hash_bits.
+FLOW_HASHES = {
+    13: [(641, 6338, 1599, 1851, 260, 7265, 4762, 3835),
+         (2640, 5948, 3641, 6228, 5741, 3883, 6054, 6285),
+         (7292, 5856, 7991, 6951, 1040, 4305, 785, 5056),
+         (817, 5121, 4160, 5121, 1089, 7953, 5124, 2837)],
+    16: [(49793, 6338, 42559, 42811, 260, 48225, 45722, 3835),
+         (19024, 30524, 60985, 38996, 30317, 61227, 38822, 30861),
+         (40060, 38624, 32567, 31527, 1040, 53457, 8977, 62400),
+         (33585, 37889, 4160, 37889, 33857, 16145, 21508, 27413)]}
+
+
+@pytest.mark.parametrize('data,expected', CRC16_VALUES, ids=lambda v: str(v))
+def test_crc16(data, expected):
+    value = int.from_bytes(data, 'big')
+    assert crc16(value, len(data)) == expected
+    if len(data) <= 7:
+        assert crc16_array(np.array([value], dtype=np.int64), len(data)).tolist() == [expected]
+
+
+@pytest.mark.parametrize('hash_bits', list(FLOW_HASHES))
+def test_flow_hashes(hash_bits):
+    assert [flow_hashes(*pkt, hash_bits=hash_bits) for pkt in PACKETS] == FLOW_HASHES[hash_bits]
+
+
+def test_flow_hashes_reverse():
+    # The reverse direction swaps the bidirectional hashes (same xor).
+    for pkt in PACKETS:
+        mac_src, ip_src, ip_dst, ip_proto, port_src, port_dst = pkt
+        hashes = flow_hashes(*pkt)
+        reverse = flow_hashes(mac_src, ip_dst, ip_src, ip_proto, port_dst, port_src)
+        assert reverse[2:5] == (hashes[3], hashes[2], hashes[4])
+        assert reverse[5:8] == (hashes[6], hashes[5], hashes[7])
+
+
+@pytest.mark.parametrize('hash_bits', [1, 8, 13, 16])
+def test_flow_hashes_array(hash_bits):
+    rng = np.random.default_rng(0)
+    n = 5000
+    columns = [rng.integers(0, 1 << 48, n), rng.integers(0, 1 << 32, n),
+               rng.integers(0, 1 << 32, n), rng.integers(0, 1 << 8, n),
+               rng.integers(0, 1 << 16, n), rng.integers(0, 1 << 16, n)]
+    columns = [np.concatenate((column, [pkt[i] for pkt in PACKETS]))
+               for i, column in enumerate(columns)]
+    hashes = np.column_stack(flow_hashes_array(*columns, hash_bits=hash_bits))
+    rows = zip(*[column.tolist() for column in columns])
+    assert [tuple(row) for row in hashes.tolist()] == \
+        [flow_hashes(*pkt, hash_bits=hash_bits) for pkt in rows]
+
+
+def test_flow_hash_cache():
+    cache = FlowHashCache(2)
+    for pkt in PACKETS + PACKETS[::-1]:
+        assert cache.lookup(*pkt) == flow_hashes(*pkt)
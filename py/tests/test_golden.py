@@ -0,0 +1,37 @@
+import glob
+import pytest
+
+import golden
+
+#
+# FC engines vs. the golden files of the synthetic set (bench/golden/), recorded with the FCs
+# of the baseline revision.
+#
+
+GOLDEN_FILES = sorted(glob.glob(f'{golden.GOLDEN_DIR}/*.npz'))
+
+
+@pytest.fixture(scope='module')
+def traces(tmp_path_factory):
+    # Synthetic traces, written once: {trace name: path}.
+    tmpdir = tmp_path_factory.mktemp('golden')
+    paths = {}
+
+    def trace(meta):
+        if meta['trace'] not in paths:
+            paths[meta['trace']] = golden.synth_trace(meta, tmpdir)
+        return paths[meta['trace']]
+    return trace
+
+
+def test_golden_set():
+    assert len(GOLDEN_FILES) == len(golden.SYNTH_TRACES) * len(golden.HEADER_FIELDS)
+
+
+@pytest.mark.parametrize('engine', ['process', 'small_cache', 'batch'])
+@pytest.mark.parametrize('golden_path', GOLDEN_FILES, ids=lambda path: path.split('/')[-1])
+def test_engine(traces, golden_path, engine):
+    meta, _ = golden.load(golden_path)
+    packets, mismatches, first = golden.check(golden_path, engine, 1024, traces(meta))
+    assert packets == meta['packets']
+    assert first is None, f'{mismatches} mismatching packets, first: {first}'
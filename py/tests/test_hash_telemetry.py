@@ -0,0 +1,60 @@
+import numpy as np
+
+from flow_hash import flow_hashes, flow_hashes_array
+from hash_telemetry import HashTelemetry, TABLES
+
+#
+# Hash telemetry: per packet and batch updates, bounded state.
+#
+
+HASH_BITS = 6
+
+
+def packets(n, flows, seed=0):
+    rng = np.random.default_rng(seed)
+    flow = rng.integers(0, flows, n)
+    return [
+        rng.integers(1, 1 << 47, flows)[flow], rng.integers(0, 1 << 32, flows)[flow],
+        rng.integers(0, 1 << 32, flows)[flow], rng.choice([6, 17], flows)[flow],
+        rng.integers(0, 1 << 16, flows)[flow], rng.integers(0, 1 << 16, flows)[flow]]
+
+
+def update(telemetry, fields):
+    for pkt in zip(*[field.tolist() for field in fields]):
+        telemetry.update(flow_hashes(*pkt, hash_bits=HASH_BITS), pkt)
+
+
+def test_update_array():
+    fields = packets(5000, 300)
+    telemetry = HashTelemetry(HASH_BITS)
+    update(telemetry, fields)
+
+    telemetry_array = HashTelemetry(HASH_BITS)
+    for start in range(0, 5000, 777):
+        chunk = [field[start:start + 777] for field in fields]
+        telemetry_array.update_array(flow_hashes_array(*chunk, hash_bits=HASH_BITS), chunk)
+
+    assert telemetry_array.report() == telemetry.report()
+    assert telemetry_array.collisions == telemetry.collisions
+    for table in TABLES:
+        assert telemetry_array.last_key[table] == telemetry.last_key[table]
+        assert telemetry_array.overwrites[table].tolist() == telemetry.overwrites[table].tolist()
+
+
+def test_report():
+    telemetry = HashTelemetry(HASH_BITS)
+    update(telemetry, packets(2000, 500))
+    for table, values in telemetry.report().items():
+        assert values['occupied_slots'] <= telemetry.hash_slots
+        assert values['shared_slots'] <= values['occupied_slots']
+        assert telemetry.overwrites[table].sum() == telemetry.collisions[table]
+    assert 'shared slots' in telemetry.summary()
+
+
+def test_bounded():
+    # Many more flows than slots: the state stays within one entry per slot.
+    telemetry = HashTelemetry(HASH_BITS)
+    update(telemetry, packets(20000, 20000))
+    for table in TABLES:
+        assert len(telemetry.last_key[table]) <= telemetry.hash_slots
+        assert len(telemetry.overwrites[table]) == telemetry.hash_slots
@@ -0,0 +1,125 @@
+import copy
+import numpy as np
+import pytest
+
+from kitnet_train import KitNETTrain, ad_training
+
+#
+# KitNETTrain vs. KitNET.process(): same trained model and rmse in the AD grace period.
+#
+# With stub autoencoders (chunking, shared memory slicing, gather order and n_trained), and
+# with the KitNET plugin (skipped when the submodule is not checked out).
+#
+
+INPUT_SIZE = 20
+FM_GRACE = 200
+AD_GRACE = 600
+
+
+# Autoencoder stub (dA interface): each update depends on the previous ones and on every
+# value of the row, and the rows it was trained on are kept.
+class StubAE:
+    def __init__(self, n_visible, seed):
+        self.n = 0
+        self.W = np.random.default_rng(seed).random(n_visible)
+        self.rows = []
+
+    def train(self, x):
+        self.n += 1
+        self.rows.append(x.copy())
+        # Like dA.train(), computes on a new (normalized) array: np.dot() may round
+        # differently on a row view with another memory alignment.
+        x = x * 2 - 1
+        rmse = float(np.dot(self.W, x)) / (self.n + 1)
+        self.W = self.W * 0.9 + x * 0.01
+        return rmse
+
+
+# KitNET stub: feature map, ensemble and output layers, in the AD grace period.
+class StubKitNET:
+    def __init__(self, v):
+        self.v = v
+        self.ensembleLayer = [StubAE(len(v_a), a) for a, v_a in enumerate(v)]
+        self.outputLayer = StubAE(len(v), len(v))
+        self.FM_grace_period = 10
+        self.AD_grace_period = 1000
+        self.n_trained = self.FM_grace_period + 1
+
+    # Same updates as KitNET.process() in the AD grace period.
+    def process(self, x):
+        s_l1 = np.array([ae.train(x[v_a]) for ae, v_a in zip(self.ensembleLayer, self.v)])
+        self.n_trained += 1
+        return self.outputLayer.train(s_l1)
+
+
+@pytest.mark.parametrize('workers,chunk_rows', [(1, 1000), (3, 64)])
+def test_train_stub(workers, chunk_rows):
+    # Unordered, disjoint feature clusters of different sizes.
+    v = [[7, 0, 13], [2, 19, 4, 11], [1], [18, 3, 9, 15, 5], [6, 8, 10, 12, 14, 16, 17]]
+    x = np.random.default_rng(0).random((400, INPUT_SIZE))
+    kitnet_ref = StubKitNET(v)
+    kitnet = StubKitNET(v)
+
+    rmse_ref = [kitnet_ref.process(row) for row in x]
+
+    kitnet_train = KitNETTrain(kitnet, workers, chunk_rows)
+    try:
+        rmse = []
+        for i in range(0, len(x), chunk_rows):
+            rmse.extend(kitnet_train.train(x[i:i + chunk_rows]))
+    finally:
+        kitnet_train.close()
+
+    assert rmse == rmse_ref
+    assert kitnet.n_trained == kitnet_ref.n_trained == StubKitNET(v).n_trained + len(x)
+    for a, (ae, ae_ref) in enumerate(zip(kitnet.ensembleLayer, kitnet_ref.ensembleLayer)):
+        assert ae.n == ae_ref.n == len(x)
+        assert np.array_equal(ae.rows, x[:, v[a]])
+        assert np.array_equal(ae.W, ae_ref.W)
+    assert np.array_equal(kitnet.outputLayer.rows, kitnet_ref.outputLayer.rows)
+    assert np.array_equal(kitnet.outputLayer.W, kitnet_ref.outputLayer.W)
+
+
+# KitNET after the FM grace period (feature map learnt), and the AD grace period vectors.
+def fm_trained():
+    KitNET = pytest.importorskip('plugins.KitNET.KitNET').KitNET
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(size=(FM_GRACE + AD_GRACE + 1, INPUT_SIZE)) \
+        * rng.integers(1, 1000, INPUT_SIZE)
+    kitnet = KitNET(INPUT_SIZE, 5, FM_GRACE, AD_GRACE, 0.1, 0.75, None, None, None, 'test', 0)
+    for row in x[:FM_GRACE + 1]:
+        kitnet.process(row)
+    assert ad_training(kitnet)
+    return kitnet, x[FM_GRACE + 1:]
+
+
+def assert_same_ae(ae, ae_ref):
+    for attr in ['W', 'hbias', 'vbias', 'norm_max', 'norm_min']:
+        assert np.array_equal(getattr(ae, attr), getattr(ae_ref, attr)), attr
+    assert ae.n == ae_ref.n
+
+
+@pytest.mark.parametrize('workers,chunk_rows', [(1, 1000), (4, 128)])
+def test_train_plugin(workers, chunk_rows):
+    kitnet_ref, x = fm_trained()
+    kitnet = copy.deepcopy(kitnet_ref)
+
+    rmse_ref = [kitnet_ref.process(row) for row in x]
+
+    kitnet_train = KitNETTrain(kitnet, workers, chunk_rows)
+    try:
+        rmse = []
+        for i in range(0, len(x), chunk_rows):
+            rmse.extend(kitnet_train.train(x[i:i + chunk_rows]))
+    finally:
+        kitnet_train.close()
+
+    assert np.array_equal(rmse, rmse_ref)
+    assert kitnet.n_trained == kitnet_ref.n_trained
+    assert not ad_training(kitnet)
+    for ae, ae_ref in zip(kitnet.ensembleLayer, kitnet_ref.ensembleLayer):
+        assert_same_ae(ae, ae_ref)
+    assert_same_ae(kitnet.outputLayer, kitnet_ref.outputLayer)
+
+    # Same model, same execution phase rmse.
+    assert [kitnet.process(row) for row in x[:50]] == [kitnet_ref.process(row) for row in x[:50]]
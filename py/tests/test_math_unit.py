@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from math_unit import MathUnit, TABLE_SIZE
+from fc_kitnet import sqr, sqrt_mu
+
+#
+# MathUnit.compute_array() vs. compute() (and the precomputed table vs. compute_direct()).
+#
+
+MATH_UNITS = {
+    'sqr': sqr,
+    'sqrt_mu': sqrt_mu,
+    'default': MathUnit(),
+    'invert': MathUnit(shift=0, invert=True, scale=10, lookup=list(range(255, 239, -1))),
+    'sqrt_invert_8': MathUnit(shift=-1, invert=True, scale=2, size=8),
+    'sqr_16': MathUnit(shift=1, invert=False, scale=-6,
+                       lookup=[x * x for x in range(15, -1, -1)], size=16),
+}
+
+
+# Arguments: the table range, around every power of two up to the int64 range, random
+# values of every magnitude and small negative values (the scalar square root fails on
+# most negative values: the FCs only take the square root of absolute values).
+def arguments():
+    values = list(range(-256, TABLE_SIZE + 256))
+    values += [(1 << exp) + delta for exp in range(16, 63) for delta in range(-3, 4)]
+    values += [(1 << 63) - 1]
+    rng = np.random.default_rng(0)
+    values += (rng.integers(1, 1 << 62, 2000) >> rng.integers(0, 62, 2000)).tolist()
+    return values
+
+
+ARGUMENTS = arguments()
+
+
+@pytest.mark.parametrize('name', list(MATH_UNITS))
+def test_compute_array(name):
+    math_unit = MATH_UNITS[name]
+    args = [n for n in ARGUMENTS if n >= 0 or math_unit.shift != -1]
+    expected = [math_unit.compute(n) for n in args]
+    assert math_unit.compute_array(np.array(args, dtype=np.int64)).tolist() == expected
+    # Arguments all in the table range (single lookup path).
+    assert math_unit.compute_array(np.arange(TABLE_SIZE)).tolist() == \
+        [math_unit.compute_direct(n) for n in range(TABLE_SIZE)]
+
+
+@pytest.mark.parametrize('name', list(MATH_UNITS))
+def test_table(name):
+    math_unit = MATH_UNITS[name]
+    assert math_unit.table == [math_unit.compute_direct(n) for n in range(TABLE_SIZE)]
+
+
+def test_compute_array_shape():
+    args = np.array([[0, 3, 100], [1 << 20, 1 << 40, 7]])
+    result = sqr.compute_array(args)
+    assert result.shape == args.shape
+    assert result.tolist() == [[sqr.compute(n) for n in row] for row in args.tolist()]
+    assert sqr.compute_array(np.array([], dtype=np.int64)).tolist() == []
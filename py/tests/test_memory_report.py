@@ -0,0 +1,45 @@
+import numpy as np
+
+from memory_report import MemoryReport, deep_size
+from stats_buffer import StatsBuffer
+
+#
+# Memory report: the data of an array is counted once, at its owner.
+#
+
+
+class Pipeline:
+    # The structures of a pipeline the report needs: StatsBuffer, buffers of row views.
+    def __init__(self, rows, width):
+        self.trace_size = rows
+        self.df_exec_stats_list = StatsBuffer(width, chunk_rows=1000)
+        self.exec_buffer = []
+        for i in range(rows):
+            row = self.df_exec_stats_list.next_row()
+            row[:] = i
+            self.exec_buffer.append((row, i))
+        # View of an array held by no structure.
+        self.trace_labels = np.zeros((rows, 2))[:, 0]
+
+    def metrics(self):
+        return {'packets_total': {'execution': len(self.exec_buffer)}}
+
+
+def test_views_counted_at_owner():
+    pipeline = Pipeline(10000, 80)
+    structures = MemoryReport(pipeline).sample()['structures']
+
+    data = (len(pipeline.df_exec_stats_list.full_chunks) + 1) * 1000 * 80 * 8
+    assert data <= structures['df_exec_stats_list']['bytes'] < data * 1.1
+    # The row views only count their headers (and the tuples holding them).
+    assert structures['exec_buffer']['bytes'] < data / 2
+    # The owner of the labels view is held by no structure: counted at the view.
+    assert structures['trace_labels']['bytes'] >= 10000 * 2 * 8
+
+
+def test_owned_data_counted_once():
+    chunk = np.zeros((1000, 80))
+    arrays = {'owned': set(), 'viewed': {}}
+    assert deep_size(chunk, arrays) >= chunk.nbytes
+    assert deep_size([chunk[i] for i in range(1000)], arrays) < chunk.nbytes / 4
+    assert id(chunk) in arrays['owned'] and id(chunk) in arrays['viewed']
@@ -0,0 +1,176 @@
+import os
+import json
+import shutil
+import socket
+import struct
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from pcap_reader import PcapReader
+
+#
+# Binary columnar trace cache.
+#
+# The first run converts the trace (pcap/pcapng, or a csv previously generated with tshark) to
+# one raw little-endian file per column, holding only the fields read by the FC classes.
+# Later runs memory-map the columns, so loading a trace no longer depends on its size.
+#
+# The cache lives next to the trace, in <trace>.cache/<version>/, where the version is a digest
+# of the source path, size and mtime: if any of them changes, a new version is built.
+# A version is built in a private temporary directory and published with an atomic rename;
+# once published it is never modified nor deleted, so concurrent runs on the same trace can
+# read it while others build or publish. If another run published the same version first,
+# its cache is used. Versions of a previous source are left in place (a run may still be
+# reading them): remove <trace>.cache/ to reclaim the space.
+#
+# Usage:
+#
+#  trace = load_trace('trace.pcap')
+#  trace['ip_src'][0]
+#
+
+CACHE_VERSION = 2
+
+# Stored columns. Empty tshark fields are stored as 0.
+COLUMNS = {
+    'ts': '<f8', 'ip_len': '<u2', 'eth_src': '<u8', 'ip_src': '<u4', 'ip_dst': '<u4',
+    'ip_proto': 'u1', 'tcp_srcport': '<u2', 'tcp_dstport': '<u2',
+    'udp_srcport': '<u2', 'udp_dstport': '<u2'}
+
+# tshark field of each column in the csv.
+CSV_FIELDS = {
+    'ts': 'frame.time_epoch', 'ip_len': 'ip.len', 'eth_src': 'eth.src', 'ip_src': 'ip.src',
+    'ip_dst': 'ip.dst', 'ip_proto': 'ip.proto', 'tcp_srcport': 'tcp.srcport',
+    'tcp_dstport': 'tcp.dstport', 'udp_srcport': 'udp.srcport', 'udp_dstport': 'udp.dstport'}
+
+CSV_CHUNK_SIZE = 1 << 20
+
+
+def cache_path(trace_path):
+    return os.path.splitext(trace_path)[0] + '.cache'
+
+
+def trace_source(trace_path):
+    # Traces previously converted with tshark are still read from their csv.
+    csv_path = os.path.splitext(trace_path)[0] + '.csv'
+    if os.path.isfile(csv_path):
+        return csv_path
+    return trace_path
+
+
+def source_key(source):
+    stat = os.stat(source)
+    return {'version': CACHE_VERSION, 'source': os.path.abspath(source),
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+# Directory of the cache version of a source key.
+def version_path(cache, key):
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(cache, digest)
+
+
+# Meta of a published cache version, None if there is none (for this key).
+def read_meta(version, key):
+    try:
+        with open(os.path.join(version, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta['key'] == key else None
+
+
+def load_trace(trace_path):
+    source = trace_source(trace_path)
+    key = source_key(source)
+    version = version_path(cache_path(trace_path), key)
+
+    meta = read_meta(version, key)
+    if meta is None:
+        print('Building trace cache.')
+        meta = build_cache(source, version, key)
+
+    trace = {}
+    for col, dtype in COLUMNS.items():
+        if meta['count'] == 0:
+            trace[col] = np.zeros(0, dtype=dtype)
+        else:
+            # Plain ndarray views of the memmap (memmap indexing is much slower per element).
+            trace[col] = np.memmap(os.path.join(version, col), dtype=dtype, mode='r',
+                                   shape=(meta['count'],)).view(np.ndarray)
+    return trace
+
+
+def build_cache(source, version, key):
+    # Built in a private directory next to the published versions (same filesystem).
+    os.makedirs(os.path.dirname(version), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='build-', dir=os.path.dirname(version))
+    try:
+        meta = write_cache(source, tmp, key)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    try:
+        os.rename(tmp, version)
+    except OSError:
+        # Another run published this version first: use it instead.
+        shutil.rmtree(tmp, ignore_errors=True)
+        meta = read_meta(version, key)
+        if meta is None:
+            raise
+    return meta
+
+
+def write_cache(source, path, key):
+    files = {col: open(os.path.join(path, col), 'wb') for col in COLUMNS}
+    count = 0
+    try:
+        if source.endswith('.csv'):
+            chunks = csv_chunks(source)
+        else:
+            chunks = PcapReader(source).chunks()
+        for chunk in chunks:
+            for col, dtype in COLUMNS.items():
+                files[col].write(np.ascontiguousarray(chunk[col], dtype=dtype).tobytes())
+            count += len(chunk['ts'])
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {'key': key, 'count': count, 'columns': COLUMNS}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def csv_chunks(csv_path):
+    reader = pd.read_csv(csv_path, usecols=list(CSV_FIELDS.values()), chunksize=CSV_CHUNK_SIZE,
+                         dtype={'eth.src': str, 'ip.src': str, 'ip.dst': str})
+    for df in reader:
+        chunk = {}
+        for col, field in CSV_FIELDS.items():
+            if col == 'eth_src':
+                chunk[col] = [int(mac.replace(':', ''), 16) if isinstance(mac, str) else 0
+                              for mac in df[field].tolist()]
+            elif col in ('ip_src', 'ip_dst'):
+                chunk[col] = [struct.unpack('!I', socket.inet_aton(ip))[0]
+                              if isinstance(ip, str) else 0 for ip in df[field].tolist()]
+            else:
+                chunk[col] = df[field].fillna(0).to_numpy()
+        yield chunk
+
+
+# Decodes the cached columns into the per-packet fields read by the FC classes,
+# once for the whole trace: the ports are chosen by proto (0 for any proto other than TCP/UDP).
+def decode_trace(trace):
+    proto = trace['ip_proto']
+    port_src = np.where(proto == 17, trace['udp_srcport'],
+                        np.where(proto == 6, trace['tcp_srcport'], 0))
+    port_dst = np.where(proto == 17, trace['udp_dstport'],
+                        np.where(proto == 6, trace['tcp_dstport'], 0))
+
+    return {'ts': trace['ts'], 'pkt_len': trace['ip_len'], 'mac_src': trace['eth_src'],
+            'ip_src': trace['ip_src'], 'ip_dst': trace['ip_dst'], 'ip_proto': proto,
+            'port_src': port_src, 'port_dst': port_dst}
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+import yaml
+import numpy as np
+from sklearn import metrics
+from pipeline_kitnet import PipelineKitNET
+
+#
+# Accuracy comparison of the KitNET training modes on the same trace: online (one vector per
+# update) and mini-batch SGD (train_batch_size vectors per update).
+#
+# Both runs train a new model (the configured models are not loaded), then execute it on the
+# rest of the trace. Each run saves its models and train stats under its own attack name
+# (<attack>-compare-<train_batch_size>), so the configured ones are left untouched. For each one, prints the training threshold, the execution phase AuC and
+# EER, the TPR/FPR at the threshold and the total time.
+#
+# Usage:
+#
+#  python3 train_compare.py -c config/kitnet.yml -b 32
+#
+
+
+def run(conf, train_batch_size):
+    start = time.time()
+    pipeline = PipelineKitNET(
+        conf['trace'], conf['labels'], conf['sampling'], conf['fc_sampling'],
+        conf['exec_sampl_offset'], conf['fm_grace'], conf['ad_grace'], conf['max_ae'],
+        None, None, None, None, f"{conf['attack']}-compare-{train_batch_size}",
+        conf['train_exact_ratio'], False, start,
+        conf['fc_batch_size'], conf['hash_bits'], conf['hash_telemetry'],
+        conf['flow_table_capacity'], conf['flow_table_idle_timeout'],
+        conf['exec_batch_size'], conf['train_workers'], conf['train_chunk_rows'],
+        train_batch_size)
+    pipeline.process()
+    return pipeline, time.time() - start
+
+
+def eval_run(pipeline, total_time):
+    # Execution phase rows of peregrine_eval: rmse, label.
+    exec_eval = np.array(
+        [row[6:8] for row in pipeline.peregrine_eval[pipeline.fm_grace + pipeline.ad_grace:]],
+        dtype=float)
+    rmse = exec_eval[:, 0]
+    label = exec_eval[:, 1]
+    alert = rmse >= pipeline.threshold
+
+    roc_curve_fpr, roc_curve_tpr, _ = metrics.roc_curve(label, rmse)
+    roc_curve_fnr = 1 - roc_curve_tpr
+
+    return {
+        'threshold': float(pipeline.threshold),
+        'auc': metrics.roc_auc_score(label, rmse),
+        'eer': roc_curve_fpr[np.nanargmin(np.absolute((roc_curve_fnr - roc_curve_fpr)))],
+        'tpr': (alert & (label == 1)).sum() / max((label == 1).sum(), 1),
+        'fpr': (alert & (label == 0)).sum() / max((label == 0).sum(), 1),
+        'time': total_time}
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="peregrine-py KitNET training comparison")
+    argparser.add_argument('-c', '--conf', type=str, help='Config path')
+    argparser.add_argument('-b', '--batch', type=int, default=32, help='Mini-batch size')
+    args = argparser.parse_args()
+
+    with open(args.conf, "r") as yaml_conf:
+        conf = yaml.load(yaml_conf, Loader=yaml.FullLoader)
+
+    results = {}
+    for mode, train_batch_size in [('online', 0), (f'mini-batch ({args.batch})', args.batch)]:
+        pipeline, total_time = run(conf, train_batch_size)
+        results[mode] = eval_run(pipeline, total_time)
+
+    print(f'{"":>20} {"Threshold":>12} {"AuC":>8} {"EER":>8} {"TPR":>8} {"FPR":>8} {"Time":>10}')
+    for mode, values in results.items():
+        print(f'{mode:>20} {values["threshold"]:>12.6f} {values["auc"]:>8.4f} '
+              f'{values["eer"]:>8.4f} {values["tpr"]:>8.4f} {values["fpr"]:>8.4f} '
+              f'{values["time"]:>10.2f}')